@@ -0,0 +1,112 @@
+"""
+Бенчмарк доставки новых писем: опрос сервера против IMAP IDLE
+
+Фейковый IMAP сервер с папкой из --messages писем получает --new новых
+писем с интервалом --gap секунд. Замеряется задержка от появления письма
+на сервере до его попадания в локальное хранилище и нагрузка на сервер
+(команды и байты):
+- опрос: синхронизация папки каждые --poll-interval секунд (в приложении
+  было 5 минут, здесь интервал сокращен, чтобы замер шел секунды);
+- IDLE: IdleListener получает уведомление и загружает только новые UID.
+
+Запуск:
+    python benchmarks/email_idle.py --messages 1000 --new 10 --poll-interval 5
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from typing import Dict, List
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utilities', 'email_manager'))
+
+from email_client import EmailClient
+from fake_imap import FakeIMAPServer, make_message
+from imap_idle import IdleListener
+from imap_pool import IMAPPool
+from mail_store import MailStore
+
+
+def make_client(server: FakeIMAPServer) -> EmailClient:
+    client = EmailClient(server.username, server.password, server.host, server.port,
+                         use_ssl=False, store=MailStore(':memory:'))
+    client.pool = IMAPPool(client._open_connection)
+    client.get_emails(limit=0)
+    return client
+
+
+def deliver(server: FakeIMAPServer, count: int, gap: float, sent: Dict[str, float]):
+    for i in range(count):
+        time.sleep(gap)
+        subject = f"New {i}"
+        sent[subject] = time.perf_counter()
+        server.add_message(make_message(subject, "новое письмо " * 20))
+
+
+def run(server: FakeIMAPServer, args, mode: str) -> Dict[str, float]:
+    client = make_client(server)
+    before = server.stats()
+    sent: Dict[str, float] = {}
+    received: Dict[str, float] = {}
+    sender = threading.Thread(target=deliver, args=(server, args.new, args.gap, sent))
+
+    if mode == "idle":
+        listener = IdleListener(client, poll_interval=0.1)
+        listener.subscribe(lambda event: received.update(
+            {e['subject']: time.perf_counter() for e in event['emails']}
+        ))
+        listener.start()
+        time.sleep(0.5)
+        before = server.stats()
+        sender.start()
+        sender.join()
+        listener.wait(args.new - 1, timeout=5)
+        listener.stop()
+    else:
+        sender.start()
+        while sender.is_alive() or len(received) < args.new:
+            time.sleep(args.poll_interval)
+            for email_data in client.get_emails(limit=args.new):
+                if email_data['subject'] in sent:
+                    received.setdefault(email_data['subject'], time.perf_counter())
+        sender.join()
+
+    after = server.stats()
+    delays: List[float] = [received[s] - sent[s] for s in sent if s in received]
+    return {
+        'delivered': len(delays),
+        'mean': statistics.mean(delays),
+        'max': max(delays),
+        'commands': sum(after['commands'].values()) - sum(before['commands'].values()),
+        'bytes': after['bytes_sent'] - before['bytes_sent']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк доставки писем: опрос против IMAP IDLE")
+    parser.add_argument("--messages", type=int, default=1000, help="Писем в папке до начала замера")
+    parser.add_argument("--new", type=int, default=10, help="Новых писем за время замера")
+    parser.add_argument("--gap", type=float, default=1.0, help="Интервал между новыми письмами, сек")
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="Период опроса, сек")
+    parser.add_argument("--latency", type=float, default=0.02, help="Задержка ответа сервера, сек")
+    args = parser.parse_args()
+
+    results = {}
+    for mode in ("poll", "idle"):
+        with FakeIMAPServer(latency=args.latency) as server:
+            for i in range(args.messages):
+                server.add_message(make_message(f"Report {i}", "текст " * 50))
+            results[mode] = run(server, args, mode)
+
+    print(f"Писем в папке: {args.messages}, новых: {args.new} каждые {args.gap} с")
+    for mode, title in (("poll", f"Опрос раз в {args.poll_interval:g} с"), ("idle", "IMAP IDLE")):
+        r = results[mode]
+        print(f"{title:<20} задержка {r['mean']:.2f} с (макс {r['max']:.2f} с), "
+              f"команд {r['commands']}, байт от сервера {r['bytes']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Бенчмарк пула IMAP сессий EmailClient
+
+Поднимает локальный фейковый IMAP сервер с задержкой на команду и на
+LOGIN (TLS рукопожатие и авторизация) и выполняет N операций
+mark_as_read в двух режимах:
+- pooled: сессия переиспользуется, LOGIN и SELECT выполняются один раз;
+- per-op: idle_timeout=0, каждая операция открывает новое соединение,
+  как было до появления пула.
+
+Запуск:
+    python benchmarks/email_imap_pool.py --operations 50 --latency 0.01 --login-delay 0.15
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Dict
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utilities', 'email_manager'))
+
+from email_client import EmailClient
+from fake_imap import FakeIMAPServer, make_message
+from imap_pool import IMAPPool
+
+
+def run_benchmark(server: FakeIMAPServer, operations: int, idle_timeout: float) -> Dict:
+    client = EmailClient(server.username, server.password, server.host, server.port, use_ssl=False)
+    client.pool = IMAPPool(client._open_connection, idle_timeout=idle_timeout)
+    logins_before = server.stats()['logins']
+
+    latencies = []
+    started = time.perf_counter()
+    for i in range(operations):
+        op_started = time.perf_counter()
+        client.mark_as_read(str(i % 10 + 1))
+        latencies.append(time.perf_counter() - op_started)
+    total = time.perf_counter() - started
+
+    client.disconnect()
+    return {
+        "total": total,
+        "p50": statistics.median(latencies),
+        "max": max(latencies),
+        "logins": server.stats()['logins'] - logins_before
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк пула IMAP сессий")
+    parser.add_argument("--operations", type=int, default=50, help="Количество операций mark_as_read")
+    parser.add_argument("--latency", type=float, default=0.01, help="Задержка ответа на команду, сек")
+    parser.add_argument("--login-delay", type=float, default=0.15, help="Задержка LOGIN, сек")
+    args = parser.parse_args()
+
+    server = FakeIMAPServer(latency=args.latency, login_delay=args.login_delay).start()
+    for i in range(10):
+        server.add_message(make_message(f"Message {i}", "benchmark"))
+
+    try:
+        pooled = run_benchmark(server, args.operations, idle_timeout=300.0)
+        per_op = run_benchmark(server, args.operations, idle_timeout=0.0)
+    finally:
+        server.stop()
+
+    print(f"Операций: {args.operations}, задержка команды {args.latency} с, LOGIN {args.login_delay} с")
+    print(f"{'Режим':<8} {'всего, с':>9} {'p50, мс':>9} {'max, мс':>9} {'LOGIN':>6}")
+    for name, r in (("pooled", pooled), ("per-op", per_op)):
+        print(f"{name:<8} {r['total']:>9.3f} {r['p50'] * 1000:>9.1f} {r['max'] * 1000:>9.1f} {r['logins']:>6}")
+    print(f"Ускорение: x{per_op['total'] / pooled['total']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Бенчмарк параллельной загрузки нескольких ящиков
+
+Поднимает N фейковых IMAP серверов с разной задержкой (ящики разных
+провайдеров) и синхронизирует папки всех ящиков:
+- последовательно, ящик за ящиком, папка за папкой;
+- через MailIngestor общим пулом потоков.
+При параллельной загрузке общее время должно быть близко ко времени
+самого медленного ящика. Серверы работают в том же процессе, поэтому
+при большом числе писем замер упирается в разбор писем под GIL, а не
+в сеть.
+
+Запуск:
+    python benchmarks/email_ingest.py --mailboxes 10 --messages 50
+"""
+
+import argparse
+import os
+import sys
+import time
+from contextlib import ExitStack
+from typing import List
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utilities', 'email_manager'))
+
+from email_client import EmailClient
+from fake_imap import FakeIMAPServer, make_message
+from imap_pool import IMAPPool
+from mail_ingest import MailIngestor
+from mail_store import MailStore
+
+FOLDERS = ["INBOX", "Sent", "Archive"]
+
+
+def make_clients(servers: List[FakeIMAPServer], pool_size: int) -> List[EmailClient]:
+    clients = []
+    for server in servers:
+        client = EmailClient(server.username, server.password, server.host, server.port,
+                             use_ssl=False, store=MailStore(':memory:'))
+        client.pool = IMAPPool(client._open_connection, max_size=pool_size)
+        clients.append(client)
+    return clients
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк параллельной загрузки ящиков")
+    parser.add_argument("--mailboxes", type=int, default=10, help="Количество ящиков")
+    parser.add_argument("--messages", type=int, default=50, help="Писем в каждой папке")
+    parser.add_argument("--latency", type=float, default=0.1, help="Задержка самого медленного сервера, сек")
+    parser.add_argument("--pool-size", type=int, default=2, help="Соединений на ящик")
+    parser.add_argument("--workers", type=int, default=16, help="Потоков загрузки")
+    args = parser.parse_args()
+
+    with ExitStack() as stack:
+        servers = []
+        for n in range(args.mailboxes):
+            latency = args.latency * (n + 1) / args.mailboxes
+            server = stack.enter_context(FakeIMAPServer(username=f"boss{n}", latency=latency, login_delay=latency * 5))
+            for folder in FOLDERS:
+                for i in range(args.messages):
+                    server.add_message(make_message(f"{folder} {i}", "текст " * 50), folder=folder)
+            servers.append(server)
+
+        # Последовательно, как при загрузке папок по одной на каждый запуск страницы
+        clients = make_clients(servers, args.pool_size)
+        slowest = 0.0
+        started = time.perf_counter()
+        for client in clients:
+            mailbox_started = time.perf_counter()
+            for folder in FOLDERS:
+                client.get_emails(folder, limit=0)
+            slowest = max(slowest, time.perf_counter() - mailbox_started)
+        sequential = time.perf_counter() - started
+
+        result = MailIngestor(make_clients(servers, args.pool_size), max_workers=args.workers).ingest({'*': FOLDERS})
+
+    print(f"Ящиков: {args.mailboxes}, папок: {len(FOLDERS)}, писем: {len(result['emails'])}")
+    print(f"Последовательно:         {sequential:.2f} с")
+    print(f"Самый медленный ящик:    {slowest:.2f} с")
+    print(f"MailIngestor:            {result['seconds']:.2f} с (x{sequential / result['seconds']:.1f})")
+
+
+if __name__ == "__main__":
+    main()
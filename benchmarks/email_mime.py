@@ -0,0 +1,76 @@
+"""
+Бенчмарк разбора писем с большими вложениями
+
+Письмо с PDF вложением размером --attachment-mb разбирается:
+- прежним способом: email.message_from_bytes, затем walk() для текста и
+  для вложений с декодированием частей;
+- потоковым parse_message: текст до лимита, у вложений только имя и размер.
+Замеряются время разбора и пик памяти (tracemalloc) сверх самого письма.
+
+Запуск:
+    python benchmarks/email_mime.py --attachment-mb 20 --messages 5
+"""
+
+import argparse
+import email
+import os
+import re
+import sys
+import time
+import tracemalloc
+from typing import Callable, Tuple
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utilities', 'email_manager'))
+
+from fake_imap import make_message
+from mime_stream import parse_message
+
+
+def legacy_parse(raw: bytes) -> Tuple[str, list]:
+    """Прежние _extract_email_body и _get_attachments поверх message_from_bytes"""
+    message = email.message_from_bytes(raw)
+    body = ""
+    for part in message.walk():
+        if "attachment" in str(part.get("Content-Disposition", "")):
+            continue
+        if part.get_content_type() == "text/plain":
+            body = part.get_payload(decode=True).decode(part.get_content_charset() or 'utf-8', errors='ignore')
+            break
+        elif part.get_content_type() == "text/html" and not body:
+            html = part.get_payload(decode=True).decode(part.get_content_charset() or 'utf-8', errors='ignore')
+            body = re.sub('<[^<]+?>', '', html)
+    attachments = [part.get_filename() for part in message.walk()
+                   if "attachment" in str(part.get("Content-Disposition", "")) and part.get_filename()]
+    return body.strip(), attachments
+
+
+def measure(parse: Callable[[bytes], object], raw: bytes, messages: int) -> Tuple[float, float]:
+    started = time.perf_counter()
+    for _ in range(messages):
+        parse(raw)
+    seconds = (time.perf_counter() - started) / messages
+
+    tracemalloc.start()
+    parse(raw)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк разбора писем с большими вложениями")
+    parser.add_argument("--attachment-mb", type=int, default=20, help="Размер вложения, МБ")
+    parser.add_argument("--messages", type=int, default=5, help="Писем для замера времени")
+    args = parser.parse_args()
+
+    raw = make_message("Договор", "Добрый день! Договор во вложении. " * 20,
+                       attachments=[("contract.pdf", os.urandom(args.attachment_mb * 1024 * 1024))])
+    print(f"Письмо: {len(raw) / 1024 / 1024:.1f} МБ с вложением {args.attachment_mb} МБ")
+
+    for title, parse in (("message_from_bytes + walk()", legacy_parse), ("parse_message", parse_message)):
+        seconds, peak = measure(parse, raw, args.messages)
+        print(f"{title:<30} {seconds * 1000:8.1f} мс на письмо, пик памяти {peak:8.1f} МБ")
+
+
+if __name__ == "__main__":
+    main()
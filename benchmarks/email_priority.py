@@ -0,0 +1,106 @@
+"""
+Бенчмарк определения приоритета писем
+
+Сравнивает писем в секунду на смеси коротких деловых писем и длинных
+рассылок:
+- прежний способ: подстрока in для каждого ключевого слова по всему тексту;
+- PriorityClassifier.classify по письму и classify_batch пачкой;
+- то же с просмотром всего текста (scan_chars=0);
+- зависимость от числа ключевых слов: прежний способ замедляется с каждым
+  словом, одно выражение - почти нет.
+
+Запуск:
+    python benchmarks/email_priority.py --messages 2000 --newsletters 0.2
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, List
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utilities', 'email_manager'))
+
+from priority_classifier import HIGH_PRIORITY_KEYWORDS, MEDIUM_PRIORITY_KEYWORDS, PriorityClassifier
+
+WORDS = ("привет коллеги прошу посмотреть документ согласовать бюджет договор клиент сроки "
+         "newsletter sale offer discount weekly digest unsubscribe update team news").split()
+
+
+def legacy_priority(subject: str, body: str, high: List[str], medium: List[str]) -> str:
+    """Прежний EmailClient._determine_priority без проверки заголовков"""
+    text_to_check = (subject + " " + body).lower()
+    for keyword in high:
+        if keyword in text_to_check:
+            return "high"
+    for keyword in medium:
+        if keyword in text_to_check:
+            return "medium"
+    return "low"
+
+
+def make_messages(count: int, newsletters: float, seed: int = 1) -> List[Dict[str, str]]:
+    rng = random.Random(seed)
+    keywords = HIGH_PRIORITY_KEYWORDS + MEDIUM_PRIORITY_KEYWORDS
+    messages = []
+    for i in range(count):
+        if rng.random() < newsletters:
+            body = " ".join(rng.choice(WORDS) for _ in range(8000))
+        else:
+            body = " ".join(rng.choice(WORDS) for _ in range(80))
+            if rng.random() < 0.3:
+                body += f" {rng.choice(keywords)}"
+        messages.append({'subject': f"Письмо {i}", 'body': body})
+    return messages
+
+
+def throughput(run: Callable[[], None], count: int, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - started)
+    return count / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк определения приоритета писем")
+    parser.add_argument("--messages", type=int, default=2000, help="Писем в наборе")
+    parser.add_argument("--newsletters", type=float, default=0.2, help="Доля длинных рассылок (~60 КБ текста)")
+    parser.add_argument("--repeat", type=int, default=3, help="Повторов замера, берется лучший")
+    args = parser.parse_args()
+
+    messages = make_messages(args.messages, args.newsletters)
+    count = len(messages)
+    windowed = PriorityClassifier()
+    full = PriorityClassifier(scan_chars=0)
+
+    def legacy(high=HIGH_PRIORITY_KEYWORDS, medium=MEDIUM_PRIORITY_KEYWORDS):
+        return lambda: [legacy_priority(m['subject'], m['body'], high, medium) for m in messages]
+
+    def single(classifier):
+        return lambda: [classifier.classify(m['subject'], m['body']) for m in messages]
+
+    print(f"Писем: {count}, из них рассылок: {args.newsletters:.0%}")
+    results = [
+        ("Прежний способ (in по словам)", legacy()),
+        ("classify, весь текст", single(full)),
+        ("classify_batch, весь текст", lambda: full.classify_batch(messages)),
+        (f"classify, первые {windowed.scan_chars} символов", single(windowed)),
+        (f"classify_batch, первые {windowed.scan_chars} символов", lambda: windowed.classify_batch(messages)),
+    ]
+    for title, run in results:
+        print(f"{title:<42} {throughput(run, count, args.repeat):>10.0f} писем/с")
+
+    # Расширенный словарь: еще 80 слов, которых нет в тексте
+    extra = [f"ключслово{i}" for i in range(40)] + [f"keyword{i}" for i in range(40)]
+    high, medium = HIGH_PRIORITY_KEYWORDS + extra[:40], MEDIUM_PRIORITY_KEYWORDS + extra[40:]
+    large = PriorityClassifier(high, medium, scan_chars=0)
+    print(f"\nСловарь из {len(high) + len(medium)} ключевых слов, весь текст:")
+    print(f"{'Прежний способ (in по словам)':<42} {throughput(legacy(high, medium), count, args.repeat):>10.0f} писем/с")
+    print(f"{'classify_batch':<42} {throughput(lambda: large.classify_batch(messages), count, args.repeat):>10.0f} писем/с")
+
+
+if __name__ == "__main__":
+    main()
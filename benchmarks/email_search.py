@@ -0,0 +1,90 @@
+"""
+Бенчмарк локального хранилища почты
+
+Заполняет MailStore синтетическими письмами и замеряет запросы, которые
+выполняет email_manager: полнотекстовый поиск, фильтр по приоритету,
+счетчики и распределение по часам за период. Сервер не нужен.
+
+Запуск:
+    python benchmarks/email_search.py --messages 100000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utilities', 'email_manager'))
+
+from mail_store import MailStore
+
+WORDS = ("отчет встреча проект бюджет договор счет релиз сервер клиент задача срок презентация "
+         "invoice meeting deploy review contract budget release incident").split()
+
+
+def make_emails(count: int):
+    rng = random.Random(42)
+    start = datetime(2024, 1, 1, 8, 0)
+    for uid in range(1, count + 1):
+        sent = start + timedelta(minutes=uid * 3)
+        yield {
+            'id': str(uid), 'uid': uid,
+            'subject': " ".join(rng.choices(WORDS, k=4)),
+            'from': f"user{rng.randint(1, 500)}@example.com",
+            'to': "me@example.com",
+            'date': sent.isoformat(),
+            'body': " ".join(rng.choices(WORDS, k=60)) + f" номер{uid}",
+            'priority': rng.choice(["high", "medium", "low", "low"]),
+            'attachments': [f"file{uid}.pdf"] if uid % 10 == 0 else [],
+            'flags': ["\\Seen"] if rng.random() < 0.7 else []
+        }
+
+
+def timed(operation: Callable, repeat: int) -> Dict:
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = operation()
+        durations.append(time.perf_counter() - started)
+    return {'ms': statistics.median(durations) * 1000, 'rows': len(result)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк поиска по локальному хранилищу почты")
+    parser.add_argument("--messages", type=int, default=100000, help="Количество писем в хранилище")
+    parser.add_argument("--repeat", type=int, default=5, help="Повторов запроса, берется медиана")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = MailStore(os.path.join(directory, "mail.sqlite3"))
+
+        started = time.perf_counter()
+        store.save_messages("bench", "INBOX", make_emails(args.messages))
+        print(f"Загрузка {args.messages} писем: {time.perf_counter() - started:.1f} с, FTS5: {store.fts_enabled}")
+
+        week = date(2024, 1, 1) + timedelta(days=args.messages * 3 // 1440 - 7)
+        queries = {
+            "поиск: договор": lambda: store.list_messages("bench", "INBOX", limit=50, query="договор"),
+            "поиск: номер4242": lambda: store.list_messages("bench", "INBOX", limit=50, query="номер4242"),
+            "поиск: invoice budget": lambda: store.list_messages("bench", "INBOX", limit=50, query="invoice budget"),
+            "важные непрочитанные": lambda: store.list_messages("bench", "INBOX", limit=50, priority="high", read=False),
+            "счетчики за неделю": lambda: [store.counts("bench", "INBOX", since=week)],
+            "по часам за неделю": lambda: store.hourly_counts("bench", "INBOX", since=week),
+            "по часам за все время": lambda: store.hourly_counts("bench", "INBOX"),
+        }
+
+        print(f"{'Запрос':<26} {'мс':>8} {'строк':>6}")
+        for name, operation in queries.items():
+            result = timed(operation, args.repeat)
+            print(f"{name:<26} {result['ms']:>8.2f} {result['rows']:>6}")
+
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Бенчмарк холодного старта утилит
+
+Каждая utilities/*/app.py импортируется в отдельном свежем процессе
+(как при запуске streamlit run) в двух режимах:
+- lazy: обычный импорт, SDK openai и llm_client создаются при первом запросе;
+- eager: перед импортом загружаются openai и httpx и создается llm_client,
+  как это было при создании клиента во время импорта модуля.
+Разница между режимами - выигрыш отложенной инициализации.
+
+Запуск:
+    python benchmarks/import_time.py --repeat 5
+"""
+
+import argparse
+import glob
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Код, выполняемый в дочернем процессе: время импорта и загружен ли openai
+PROBE = """
+import importlib, json, sys, time
+sys.path[:0] = [{root!r}, {app_dir!r}]
+started = time.perf_counter()
+if {eager!r}:
+    import httpx, openai
+    from shared.llm_client import llm_client
+    llm_client.cache_stats()
+error = None
+try:
+    importlib.import_module({module!r})
+except Exception as e:
+    error = f"{{type(e).__name__}}: {{e}}"
+print(json.dumps({{
+    'seconds': time.perf_counter() - started,
+    'openai_loaded': 'openai' in sys.modules,
+    'error': error
+}}))
+"""
+
+
+def find_apps() -> List[str]:
+    return sorted(glob.glob(os.path.join(ROOT, 'utilities', '*', 'app.py')))
+
+
+def probe(app_path: str, eager: bool) -> Dict:
+    module = os.path.relpath(app_path, ROOT)[:-3].replace(os.sep, '.')
+    code = PROBE.format(root=ROOT, app_dir=os.path.dirname(app_path), module=module, eager=eager)
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def measure(app_path: str, repeat: int) -> Dict:
+    lazy = [probe(app_path, eager=False) for _ in range(repeat)]
+    eager = [probe(app_path, eager=True) for _ in range(repeat)]
+    return {
+        'app': os.path.basename(os.path.dirname(app_path)),
+        'lazy': statistics.median(r['seconds'] for r in lazy),
+        'eager': statistics.median(r['seconds'] for r in eager),
+        'openai_loaded': any(r['openai_loaded'] for r in lazy),
+        'error': lazy[-1]['error']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Время импорта utilities/*/app.py с отложенным llm_client")
+    parser.add_argument("--repeat", type=int, default=3, help="Запусков на режим, берется медиана")
+    parser.add_argument("--json", help="Сохранить результаты в JSON файл")
+    args = parser.parse_args()
+
+    results = [measure(app_path, args.repeat) for app_path in find_apps()]
+
+    print(f"{'Утилита':<24} {'lazy, с':>9} {'eager, с':>9} {'выигрыш, с':>11}  openai")
+    for r in results:
+        note = f"  ошибка импорта: {r['error']}" if r['error'] else ""
+        print(f"{r['app']:<24} {r['lazy']:>9.3f} {r['eager']:>9.3f} {r['eager'] - r['lazy']:>11.3f}  "
+              f"{'загружен' if r['openai_loaded'] else 'нет'}{note}")
+
+    lazy_total = sum(r['lazy'] for r in results)
+    eager_total = sum(r['eager'] for r in results)
+    print(f"{'Итого':<24} {lazy_total:>9.3f} {eager_total:>9.3f} {eager_total - lazy_total:>11.3f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
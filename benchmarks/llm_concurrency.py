@@ -0,0 +1,74 @@
+"""
+Бенчмарк конкурентности LLMClient
+
+Поднимает локальный фейковый эндпоинт chat completions с фиксированной
+задержкой и сравнивает время одного вызова analyze_text с временем
+N одновременных вызовов. При неблокирующем клиенте N вызовов должны
+завершаться примерно за время одного.
+
+Запуск:
+    python benchmarks/llm_concurrency.py --requests 20 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Dict
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from shared.fake_llm import FakeLLMServer
+from shared.llm_client import LLMClient
+
+
+async def run_benchmark(client: LLMClient, requests: int) -> Dict:
+    # Прогрев: установка соединения не должна попадать в замер
+    await client.analyze_text("warmup")
+
+    started = time.perf_counter()
+    await client.analyze_text("single")
+    single = time.perf_counter() - started
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*[
+        client.analyze_text(f"request {i}") for i in range(requests)
+    ])
+    concurrent = time.perf_counter() - started
+
+    await client.aclose()
+
+    errors = [r for r in results if r.startswith("Ошибка анализа")]
+    return {"single": single, "concurrent": concurrent, "errors": len(errors)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк конкурентных вызовов LLMClient")
+    parser.add_argument("--requests", type=int, default=20, help="Количество одновременных вызовов")
+    parser.add_argument("--latency", type=float, default=0.5, help="Задержка фейкового эндпоинта, сек")
+    args = parser.parse_args()
+
+    server = FakeLLMServer(latency=args.latency).start()
+
+    client = LLMClient(
+        api_key="sk-bench",
+        base_url=server.base_url,
+        max_connections=args.requests,
+        cache_enabled=False
+    )
+
+    try:
+        stats = asyncio.run(run_benchmark(client, args.requests))
+    finally:
+        server.stop()
+
+    print(f"Один вызов:              {stats['single']:.3f} с")
+    print(f"{args.requests} одновременных вызовов: {stats['concurrent']:.3f} с")
+    print(f"Отношение:               {stats['concurrent'] / stats['single']:.2f}x "
+          f"(последовательно было бы ~{args.requests}x)")
+    print(f"Ошибок:                  {stats['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Бенчмарк семантического кэша на воспроизводимой нагрузке
+
+Прогоняет последовательность промптов через SemanticCache при нескольких
+порогах близости и для каждого печатает долю попаданий, точность
+(попадание вернуло ответ на промпт той же группы) и сэкономленные токены.
+
+Нагрузка - JSONL файл со строками {"group": ..., "prompt": ...}; промпты
+одной группы считаются взаимозаменяемыми. Без файла генерируется
+синтетическая нагрузка: сводки писем, отличающиеся временем запроса
+и одним дополнительным малозначимым письмом.
+
+Запуск:
+    python benchmarks/semantic_cache_replay.py --thresholds 0.85,0.9,0.95
+    python benchmarks/semantic_cache_replay.py --workload data/workload.jsonl
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+from typing import Dict, List
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from shared.semantic_cache import SemanticCache
+from shared.tokens import estimate_tokens
+
+SUBJECTS = [
+    "Отчет за квартал", "Встреча по бюджету", "Релиз версии", "Счет на оплату",
+    "Планирование отпусков", "Инцидент на сервере", "Новый клиент", "Обучение сотрудников"
+]
+
+WORDS = (
+    "проект договор срок бюджет клиент сервер релиз задача отчет встреча оплата "
+    "согласование презентация поставщик тестирование миграция доступ заявка "
+    "контракт аудит склад маркетинг продажи найм увольнение офис ремонт"
+).split()
+
+def synthetic_workload(groups: int, repeats: int, seed: int = 42) -> List[Dict[str, str]]:
+    """Группы почти одинаковых промптов в перемешанном порядке"""
+    rng = random.Random(seed)
+    workload = []
+
+    for group in range(groups):
+        emails = [
+            f"От: colleague{group}_{i}@example.com\nТема: {rng.choice(SUBJECTS)} #{group}-{i}\n"
+            f"Текст: {' '.join(rng.sample(WORDS, 8))}"
+            for i in range(5)
+        ]
+        for _ in range(repeats):
+            extra = [
+                f"От: news@example.com\nТема: Рассылка\nТекст: Дайджест {rng.randint(1, 99)}"
+                for _ in range(rng.randint(0, 1))
+            ]
+            stamp = f"Запрос от {rng.randint(1, 28):02d}.06 {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}"
+            workload.append({
+                'group': str(group),
+                'prompt': "\n\n".join([stamp] + emails + extra)
+            })
+
+    rng.shuffle(workload)
+    return workload
+
+def load_workload(path: str) -> List[Dict[str, str]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def replay(workload: List[Dict[str, str]], threshold: float, max_entries: int,
+           response_tokens: int) -> Dict[str, float]:
+    cache = SemanticCache(threshold=threshold, max_entries=max_entries, ttl=0)
+    total_tokens = 0
+
+    for item in workload:
+        prompt_tokens = estimate_tokens(item['prompt'])
+        total_tokens += prompt_tokens + response_tokens
+
+        found = cache.lookup('replay', item['prompt'])
+        if found is None:
+            # Ответ помечаем группой промпта, чтобы проверить точность попаданий
+            cache.add('replay', item['prompt'], item['group'])
+            continue
+
+        cache.record_outcome(found[0] == item['group'])
+        cache.record_saving(prompt_tokens + response_tokens)
+
+    stats = cache.stats()
+    stats['total_tokens'] = total_tokens
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workload", help="JSONL файл с полями group и prompt")
+    parser.add_argument("--groups", type=int, default=40)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--thresholds", default="0.8,0.85,0.9,0.95,0.98")
+    parser.add_argument("--max-entries", type=int, default=1000)
+    parser.add_argument("--response-tokens", type=int, default=300,
+                        help="оценка длины ответа модели в токенах")
+    args = parser.parse_args()
+
+    workload = load_workload(args.workload) if args.workload else synthetic_workload(args.groups, args.repeats)
+    print(f"Промптов: {len(workload)}, групп: {len({item['group'] for item in workload})}")
+    print(f"{'порог':>6} {'попадания':>10} {'точность':>9} {'экономия токенов':>17}")
+
+    for threshold in (float(t) for t in args.thresholds.split(',')):
+        stats = replay(workload, threshold, args.max_entries, args.response_tokens)
+        accuracy = stats['accuracy']
+        print(
+            f"{threshold:>6.2f} {stats['hit_rate']:>10.1%} "
+            f"{accuracy if accuracy is not None else 0:>9.1%} "
+            f"{stats['tokens_saved'] / stats['total_tokens']:>17.1%}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,67 @@ import subprocess
 import sys
 from datetime import datetime
 
+from shared.telemetry import aggregate, default_log_path, load_records
+
+def show_llm_telemetry():
+    """Страница телеметрии вызовов LLM по журналу всех утилит"""
+    import pandas as pd
+    import plotly.express as px
+    
+    st.subheader("📈 Телеметрия LLM")
+    
+    log_path = default_log_path()
+    limit = st.slider("Последних вызовов:", 100, 20000, 5000, step=100)
+    records = load_records(log_path, limit)
+    
+    if not records:
+        st.info(f"Журнал телеметрии пуст: {log_path}")
+        return
+    
+    summary = aggregate(records)
+    api_calls = sum(s['api_calls'] for s in summary.values())
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Вызовов", len(records))
+    col2.metric("Запросов к API", api_calls)
+    col3.metric("Токенов", sum(s['prompt_tokens'] + s['completion_tokens'] for s in summary.values()))
+    col4.metric("Стоимость", f"${sum(s['cost_usd'] for s in summary.values()):.4f}")
+    
+    df = pd.DataFrame([
+        {
+            "Операция": operation,
+            "Вызовов": stats['calls'],
+            "Из кэша": stats['calls'] - stats['api_calls'],
+            "Ошибок": stats['errors'],
+            "Хеджировано": stats['hedged'],
+            "Токены промпта": stats['prompt_tokens'],
+            "Токены ответа": stats['completion_tokens'],
+            "Стоимость, $": round(stats['cost_usd'], 4),
+            "Задержка p50, с": stats['latency']['p50'],
+            "Задержка p95, с": stats['latency']['p95'],
+            "TTFB p95, с": stats['ttfb']['p95'],
+            "Очередь p95, с": stats['queue_wait']['p95']
+        }
+        for operation, stats in summary.items()
+    ]).sort_values("Стоимость, $", ascending=False)
+    st.dataframe(df, use_container_width=True, hide_index=True)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.plotly_chart(px.bar(df, x="Операция", y="Стоимость, $", title="Стоимость по операциям"),
+                        use_container_width=True)
+    with col2:
+        latency = pd.DataFrame(records)
+        st.plotly_chart(px.histogram(latency, x="latency", color="operation", nbins=40,
+                                     title="Распределение задержек, с"),
+                        use_container_width=True)
+    
+    errors = [r for r in records if r.get('error')]
+    if errors:
+        st.subheader("❌ Последние ошибки")
+        st.dataframe(pd.DataFrame(errors[-20:])[['timestamp', 'operation', 'error']],
+                     use_container_width=True, hide_index=True)
+
 def main():
     st.set_page_config(
         page_title="AI Assistant Utilities Suite",
@@ -79,6 +140,8 @@ def main():
     with st.sidebar:
         st.header("🚀 Навигация")
         
+        page = st.radio("Раздел:", ["🧰 Утилиты", "📈 Телеметрия LLM"], horizontal=True)
+        
         utilities = {
             "📧 Работа с почтой": {
                 "path": "utilities/email_manager",
@@ -183,6 +246,10 @@ def main():
             index=0
         )
     
+    if page == "📈 Телеметрия LLM":
+        show_llm_telemetry()
+        return
+    
     # Главное содержимое
     if selected_utility:
         utility_info = utilities[selected_utility]
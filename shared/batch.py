@@ -0,0 +1,322 @@
+"""
+Пакетный режим LLM: тысячи запросов одной отправкой вместо вызова на каждый
+
+Запросы записываются в JSONL в формате OpenAI Batch API, файл отправляется
+через подключаемый отправитель, после завершения результаты сопоставляются
+с запросами по custom_id. Манифест задания сохраняется на диск, поэтому
+результаты можно забрать и после перезапуска процесса.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .config import Config
+from .llm_cache import LLMCache
+from .tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+# Статусы Batch API, после которых результатов ждать не нужно
+FINAL_STATUSES = {'completed', 'failed', 'expired', 'cancelled'}
+
+def batch_dir() -> str:
+    return Config.LLM_BATCH_DIR or os.path.join(Config.DATA_DIR, 'batches')
+
+def read_jsonl(path: str) -> List[Dict[str, Any]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def write_jsonl(path: str, rows: List[Dict[str, Any]]):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+class BatchSubmitter(ABC):
+    """Отправитель пакетов: загрузка файла, статус задания и результаты"""
+
+    name = 'base'
+
+    @abstractmethod
+    async def submit(self, input_path: str) -> str:
+        """Отправить JSONL файл запросов, возвращает идентификатор задания"""
+
+    @abstractmethod
+    async def status(self, batch_id: str) -> str:
+        """Статус задания в терминах Batch API"""
+
+    @abstractmethod
+    async def results(self, batch_id: str) -> List[Dict[str, Any]]:
+        """Строки выходного файла: custom_id, response или error"""
+
+class OpenAIBatchSubmitter(BatchSubmitter):
+    """Отправка через OpenAI Batch API (окно выполнения 24 часа)"""
+
+    name = 'openai'
+
+    def __init__(self, client):
+        # client - LLMClient; его AsyncOpenAI привязан к event loop и берется внутри корутин
+        self.client = client
+
+    async def submit(self, input_path: str) -> str:
+        api = self.client._get_client()
+        with open(input_path, 'rb') as f:
+            uploaded = await api.files.create(file=f, purpose='batch')
+        batch = await api.batches.create(
+            input_file_id=uploaded.id, endpoint=BATCH_ENDPOINT, completion_window='24h'
+        )
+        return batch.id
+
+    async def status(self, batch_id: str) -> str:
+        return (await self.client._get_client().batches.retrieve(batch_id)).status
+
+    async def results(self, batch_id: str) -> List[Dict[str, Any]]:
+        api = self.client._get_client()
+        batch = await api.batches.retrieve(batch_id)
+        rows = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                content = await api.files.content(file_id)
+                rows.extend(json.loads(line) for line in content.text.splitlines() if line.strip())
+        return rows
+
+class LocalBatchSubmitter(BatchSubmitter):
+    """Локальная замена Batch API для тестов и офлайн прогонов
+
+    Выполняет запросы файла в фоне через обычный LLMClient с ограничением
+    параллельности и пишет выходной файл в формате Batch API. Запросы идут
+    мимо телеметрии клиента: вызовы пакета записывает LLMBatch при сборе
+    результатов, как и для Batch API.
+    """
+
+    name = 'local'
+
+    def __init__(self, client, max_parallel: int = 4):
+        # client - LLMClient, например направленный на shared.fake_llm
+        self.client = client
+        self.max_parallel = max_parallel
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def submit(self, input_path: str) -> str:
+        batch_id = f"local_batch_{uuid.uuid4().hex[:12]}"
+        self._tasks[batch_id] = asyncio.create_task(self._run(batch_id, read_jsonl(input_path)))
+        return batch_id
+
+    def _output_path(self, batch_id: str) -> str:
+        return os.path.join(batch_dir(), f"{batch_id}_output.jsonl")
+
+    async def _run(self, batch_id: str, requests: List[Dict[str, Any]]):
+        semaphore = asyncio.Semaphore(self.max_parallel)
+
+        async def execute(request: Dict[str, Any]) -> Dict[str, Any]:
+            body = request['body']
+            async with semaphore:
+                try:
+                    # Лимитер и повторы клиента без записи в телеметрию и кэш
+                    response = await self.client._create_completion(
+                        body['messages'], body.get('temperature', 0.7), body.get('max_tokens', 1000),
+                        model=body.get('model')
+                    )
+                except Exception as e:
+                    return {'custom_id': request['custom_id'], 'response': None,
+                            'error': {'message': str(e)}}
+
+            content = response.choices[0].message.content
+            usage = getattr(response, 'usage', None)
+            prompt_tokens = usage.prompt_tokens if usage else sum(
+                estimate_tokens(m.get('content') or '') for m in body['messages']
+            )
+            completion_tokens = usage.completion_tokens if usage else estimate_tokens(content or '')
+            return {
+                'custom_id': request['custom_id'],
+                'response': {
+                    'status_code': 200,
+                    'body': {
+                        'model': body.get('model'),
+                        'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}}],
+                        'usage': {
+                            'prompt_tokens': prompt_tokens,
+                            'completion_tokens': completion_tokens,
+                            'total_tokens': prompt_tokens + completion_tokens
+                        }
+                    }
+                },
+                'error': None
+            }
+
+        rows = await asyncio.gather(*[execute(request) for request in requests])
+        write_jsonl(self._output_path(batch_id), rows)
+
+    async def status(self, batch_id: str) -> str:
+        task = self._tasks.get(batch_id)
+        if task is None:
+            return 'completed' if os.path.exists(self._output_path(batch_id)) else 'failed'
+        if not task.done():
+            return 'in_progress'
+        return 'failed' if task.exception() else 'completed'
+
+    async def results(self, batch_id: str) -> List[Dict[str, Any]]:
+        path = self._output_path(batch_id)
+        return read_jsonl(path) if os.path.exists(path) else []
+
+class LLMBatch:
+    """Набор запросов одного пакетного задания
+
+    Запросы, ответ на которые уже есть в кэше LLMClient, в пакет не попадают.
+    Полученные ответы записываются в кэш, поэтому ночной прогон заодно
+    прогревает кэш для интерактивных утилит.
+    """
+
+    def __init__(self, client, submitter: BatchSubmitter, operation: str = 'batch'):
+        self.client = client
+        self.submitter = submitter
+        self.operation = operation
+
+        self.requests: List[Dict[str, Any]] = []
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.batch_id: Optional[str] = None
+
+    def add(self, messages: List[Dict[str, str]], temperature: float = 0.7, max_tokens: int = 1000,
+            custom_id: Optional[str] = None) -> str:
+        """Добавить запрос, возвращает custom_id для сопоставления результата"""
+        custom_id = custom_id or f"req-{len(self.requests) + len(self.results)}"
+        model = self.client.select_model(messages, max_tokens, self.operation)
+
+        if self.client.cache is not None:
+            cached = self.client.cache.get(LLMCache.make_key(model, messages, temperature, max_tokens))
+            if cached is not None:
+                self.results[custom_id] = {'content': cached, 'error': None}
+                return custom_id
+
+        self.requests.append({
+            'custom_id': custom_id,
+            'method': 'POST',
+            'url': BATCH_ENDPOINT,
+            'body': {'model': model, 'messages': messages, 'temperature': temperature, 'max_tokens': max_tokens}
+        })
+        return custom_id
+
+    def _manifest_path(self, batch_id: str) -> str:
+        return os.path.join(batch_dir(), f"{batch_id}.json")
+
+    async def submit(self) -> Optional[str]:
+        """Записать JSONL и отправить; None, если все ответы нашлись в кэше"""
+        if not self.requests:
+            return None
+
+        input_path = os.path.join(batch_dir(), f"{self.operation}_{uuid.uuid4().hex[:12]}_input.jsonl")
+        write_jsonl(input_path, self.requests)
+        self.batch_id = await self.submitter.submit(input_path)
+
+        with open(self._manifest_path(self.batch_id), 'w', encoding='utf-8') as f:
+            json.dump({
+                'batch_id': self.batch_id,
+                'submitter': self.submitter.name,
+                'operation': self.operation,
+                'input_path': input_path,
+                'requests': len(self.requests),
+                'submitted_at': datetime.now().isoformat(),
+                'submitted_ts': time.time()
+            }, f, ensure_ascii=False, indent=2)
+
+        logger.info(f"Пакет {self.batch_id}: отправлено {len(self.requests)} запросов, "
+                    f"{len(self.results)} взято из кэша")
+        return self.batch_id
+
+    async def wait(self, poll_interval: Optional[float] = None, timeout: Optional[float] = None) -> str:
+        """Опрос статуса задания до завершения, возвращает итоговый статус"""
+        poll_interval = poll_interval if poll_interval is not None else Config.LLM_BATCH_POLL_INTERVAL
+        started = time.monotonic()
+
+        while True:
+            status = await self.submitter.status(self.batch_id)
+            if status in FINAL_STATUSES:
+                return status
+            if timeout is not None and time.monotonic() - started > timeout:
+                raise TimeoutError(f"Пакет {self.batch_id} не завершился за {timeout} с (статус {status})")
+            await asyncio.sleep(poll_interval)
+
+    async def collect(self) -> Dict[str, Dict[str, Any]]:
+        """Забрать результаты, сопоставить по custom_id, записать в кэш и телеметрию"""
+        requests = {request['custom_id']: request['body'] for request in self.requests}
+        submitted_ts = None
+        if os.path.exists(self._manifest_path(self.batch_id)):
+            with open(self._manifest_path(self.batch_id), 'r', encoding='utf-8') as f:
+                submitted_ts = json.load(f).get('submitted_ts')
+
+        for row in await self.submitter.results(self.batch_id):
+            custom_id = row.get('custom_id')
+            response = row.get('response') or {}
+            body = response.get('body') or {}
+
+            if response.get('status_code') == 200 and body.get('choices'):
+                result = {'content': body['choices'][0]['message']['content'], 'error': None}
+            else:
+                error = row.get('error') or body.get('error') or {}
+                result = {'content': None, 'error': error.get('message') or f"HTTP {response.get('status_code')}"}
+            self.results[custom_id] = result
+
+            request = requests.get(custom_id)
+            if request is not None:
+                self._record(request, body.get('usage') or {}, result, submitted_ts)
+
+        # Запросы без строки в выходном файле считаем неудавшимися
+        for custom_id in requests:
+            self.results.setdefault(custom_id, {'content': None, 'error': 'Нет результата в выходном файле'})
+
+        return self.results
+
+    def _record(self, request: Dict[str, Any], usage: Dict[str, Any], result: Dict[str, Any],
+                submitted_ts: Optional[float]):
+        if result['content'] is not None and self.client.cache is not None:
+            key = LLMCache.make_key(request['model'], request['messages'],
+                                    request['temperature'], request['max_tokens'])
+            self.client.cache.set(key, result['content'])
+
+        call = self.client.telemetry.start(self.operation, request['model'], stream=False)
+        call['source'] = 'batch'
+        call['prompt_tokens'] = usage.get('prompt_tokens', 0)
+        call['completion_tokens'] = usage.get('completion_tokens', 0)
+        call['error'] = result['error']
+        self.client.telemetry.finish(
+            call, latency=time.time() - submitted_ts if submitted_ts is not None else None
+        )
+
+    async def run(self, poll_interval: Optional[float] = None,
+                  timeout: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """Отправить, дождаться и забрать результаты"""
+        if await self.submit() is None:
+            return self.results
+
+        status = await self.wait(poll_interval, timeout)
+        if status != 'completed':
+            logger.warning(f"Пакет {self.batch_id} завершился со статусом {status}")
+        return await self.collect()
+
+    @classmethod
+    async def resume(cls, client, submitter: BatchSubmitter, batch_id: str,
+                     poll_interval: Optional[float] = None,
+                     timeout: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """Забрать результаты задания, отправленного в другом процессе"""
+        batch = cls(client, submitter)
+        batch.batch_id = batch_id
+
+        manifest_path = batch._manifest_path(batch_id)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            batch.operation = manifest.get('operation', batch.operation)
+            if os.path.exists(manifest.get('input_path', '')):
+                batch.requests = read_jsonl(manifest['input_path'])
+
+        await batch.wait(poll_interval, timeout)
+        return await batch.collect()
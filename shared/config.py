@@ -13,6 +13,61 @@ class Config:
     OPENAI_API_KEY = config('OPENAI_API_KEY', default='')
     OPENAI_MODEL = config('OPENAI_MODEL', default='gpt-3.5-turbo')
     
+    # Кэш ответов LLM
+    LLM_CACHE_ENABLED = config('LLM_CACHE_ENABLED', default=True, cast=bool)
+    LLM_CACHE_TTL = config('LLM_CACHE_TTL', default=86400, cast=int)
+    LLM_CACHE_MAX_ENTRIES = config('LLM_CACHE_MAX_ENTRIES', default=5000, cast=int)
+    
+    # Map-reduce анализ больших входных данных
+    LLM_CHUNK_TOKENS = config('LLM_CHUNK_TOKENS', default=3000, cast=int)
+    LLM_MAP_PARALLELISM = config('LLM_MAP_PARALLELISM', default=4, cast=int)
+    # Бюджет токенов на письма или задачи в одном промпте (0 - LLM_CHUNK_TOKENS)
+    LLM_PROMPT_BUDGET = config('LLM_PROMPT_BUDGET', default=0, cast=int)
+    
+    # Лимиты OpenAI аккаунта (0 - без ограничения) и повторы при 429
+    LLM_RPM_LIMIT = config('LLM_RPM_LIMIT', default=500, cast=int)
+    LLM_TPM_LIMIT = config('LLM_TPM_LIMIT', default=200000, cast=int)
+    LLM_MAX_RETRIES = config('LLM_MAX_RETRIES', default=5, cast=int)
+    LLM_BACKOFF_BASE = config('LLM_BACKOFF_BASE', default=1.0, cast=float)
+    LLM_BACKOFF_MAX = config('LLM_BACKOFF_MAX', default=60.0, cast=float)
+    
+    # Объединение одинаковых одновременных запросов к LLM
+    LLM_SINGLE_FLIGHT = config('LLM_SINGLE_FLIGHT', default=True, cast=bool)
+    
+    # Семантический кэш для почти одинаковых промптов
+    LLM_SEMANTIC_CACHE_ENABLED = config('LLM_SEMANTIC_CACHE_ENABLED', default=False, cast=bool)
+    LLM_SEMANTIC_THRESHOLD = config('LLM_SEMANTIC_THRESHOLD', default=0.95, cast=float)
+    LLM_SEMANTIC_MAX_ENTRIES = config('LLM_SEMANTIC_MAX_ENTRIES', default=2000, cast=int)
+    
+    # Запись пар запрос-ответ LLM в JSONL для офлайн воспроизведения
+    LLM_RECORD_PATH = config('LLM_RECORD_PATH', default='')
+    
+    # Телеметрия вызовов LLM (журнал по умолчанию - data/llm_telemetry.jsonl)
+    LLM_TELEMETRY_ENABLED = config('LLM_TELEMETRY_ENABLED', default=True, cast=bool)
+    LLM_TELEMETRY_PATH = config('LLM_TELEMETRY_PATH', default='')
+    
+    # Выбор модели для каждого вызова (иначе всегда OPENAI_MODEL)
+    LLM_ROUTER_ENABLED = config('LLM_ROUTER_ENABLED', default=False, cast=bool)
+    LLM_ROUTER_MODELS = config('LLM_ROUTER_MODELS', default='gpt-4o-mini,gpt-4o')
+    LLM_ROUTER_QUALITY_MODEL = config('LLM_ROUTER_QUALITY_MODEL', default='gpt-4o')
+    LLM_ROUTER_QUALITY_OPERATIONS = config(
+        'LLM_ROUTER_QUALITY_OPERATIONS', default='create_action_items,generate_meeting_agenda'
+    )
+    LLM_LATENCY_TARGET = config('LLM_LATENCY_TARGET', default=0.0, cast=float)
+    
+    # Пакетный режим для ночных и еженедельных массовых анализов
+    LLM_BATCH_SUBMITTER = config('LLM_BATCH_SUBMITTER', default='openai')
+    LLM_BATCH_POLL_INTERVAL = config('LLM_BATCH_POLL_INTERVAL', default=60.0, cast=float)
+    LLM_BATCH_DIR = config('LLM_BATCH_DIR', default='')
+    
+    # Дедлайн вызова LLM и пауза между фрагментами потока, сек (0 - без ограничения)
+    LLM_REQUEST_TIMEOUT = config('LLM_REQUEST_TIMEOUT', default=60.0, cast=float)
+    LLM_STREAM_IDLE_TIMEOUT = config('LLM_STREAM_IDLE_TIMEOUT', default=30.0, cast=float)
+    
+    # Хеджирование: второй запрос, если первый не ответил за p95 задержки операции
+    LLM_HEDGE_ENABLED = config('LLM_HEDGE_ENABLED', default=False, cast=bool)
+    LLM_HEDGE_MIN_SAMPLES = config('LLM_HEDGE_MIN_SAMPLES', default=20, cast=int)
+    
     # Telegram
     TELEGRAM_BOT_TOKEN = config('TELEGRAM_BOT_TOKEN', default='')
     TELEGRAM_CHAT_ID = config('TELEGRAM_CHAT_ID', default='')
@@ -22,6 +77,28 @@ class Config:
     EMAIL_PASSWORD = config('EMAIL_PASSWORD', default='')
     EMAIL_IMAP_SERVER = config('EMAIL_IMAP_SERVER', default='imap.gmail.com')
     EMAIL_IMAP_PORT = config('EMAIL_IMAP_PORT', default=993, cast=int)
+    EMAIL_IMAP_SSL = config('EMAIL_IMAP_SSL', default=True, cast=bool)
+    # Пул IMAP сессий: число сессий на ящик и время простоя до закрытия, сек
+    EMAIL_POOL_SIZE = config('EMAIL_POOL_SIZE', default=2, cast=int)
+    EMAIL_POOL_IDLE_TIMEOUT = config('EMAIL_POOL_IDLE_TIMEOUT', default=300.0, cast=float)
+    # Писем в одной команде FETCH
+    EMAIL_FETCH_BATCH_SIZE = config('EMAIL_FETCH_BATCH_SIZE', default=50, cast=int)
+    # preview - заголовки, структура и первые EMAIL_PREVIEW_BYTES байт текста; full - письма целиком
+    EMAIL_FETCH_MODE = config('EMAIL_FETCH_MODE', default='preview')
+    EMAIL_PREVIEW_BYTES = config('EMAIL_PREVIEW_BYTES', default=2048, cast=int)
+    # Сколько символов текста сохранять при разборе полного письма; вложения не декодируются
+    EMAIL_BODY_MAX_CHARS = config('EMAIL_BODY_MAX_CHARS', default=100000, cast=int)
+    # Инкрементальная синхронизация по UID с локальным хранилищем (по умолчанию data/email_store.sqlite3)
+    EMAIL_SYNC_ENABLED = config('EMAIL_SYNC_ENABLED', default=True, cast=bool)
+    EMAIL_STORE_PATH = config('EMAIL_STORE_PATH', default='')
+    # Несколько ящиков: JSON файл с дополнительными ящиками, папки для загрузки и число потоков
+    EMAIL_ACCOUNTS_FILE = config('EMAIL_ACCOUNTS_FILE', default='')
+    EMAIL_SYNC_FOLDERS = config('EMAIL_SYNC_FOLDERS', default='INBOX,Sent')
+    EMAIL_INGEST_WORKERS = config('EMAIL_INGEST_WORKERS', default=8, cast=int)
+    # IMAP IDLE: новые письма приходят уведомлением сервера; период переотправки IDLE и проверки страницей, сек
+    EMAIL_IDLE_ENABLED = config('EMAIL_IDLE_ENABLED', default=True, cast=bool)
+    EMAIL_IDLE_RENEW_INTERVAL = config('EMAIL_IDLE_RENEW_INTERVAL', default=1500.0, cast=float)
+    EMAIL_PUSH_CHECK_INTERVAL = config('EMAIL_PUSH_CHECK_INTERVAL', default=2.0, cast=float)
     
     # YouTrack
     YOUTRACK_URL = config('YOUTRACK_URL', default='')
@@ -79,7 +156,22 @@ class Config:
                 'email_user': cls.EMAIL_USER,
                 'email_password': cls.EMAIL_PASSWORD,
                 'imap_server': cls.EMAIL_IMAP_SERVER,
-                'imap_port': cls.EMAIL_IMAP_PORT
+                'imap_port': cls.EMAIL_IMAP_PORT,
+                'imap_ssl': cls.EMAIL_IMAP_SSL,
+                'imap_pool_size': cls.EMAIL_POOL_SIZE,
+                'imap_pool_idle_timeout': cls.EMAIL_POOL_IDLE_TIMEOUT,
+                'imap_fetch_batch_size': cls.EMAIL_FETCH_BATCH_SIZE,
+                'email_fetch_mode': cls.EMAIL_FETCH_MODE,
+                'email_preview_bytes': cls.EMAIL_PREVIEW_BYTES,
+                'email_body_max_chars': cls.EMAIL_BODY_MAX_CHARS,
+                'email_sync_enabled': cls.EMAIL_SYNC_ENABLED,
+                'email_store_path': cls.EMAIL_STORE_PATH or os.path.join(cls.DATA_DIR, 'email_store.sqlite3'),
+                'email_accounts_file': cls.EMAIL_ACCOUNTS_FILE,
+                'email_sync_folders': [f.strip() for f in cls.EMAIL_SYNC_FOLDERS.split(',') if f.strip()],
+                'email_ingest_workers': cls.EMAIL_INGEST_WORKERS,
+                'email_idle_enabled': cls.EMAIL_IDLE_ENABLED,
+                'email_idle_renew_interval': cls.EMAIL_IDLE_RENEW_INTERVAL,
+                'email_push_check_interval': cls.EMAIL_PUSH_CHECK_INTERVAL
             },
             'task_manager': {
                 'youtrack_url': cls.YOUTRACK_URL,
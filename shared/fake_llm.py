@@ -0,0 +1,323 @@
+"""
+Офлайн бэкенд LLM: локальный сервер chat completions, запись и воспроизведение
+
+Сервер говорит на протоколе OpenAI, поэтому LLMClient подключается к нему
+через base_url без изменений в коде. Задержка, скорость генерации и доля
+ошибок настраиваются, ответы берутся из записанных пар запрос-ответ
+или генерируются детерминированно.
+
+Запуск отдельным процессом:
+    python -m shared.fake_llm --port 8765 --latency 0.3 --tokens-per-second 50
+    python -m shared.fake_llm --replay data/llm_recording.jsonl
+После этого OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+from .llm_cache import LLMCache
+from .tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Ответчик получает тело запроса и возвращает текст ответа или None (нет ответа)
+Responder = Callable[[Dict[str, Any]], Optional[str]]
+
+def echo_responder(request: Dict[str, Any]) -> str:
+    """Детерминированный ответ, зависящий только от содержимого запроса"""
+    last = request.get('messages', [{}])[-1].get('content') or ''
+    digest = hashlib.sha1(last.encode('utf-8')).hexdigest()[:8]
+    return f"Тестовый ответ {digest} на запрос из {len(last)} символов."
+
+def split_tokens(text: str) -> List[str]:
+    """Разбиение ответа на фрагменты потоковой выдачи (слово с пробелами)"""
+    return re.findall(r'\s*\S+\s*', text) or [text]
+
+class LLMRecorder:
+    """Запись пар запрос-ответ реальных вызовов в JSONL"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(self, model: str, messages: List[Dict[str, str]], temperature: float,
+               max_tokens: int, response: str, latency: Optional[float] = None):
+        entry = {
+            'model': model,
+            'messages': messages,
+            'temperature': temperature,
+            'max_tokens': max_tokens,
+            'response': response,
+            'latency': round(latency, 4) if latency is not None else None,
+            'recorded_at': datetime.now().isoformat()
+        }
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+class ReplayResponder:
+    """Ответы из записи LLMRecorder по точному совпадению запроса
+
+    Если запрос не найден и strict=False, используется fallback.
+    """
+
+    def __init__(self, path: str, strict: bool = True, fallback: Responder = echo_responder):
+        self.strict = strict
+        self.fallback = fallback
+        self.records: Dict[str, Dict[str, Any]] = {}
+
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.records[self._key(entry)] = entry
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(request: Dict[str, Any]) -> str:
+        return LLMCache.make_key(
+            request.get('model', ''), request.get('messages', []),
+            request.get('temperature', 0.7), request.get('max_tokens', 1000)
+        )
+
+    def __call__(self, request: Dict[str, Any]) -> Optional[str]:
+        entry = self.records.get(self._key(request))
+        if entry is not None:
+            self.hits += 1
+            return entry['response']
+
+        self.misses += 1
+        return None if self.strict else self.fallback(request)
+
+class FakeLLMServer:
+    """Локальный эндпоинт /v1/chat/completions в отдельном потоке
+
+    latency - задержка до первого фрагмента ответа, сек
+    tokens_per_second - скорость генерации, 0 - мгновенно
+    error_rate - доля запросов, получающих error_status (по умолчанию 429)
+    stream_error_after - после скольких фрагментов потоковый ответ обрывается ошибкой
+    """
+
+    def __init__(self, latency: float = 0.0, tokens_per_second: float = 0.0,
+                 error_rate: float = 0.0, error_status: int = 429,
+                 responder: Optional[Responder] = None, host: str = "127.0.0.1",
+                 port: int = 0, seed: Optional[int] = None, stream_error_after: Optional[int] = None):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.stream_error_after = stream_error_after
+        self.responder = responder or echo_responder
+        self.host = host
+        self.port = port
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    def start(self) -> 'FakeLLMServer':
+        self._server = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_port
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> 'FakeLLMServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'errors': self.errors,
+                'max_in_flight': self.max_in_flight
+            }
+
+    def _begin(self) -> bool:
+        """Учет запроса, возвращает True, если нужно ответить ошибкой"""
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+            return failed
+
+    def _end(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _token_delay(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def _make_handler(self):
+        server = self
+
+        class FakeChatHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+
+                failed = server._begin()
+                try:
+                    time.sleep(server.latency)
+
+                    if failed:
+                        self._send_error(server.error_status, "Fake error injected", "rate_limit_exceeded")
+                        return
+
+                    content = server.responder(request)
+                    if content is None:
+                        self._send_error(404, "No recorded response for request", "not_found")
+                        return
+
+                    if request.get("stream"):
+                        self._send_stream(request, content)
+                    else:
+                        self._send_completion(request, content)
+                finally:
+                    server._end()
+
+            def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+                body = json.dumps(payload, ensure_ascii=False).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_error(self, status: int, message: str, code: str):
+                self._send_json(
+                    status,
+                    {"error": {"message": message, "type": "fake_error", "code": code}},
+                    # Короткая подсказка, чтобы повторы в тестах не затягивались
+                    {"retry-after-ms": "10"} if status == 429 else None
+                )
+
+            def _send_completion(self, request: Dict[str, Any], content: str):
+                completion_tokens = len(split_tokens(content))
+                time.sleep(server._token_delay() * completion_tokens)
+
+                prompt_tokens = sum(
+                    estimate_tokens(m.get("content") or "") for m in request.get("messages", [])
+                )
+                self._send_json(200, {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "fake"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop"
+                    }],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens
+                    }
+                })
+
+            def _write_chunk(self, data: str):
+                encoded = data.encode()
+                self.wfile.write(f"{len(encoded):x}\r\n".encode() + encoded + b"\r\n")
+                self.wfile.flush()
+
+            def _send_stream(self, request: Dict[str, Any], content: str):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                for i, token in enumerate(split_tokens(content)):
+                    if i == server.stream_error_after:
+                        error = {"error": {"message": "Fake stream error injected", "type": "fake_error",
+                                           "code": "server_error"}}
+                        self._write_chunk(f"data: {json.dumps(error)}\n\n")
+                        break
+                    if i:
+                        time.sleep(server._token_delay())
+                    chunk = {
+                        "id": "chatcmpl-fake",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": request.get("model", "fake"),
+                        "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]
+                    }
+                    self._write_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n")
+                else:
+                    self._write_chunk("data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+            def log_message(self, format, *args):
+                pass
+
+        return FakeChatHandler
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальный фейковый эндпоинт OpenAI chat completions")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка до первого фрагмента, сек")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="скорость генерации, 0 - мгновенно")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов с ошибкой")
+    parser.add_argument("--error-status", type=int, default=429)
+    parser.add_argument("--replay", help="JSONL запись LLMRecorder для воспроизведения")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    responder = ReplayResponder(args.replay, strict=False) if args.replay else None
+    server = FakeLLMServer(
+        latency=args.latency, tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate, error_status=args.error_status,
+        responder=responder, host=args.host, port=args.port, seed=args.seed
+    ).start()
+
+    print(f"Фейковый LLM эндпоинт: {server.base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
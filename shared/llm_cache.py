@@ -0,0 +1,139 @@
+"""
+Персистентный кэш ответов LLM в SQLite
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+class LLMCache:
+    """Кэш ответов модели с ключом по содержимому запроса, TTL и LRU вытеснением"""
+
+    def __init__(self, path: Optional[str] = None, max_entries: Optional[int] = None,
+                 default_ttl: Optional[int] = None):
+        self.path = path or os.path.join(Config.DATA_DIR, 'llm_cache.sqlite3')
+        self.max_entries = max_entries if max_entries is not None else Config.LLM_CACHE_MAX_ENTRIES
+        self.default_ttl = default_ttl if default_ttl is not None else Config.LLM_CACHE_TTL
+
+        self.hits = 0
+        self.misses = 0
+
+        # Streamlit выполняет скрипты в разных потоках, поэтому одно
+        # соединение защищаем блокировкой
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                expires_at REAL
+            )
+        """)
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache(last_access)"
+        )
+        self._connection.commit()
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        """Хэш запроса: одинаковые параметры дают одинаковый ключ"""
+        payload = json.dumps({
+            'model': model,
+            'messages': messages,
+            'temperature': temperature,
+            'max_tokens': max_tokens
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Получить ответ из кэша или None, если его нет или он устарел"""
+        now = time.time()
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT response, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None or (row[1] is not None and row[1] <= now):
+                if row is not None:
+                    self._connection.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._connection.commit()
+                self.misses += 1
+                return None
+
+            self._connection.execute(
+                "UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self._connection.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, response: str, ttl: Optional[int] = None):
+        """Сохранить ответ; ttl в секундах, 0 или меньше - без срока жизни"""
+        ttl = self.default_ttl if ttl is None else ttl
+        now = time.time()
+        expires_at = now + ttl if ttl and ttl > 0 else None
+
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, created_at, last_access, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, response, now, now, expires_at)
+            )
+            self._evict()
+            self._connection.commit()
+
+    def _evict(self):
+        """Удаление устаревших записей и давно не использованных сверх лимита"""
+        self._connection.execute(
+            "DELETE FROM llm_cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        )
+
+        count = self._connection.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        overflow = count - self.max_entries
+        if self.max_entries > 0 and overflow > 0:
+            self._connection.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+                (overflow,)
+            )
+            logger.debug(f"Вытеснено из кэша LLM: {overflow}")
+
+    def clear(self):
+        """Очистка кэша и счетчиков"""
+        with self._lock:
+            self._connection.execute("DELETE FROM llm_cache")
+            self._connection.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика попаданий в кэш"""
+        with self._lock:
+            entries = self._connection.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'entries': entries,
+            'max_entries': self.max_entries
+        }
+
+    def close(self):
+        """Закрытие соединения с базой"""
+        with self._lock:
+            self._connection.close()
@@ -2,65 +2,849 @@
 Общий клиент для работы с LLM (OpenAI GPT)
 """
 
-import openai
-from typing import List, Dict, Any, Optional
+import asyncio
+import threading
+import time
+from datetime import datetime
+import weakref
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, AsyncIterator, Callable, Type, Union
 import logging
 from decouple import config
 
+from .config import Config
+from .llm_cache import LLMCache
+from .semantic_cache import SemanticCache
+from .fake_llm import LLMRecorder
+from .telemetry import LLMTelemetry, default_log_path
+from .model_router import ModelRouter
+from .batch import BatchSubmitter, LLMBatch, LocalBatchSubmitter, OpenAIBatchSubmitter
+from .schemas import (
+    ActionItemList, TaskAnalysis, StructuredOutputError, parse_structured, schema_instructions
+)
+from pydantic import BaseModel
+from .rate_limiter import RateLimiter, parse_retry_after, backoff_delay
+from .single_flight import SingleFlight
+from .tokens import estimate_tokens, pack_chunks
+from .prompt_packer import clean_body, pack_items, render_item
+
+if TYPE_CHECKING:
+    import openai
+
 logger = logging.getLogger(__name__)
 
+SYSTEM_PROMPT = "Ты - умный помощник для анализа данных."
+
+MAP_CONTEXT = """
+Это фрагмент {index} из {total} большого набора данных.
+Составь подробную промежуточную сводку фрагмента: сохрани важные факты,
+имена, даты, сроки и то, что требует действий. Результат будет объединен
+со сводками других фрагментов.
+"""
+
+REDUCE_CONTEXT = """
+Ниже промежуточные сводки частей одного большого набора данных.
+Объедини их в единый ответ, не теряя важных деталей.
+"""
+
+EMAILS_CONTEXT = """
+Проанализируй входящие письма и создай краткую сводку. 
+Выдели:
+1. Самые важные письма, требующие внимания
+2. Письма, которые требуют ответа
+3. Общую статистику
+4. Рекомендации по действиям
+
+Ответь на русском языке в структурированном виде.
+"""
+
+TELEGRAM_CONTEXT = """
+Проанализируй непрочитанные сообщения в Telegram.
+Выдели:
+1. Сообщения, требующие срочного ответа
+2. Важную информацию
+3. Статистику по отправителям
+4. Рекомендации по действиям
+
+Ответь на русском языке в структурированном виде.
+"""
+
+# SDK openai (вместе с httpx) импортируется при первом запросе к модели,
+# а не при импорте модуля: это самая долгая часть холодного старта утилит
+
+def retryable_errors() -> tuple:
+    """Ошибки, после которых запрос имеет смысл повторить"""
+    import openai
+    return (
+        openai.RateLimitError,
+        openai.APIConnectionError,
+        openai.InternalServerError
+    )
+
+class DeadlineExceeded(TimeoutError):
+    """Вызов LLM не уложился в дедлайн"""
+
+# Общий для всех клиентов процесса лимитер запросов и токенов в минуту
+rate_limiter = RateLimiter(Config.LLM_RPM_LIMIT, Config.LLM_TPM_LIMIT)
+
+# Общий реестр выполняющихся запросов для объединения одинаковых
+single_flight = SingleFlight()
+
+# Телеметрия всех вызовов LLM процесса
+llm_telemetry = LLMTelemetry(default_log_path() if Config.LLM_TELEMETRY_ENABLED else None)
+
 class LLMClient:
-    def __init__(self):
-        self.client = openai.OpenAI(
-            api_key=config('OPENAI_API_KEY', default='')
-        )
-        self.model = config('OPENAI_MODEL', default='gpt-3.5-turbo')
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None,
+                 base_url: Optional[str] = None, max_connections: Optional[int] = None,
+                 cache_enabled: Optional[bool] = None, chunk_tokens: Optional[int] = None,
+                 max_parallel: Optional[int] = None, limiter: Optional[RateLimiter] = None,
+                 semantic_cache: Optional[SemanticCache] = None,
+                 recorder: Optional[LLMRecorder] = None, telemetry: Optional[LLMTelemetry] = None,
+                 router: Optional[ModelRouter] = None):
+        self.api_key = api_key if api_key is not None else config('OPENAI_API_KEY', default='')
+        self.model = model or config('OPENAI_MODEL', default='gpt-3.5-turbo')
+        self.base_url = base_url or config('OPENAI_BASE_URL', default='') or None
+        self.max_connections = max_connections or config('LLM_MAX_CONNECTIONS', default=20, cast=int)
+        
+        # Пул соединений httpx привязан к event loop, поэтому на каждый цикл
+        # событий держим свой AsyncOpenAI с keep-alive соединениями
+        self._clients = weakref.WeakKeyDictionary()
+        
+        if cache_enabled is None:
+            cache_enabled = Config.LLM_CACHE_ENABLED
+        self.cache = LLMCache() if cache_enabled else None
+        
+        # Необязательный второй уровень: ответы на почти одинаковые промпты
+        if semantic_cache is None and Config.LLM_SEMANTIC_CACHE_ENABLED:
+            semantic_cache = SemanticCache()
+        self.semantic_cache = semantic_cache
         
-    async def analyze_text(self, text: str, context: str = "") -> str:
-        """Анализ текста с помощью LLM"""
+        # Параметры map-reduce режима для больших входных данных
+        self.chunk_tokens = chunk_tokens or Config.LLM_CHUNK_TOKENS
+        self.max_parallel = max_parallel or Config.LLM_MAP_PARALLELISM
+        # Бюджет промпта, который делится между письмами и задачами
+        self.prompt_budget = Config.LLM_PROMPT_BUDGET or self.chunk_tokens
+        
+        # Повторы выполняем сами, чтобы учитывать общий лимитер процесса
+        self.limiter = limiter or rate_limiter
+        self.max_retries = Config.LLM_MAX_RETRIES
+        
+        # Одинаковые одновременные запросы (вкладки, перезапуски скрипта) выполняются один раз
+        self.single_flight = single_flight if Config.LLM_SINGLE_FLIGHT else None
+        
+        # Запись реальных ответов для офлайн воспроизведения через shared.fake_llm
+        if recorder is None and Config.LLM_RECORD_PATH:
+            recorder = LLMRecorder(Config.LLM_RECORD_PATH)
+        self.recorder = recorder
+        
+        self.telemetry = telemetry or llm_telemetry
+        
+        # Модель на каждый вызов выбирает маршрутизатор, без него используется self.model
+        if router is None and Config.LLM_ROUTER_ENABLED:
+            router = ModelRouter()
+        self.router = router
+        self.latency_target = Config.LLM_LATENCY_TARGET or None
+        
+        # Второй запрос, если первый не ответил за p95 времени ответа операции
+        self.hedge_enabled = Config.LLM_HEDGE_ENABLED
+        self.hedge_min_samples = Config.LLM_HEDGE_MIN_SAMPLES
+    
+    def _get_client(self) -> 'openai.AsyncOpenAI':
+        """Асинхронный клиент OpenAI для текущего event loop"""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        
+        if client is None:
+            import httpx
+            import openai
+            
+            http_client = openai.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+            client = openai.AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                http_client=http_client,
+                max_retries=0
+            )
+            self._clients[loop] = client
+        
+        return client
+    
+    async def aclose(self):
+        """Закрытие пула соединений текущего event loop"""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
+    
+    async def complete(self, messages: List[Dict[str, str]], temperature: float = 0.7,
+                       max_tokens: int = 1000, cache_ttl: Optional[int] = None,
+                       operation: Optional[str] = None, latency_target: Optional[float] = None,
+                       response_format: Optional[Dict[str, Any]] = None,
+                       cache_if: Optional[Callable[[str], bool]] = None,
+                       deadline: Optional[float] = None) -> str:
+        """Неблокирующий запрос chat completion, ошибки пробрасываются вызывающему
+        
+        cache_ttl - время жизни ответа в кэше в секундах, 0 - не использовать кэш
+        operation - имя вызывающего помощника для телеметрии и выбора модели
+        latency_target - желаемое время ответа в секундах для выбора модели
+        response_format - формат ответа API, например {"type": "json_object"}
+        cache_if - проверка ответа перед записью в кэш (не кэшировать невалидные)
+        deadline - предельное время вызова в секундах вместе с очередью и повторами,
+        по умолчанию LLM_REQUEST_TIMEOUT; при превышении DeadlineExceeded
+        """
+        model = self.select_model(messages, max_tokens, operation, latency_target)
+        call = self.telemetry.start(operation, model, stream=False)
+        timeout = self._timeout(deadline)
+        call['_deadline_at'] = time.monotonic() + timeout if timeout else None
         try:
-            messages = [
-                {"role": "system", "content": f"Ты - умный помощник для анализа данных. {context}"},
-                {"role": "user", "content": text}
-            ]
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=0.7,
-                max_tokens=1000
+            return await self._with_deadline(
+                self._complete(messages, temperature, max_tokens, cache_ttl, call, response_format, cache_if),
+                timeout
             )
+        except BaseException as e:
+            call['error'] = self._describe_error(e)
+            raise
+        finally:
+            self.telemetry.finish(call)
+    
+    async def _complete(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int,
+                        cache_ttl: Optional[int], call: Dict[str, Any],
+                        response_format: Optional[Dict[str, Any]] = None,
+                        cache_if: Optional[Callable[[str], bool]] = None) -> str:
+        model = call['model']
+        use_cache = self.cache is not None and cache_ttl != 0
+        key = LLMCache.make_key(model, messages, temperature, max_tokens)
+        
+        if use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                call['source'] = 'cache'
+                return cached
+        
+        similar = self._semantic_lookup(model, messages, temperature, max_tokens, cache_ttl)
+        if similar is not None:
+            call['source'] = 'semantic_cache'
+            return similar
+        
+        # Если запрос выполнит другой вызов, этот лишь дождется его результата
+        call['source'] = 'single_flight'
+        
+        async def fetch() -> str:
+            call['source'] = 'api'
+            started = time.perf_counter()
+            response = await self._hedged_completion(messages, temperature, max_tokens, call=call, model=model,
+                                                     response_format=response_format)
+            self.telemetry.first_byte(call)
+            content = response.choices[0].message.content
+            
+            if self.recorder is not None and content is not None:
+                self.recorder.record(model, messages, temperature, max_tokens, content,
+                                     time.perf_counter() - started)
+            
+            if content is None or (cache_if is not None and not cache_if(content)):
+                return content
+            
+            if use_cache:
+                self.cache.set(key, content, ttl=cache_ttl)
+            self._semantic_store(model, messages, temperature, max_tokens, cache_ttl, content)
+            
+            return content
+        
+        if self.single_flight is None:
+            return await fetch()
+        return await self.single_flight.do(key, fetch)
+    
+    async def complete_stream(self, messages: List[Dict[str, str]], temperature: float = 0.7,
+                              max_tokens: int = 1000, cache_ttl: Optional[int] = None,
+                              operation: Optional[str] = None,
+                              latency_target: Optional[float] = None,
+                              deadline: Optional[float] = None) -> AsyncIterator[str]:
+        """Потоковый запрос chat completion: фрагменты ответа выдаются по мере генерации
+        
+        deadline ограничивает время до первого фрагмента, дальше паузы между
+        фрагментами ограничены LLM_STREAM_IDLE_TIMEOUT.
+        """
+        model = self.select_model(messages, max_tokens, operation, latency_target)
+        call = self.telemetry.start(operation, model, stream=True)
+        timeout = self._timeout(deadline)
+        call['_deadline_at'] = time.monotonic() + timeout if timeout else None
+        tokens = self._complete_stream(messages, temperature, max_tokens, cache_ttl, call)
+        try:
+            while True:
+                if call['ttfb'] is None:
+                    limit = call['_deadline_at'] - time.monotonic() if timeout else None
+                else:
+                    limit = Config.LLM_STREAM_IDLE_TIMEOUT or None
+                try:
+                    token = await self._with_deadline(tokens.__anext__(), limit)
+                except StopAsyncIteration:
+                    break
+                self.telemetry.first_byte(call)
+                yield token
+        except BaseException as e:
+            call['error'] = self._describe_error(e)
+            raise
+        finally:
+            await tokens.aclose()
+            self.telemetry.finish(call)
+    
+    async def _complete_stream(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int,
+                               cache_ttl: Optional[int], call: Dict[str, Any]) -> AsyncIterator[str]:
+        model = call['model']
+        use_cache = self.cache is not None and cache_ttl != 0
+        key = LLMCache.make_key(model, messages, temperature, max_tokens)
+        
+        if use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                call['source'] = 'cache'
+                yield cached
+                return
+        
+        similar = self._semantic_lookup(model, messages, temperature, max_tokens, cache_ttl)
+        if similar is not None:
+            call['source'] = 'semantic_cache'
+            yield similar
+            return
+        
+        call['source'] = 'single_flight'
+        
+        async def fetch() -> AsyncIterator[str]:
+            call['source'] = 'api'
+            started = time.perf_counter()
+            stream = await self._hedged_completion(messages, temperature, max_tokens, stream=True,
+                                                   call=call, model=model)
+            
+            parts = []
+            try:
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+            finally:
+                # При отмене или дедлайне соединение закрывается сразу, а не сборщиком мусора
+                await stream.close()
+            
+            # В потоковом режиме usage не приходит, оцениваем фактический расход сами
+            # Токенизатор модели, выбранной маршрутизатором для этого вызова
+            prompt_tokens = self._estimate_prompt_tokens(messages, model)
+            completion_tokens = estimate_tokens("".join(parts), model)
+            self.limiter.record_usage(prompt_tokens + max_tokens, prompt_tokens + completion_tokens)
+            call['prompt_tokens'] = prompt_tokens
+            call['completion_tokens'] = completion_tokens
+            
+            if self.recorder is not None and parts:
+                self.recorder.record(model, messages, temperature, max_tokens, "".join(parts),
+                                     time.perf_counter() - started)
+            if use_cache and parts:
+                self.cache.set(key, "".join(parts), ttl=cache_ttl)
+            if parts:
+                self._semantic_store(model, messages, temperature, max_tokens, cache_ttl, "".join(parts))
+        
+        tokens = fetch() if self.single_flight is None else self.single_flight.stream(key, fetch)
+        async for token in tokens:
+            yield token
+    
+    def _semantic_lookup(self, model: str, messages: List[Dict[str, str]], temperature: float,
+                         max_tokens: int, cache_ttl: Optional[int]) -> Optional[str]:
+        """Ответ на похожий промпт из семантического кэша"""
+        if self.semantic_cache is None or cache_ttl == 0:
+            return None
+        
+        namespace = SemanticCache.make_namespace(model, messages, temperature, max_tokens)
+        found = self.semantic_cache.lookup(namespace, messages[-1]['content'])
+        if found is None:
+            return None
+        
+        response, similarity = found
+        self.semantic_cache.record_saving(
+            self._estimate_prompt_tokens(messages, model) + estimate_tokens(response, model)
+        )
+        logger.info(f"Семантический кэш: ответ на похожий промпт (близость {similarity:.3f})")
+        return response
+    
+    def _semantic_store(self, model: str, messages: List[Dict[str, str]], temperature: float,
+                        max_tokens: int, cache_ttl: Optional[int], response: str):
+        if self.semantic_cache is None or cache_ttl == 0:
+            return
+        namespace = SemanticCache.make_namespace(model, messages, temperature, max_tokens)
+        self.semantic_cache.add(namespace, messages[-1]['content'], response, ttl=cache_ttl)
+    
+    def select_model(self, messages: List[Dict[str, str]], max_tokens: int,
+                     operation: Optional[str] = None, latency_target: Optional[float] = None) -> str:
+        """Модель для вызова: решение маршрутизатора или модель клиента"""
+        if self.router is None:
+            return self.model
+        decision = self.router.route(
+            self._estimate_prompt_tokens(messages), max_tokens, operation,
+            latency_target if latency_target is not None else self.latency_target
+        )
+        return decision['model']
+    
+    @staticmethod
+    def _timeout(deadline: Optional[float]) -> Optional[float]:
+        """Дедлайн вызова в секундах, None - без ограничения"""
+        timeout = deadline if deadline is not None else Config.LLM_REQUEST_TIMEOUT
+        return timeout if timeout and timeout > 0 else None
+    
+    @staticmethod
+    async def _with_deadline(awaitable, timeout: Optional[float]):
+        """Ожидание с ограничением времени; по истечении DeadlineExceeded, ожидание отменяется"""
+        if timeout is None:
+            return await awaitable
+        # asyncio.wait_for, а не asyncio.timeout: последний есть только с Python 3.11
+        try:
+            return await asyncio.wait_for(awaitable, max(timeout, 0))
+        except DeadlineExceeded:
+            raise
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"LLM не ответила за {max(timeout, 0):.1f} с") from None
+    
+    @staticmethod
+    def _describe_error(error: BaseException) -> str:
+        if isinstance(error, (asyncio.CancelledError, GeneratorExit)):
+            return 'cancelled'
+        return f"{type(error).__name__}: {error}"
+    
+    def _estimate_prompt_tokens(self, messages: List[Dict[str, str]], model: Optional[str] = None) -> int:
+        """Токены промпта по токенизатору model (по умолчанию модель клиента)"""
+        model = model or self.model
+        return sum(estimate_tokens(m.get("content") or "", model) for m in messages)
+    
+    async def _create_completion(self, messages: List[Dict[str, str]], temperature: float,
+                                 max_tokens: int, stream: bool = False, call: Optional[Dict[str, Any]] = None,
+                                 model: Optional[str] = None, response_format: Optional[Dict[str, Any]] = None):
+        """Запрос к API через лимитер RPM/TPM с повторами при 429 и временных ошибках
+        
+        Задержка между попытками растет экспоненциально со случайным джиттером,
+        подсказка сервера retry-after имеет приоритет. Ожидание в лимитере,
+        число повторов и расход токенов записываются в call.
+        """
+        import openai
+        
+        call = call if call is not None else {}
+        deadline_at = call.get('_deadline_at')
+        retryable = retryable_errors()
+        extra = {'response_format': response_format} if response_format else {}
+        # OpenAI учитывает в TPM и промпт, и max_tokens ответа
+        estimated = self._estimate_prompt_tokens(messages, model) + max_tokens
+        attempt = 0
+        
+        while True:
+            call['queue_wait'] = call.get('queue_wait', 0.0) + await self.limiter.acquire(estimated)
+            
+            if deadline_at is not None and not stream:
+                # Остаток дедлайна уходит в таймаут HTTP, чтобы соединение закрылось вовремя
+                extra['timeout'] = max(deadline_at - time.monotonic(), 0.001)
+            
+            try:
+                response = await self._get_client().chat.completions.create(
+                    model=model or self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stream=stream,
+                    **extra
+                )
+            
+            except retryable as e:
+                # Исчерпанную квоту повторами не исправить
+                if attempt >= self.max_retries or getattr(e, 'code', None) == 'insufficient_quota':
+                    raise
+                
+                headers = getattr(getattr(e, 'response', None), 'headers', None)
+                delay = backoff_delay(attempt, Config.LLM_BACKOFF_BASE, Config.LLM_BACKOFF_MAX,
+                                      parse_retry_after(headers))
+                # Повтор, который начнется уже после дедлайна, бесполезен
+                if deadline_at is not None and time.monotonic() + delay >= deadline_at:
+                    raise
+                if isinstance(e, openai.RateLimitError):
+                    # Притормаживаем все запросы процесса, а не только этот
+                    self.limiter.pause(delay)
+                
+                attempt += 1
+                call['retries'] = attempt
+                logger.warning(f"Повтор запроса к LLM {attempt}/{self.max_retries} через {delay:.1f} с: {e}")
+                await asyncio.sleep(delay)
+                continue
+            
+            if not stream:
+                usage = getattr(response, 'usage', None)
+                self.limiter.record_usage(estimated, usage.total_tokens if usage else None)
+                call['prompt_tokens'] = getattr(usage, 'prompt_tokens', 0) if usage else estimated - max_tokens
+                call['completion_tokens'] = getattr(usage, 'completion_tokens', 0) if usage else 0
+            
+            return response
+    
+    def _hedge_delay(self, call: Dict[str, Any]) -> Optional[float]:
+        """Через сколько секунд отправлять второй запрос: p95 TTFB операции или None"""
+        if not self.hedge_enabled:
+            return None
+        delay = self.telemetry.ttfb_percentile(call.get('operation'), 95, self.hedge_min_samples)
+        deadline_at = call.get('_deadline_at')
+        if delay is None or (deadline_at is not None and time.monotonic() + delay >= deadline_at):
+            return None
+        return delay
+    
+    async def _hedged_completion(self, messages: List[Dict[str, str]], temperature: float,
+                                 max_tokens: int, stream: bool = False, call: Optional[Dict[str, Any]] = None,
+                                 model: Optional[str] = None, response_format: Optional[Dict[str, Any]] = None):
+        """Запрос с хеджированием: если первая попытка не ответила за p95 времени
+        ответа операции, отправляется вторая и берется первый успешный ответ
+        
+        Проигравшая попытка отменяется, ее поток закрывается.
+        """
+        call = call if call is not None else {}
+        delay = self._hedge_delay(call)
+        
+        def attempt():
+            return self._create_completion(messages, temperature, max_tokens, stream, call, model, response_format)
+        
+        if delay is None:
+            return await attempt()
+        
+        tasks = [asyncio.ensure_future(attempt())]
+        winner = None
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                call['hedged'] = True
+                logger.info(f"Нет ответа {call.get('operation')} за {delay:.2f} с, отправлен второй запрос")
+                tasks.append(asyncio.ensure_future(attempt()))
             
-            return response.choices[0].message.content
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        winner = task
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if task is winner:
+                    continue
+                if not task.done():
+                    task.cancel()
+                elif stream and not task.cancelled() and task.exception() is None:
+                    await task.result().close()
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Счетчики попаданий и промахов кэша ответов"""
+        if self.cache is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.cache.stats()}
+    
+    def semantic_cache_stats(self) -> Dict[str, Any]:
+        """Попадания, точность и сэкономленные токены семантического кэша"""
+        if self.semantic_cache is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.semantic_cache.stats()}
+    
+    def telemetry_summary(self) -> Dict[str, Any]:
+        """Вызовы, токены, стоимость и гистограммы задержек по операциям процесса"""
+        return self.telemetry.summary()
+    
+    def single_flight_stats(self) -> Dict[str, Any]:
+        """Сколько одинаковых одновременных запросов было объединено"""
+        if self.single_flight is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.single_flight.stats()}
+        
+    async def analyze_text(self, text: str, context: str = "", cache_ttl: Optional[int] = None,
+                           operation: str = "analyze_text", raise_errors: bool = False) -> str:
+        """Анализ текста с помощью LLM
+        
+        Ошибка возвращается текстом "Ошибка анализа: ...", при raise_errors=True - выбрасывается.
+        """
+        try:
+            return await self.complete(self._build_messages(text, context), cache_ttl=cache_ttl,
+                                       operation=operation)
             
         except Exception as e:
             logger.error(f"Ошибка при анализе текста: {e}")
+            if raise_errors:
+                raise
             return f"Ошибка анализа: {str(e)}"
     
-    async def summarize_emails(self, emails: List[Dict]) -> str:
-        """Создание сводки по письмам"""
-        emails_text = "\n\n".join([
-            f"От: {email.get('from', 'Unknown')}\n"
-            f"Тема: {email.get('subject', 'No subject')}\n"
-            f"Дата: {email.get('date', 'Unknown')}\n"
-            f"Содержание: {email.get('body', 'No content')[:200]}..."
-            for email in emails
+    async def analyze_text_stream(self, text: str, context: str = "", cache_ttl: Optional[int] = None,
+                                  operation: str = "analyze_text", raise_errors: bool = False) -> AsyncIterator[str]:
+        """Потоковый анализ текста: асинхронный итератор по токенам ответа
+        
+        Ошибка, в том числе посреди ответа, выдается последним фрагментом
+        "Ошибка анализа: ...", при raise_errors=True - выбрасывается.
+        """
+        try:
+            async for token in self.complete_stream(self._build_messages(text, context), cache_ttl=cache_ttl,
+                                                    operation=operation):
+                yield token
+        
+        except Exception as e:
+            logger.error(f"Ошибка при потоковом анализе текста: {e}")
+            if raise_errors:
+                raise
+            yield f"Ошибка анализа: {str(e)}"
+    
+    async def complete_structured(self, text: str, context: str, schema: Type[BaseModel],
+                                  max_tokens: int = 1500, operation: Optional[str] = None) -> BaseModel:
+        """Ответ в виде JSON по pydantic схеме с проверкой и одной попыткой исправления
+        
+        Невалидный ответ не кэшируется. Если и исправленный ответ не проходит
+        проверку, выбрасывается StructuredOutputError.
+        """
+        messages = self._build_messages(text, f"{context}\n{schema_instructions(schema)}")
+        
+        def is_valid(raw: str) -> bool:
+            try:
+                parse_structured(raw, schema)
+                return True
+            except ValueError:
+                return False
+        
+        raw = await self.complete(messages, temperature=0.2, max_tokens=max_tokens, operation=operation,
+                                  response_format={"type": "json_object"}, cache_if=is_valid)
+        try:
+            return parse_structured(raw, schema)
+        except ValueError as e:
+            logger.warning(f"Ответ {operation or 'complete'} не прошел проверку схемы, исправляем: {e}")
+            error = e
+        
+        repair_messages = messages + [
+            {"role": "assistant", "content": raw or ""},
+            {"role": "user", "content": (
+                f"Ответ не прошел проверку схемы:\n{error}\n"
+                "Верни исправленный JSON объект строго по схеме, без пояснений."
+            )}
+        ]
+        raw = await self.complete(repair_messages, temperature=0, max_tokens=max_tokens, cache_ttl=0,
+                                  operation=operation, response_format={"type": "json_object"})
+        try:
+            return parse_structured(raw, schema)
+        except ValueError as e:
+            raise StructuredOutputError(f"Ответ не соответствует схеме {schema.__name__}: {e}") from e
+    
+    async def _structured(self, text: str, context: str, schema: Type[BaseModel], operation: str,
+                          empty: Dict[str, Any]) -> Dict[str, Any]:
+        """Структурированный ответ словарем; при ошибке пустой результат с полем error"""
+        try:
+            result = await self.complete_structured(text, context, schema, operation=operation)
+            return {**result.model_dump(mode='json'), 'error': None}
+        
+        except Exception as e:
+            logger.error(f"Ошибка структурированного ответа {operation}: {e}")
+            return {**empty, 'error': f"Ошибка анализа: {str(e)}"}
+    
+    def batch(self, operation: str = "batch", submitter: Optional[BatchSubmitter] = None) -> LLMBatch:
+        """Новое пакетное задание: запросы копятся через add() и отправляются одним файлом"""
+        if submitter is None:
+            if Config.LLM_BATCH_SUBMITTER == 'local':
+                submitter = LocalBatchSubmitter(self, self.max_parallel)
+            else:
+                submitter = OpenAIBatchSubmitter(self)
+        return LLMBatch(self, submitter, operation)
+    
+    async def analyze_batch(self, texts: List[str], context: str = "", operation: str = "analyze_batch",
+                            submitter: Optional[BatchSubmitter] = None, poll_interval: Optional[float] = None,
+                            timeout: Optional[float] = None) -> List[str]:
+        """Пакетный анализ текстов без интерактивной задержки, ответы в порядке текстов"""
+        batch = self.batch(operation, submitter)
+        ids = [batch.add(self._build_messages(text, context)) for text in texts]
+        
+        try:
+            results = await batch.run(poll_interval, timeout)
+        except Exception as e:
+            logger.error(f"Ошибка пакетного анализа: {e}")
+            return [f"Ошибка анализа: {str(e)}"] * len(texts)
+        
+        return [
+            results[i]['content'] if results[i]['error'] is None else f"Ошибка анализа: {results[i]['error']}"
+            for i in ids
+        ]
+    
+    async def _respond(self, text: str, context: str, stream: bool,
+                       operation: str = "analyze_text", raise_errors: bool = False) -> Union[str, AsyncIterator[str]]:
+        """Полный ответ или, при stream=True, асинхронный итератор по токенам"""
+        if stream:
+            return self.analyze_text_stream(text, context, operation=operation, raise_errors=raise_errors)
+        return await self.analyze_text(text, context, operation=operation, raise_errors=raise_errors)
+    
+    @staticmethod
+    def _build_messages(text: str, context: str = "") -> List[Dict[str, str]]:
+        """Сообщения запроса с системным промптом и контекстом задачи"""
+        return [
+            {"role": "system", "content": f"{SYSTEM_PROMPT} {context}"},
+            {"role": "user", "content": text}
+        ]
+    
+    async def map_reduce(self, items: List[str], context: str = "", chunk_tokens: Optional[int] = None,
+                         max_parallel: Optional[int] = None, map_max_tokens: int = 500,
+                         operation: str = "map_reduce") -> Dict[str, Any]:
+        """Map-reduce анализ: элементы упаковываются в куски по бюджету токенов,
+        куски обрабатываются параллельно, затем промежуточные сводки объединяются
+        
+        Возвращает итоговый текст и отчет: число кусков и длительность этапов.
+        """
+        started = time.perf_counter()
+        reduce_input, report = await self._map_stage(items, context, chunk_tokens, max_parallel,
+                                                     map_max_tokens, operation)
+        
+        reduce_started = time.perf_counter()
+        report['summary'] = await self.complete(
+            self._build_messages(reduce_input, f"{REDUCE_CONTEXT}\n{context}"), operation=operation
+        )
+        report['reduce_seconds'] = round(time.perf_counter() - reduce_started, 3)
+        report['total_seconds'] = round(time.perf_counter() - started, 3)
+        
+        self._log_map_reduce(report)
+        return report
+    
+    async def _map_stage(self, items: List[str], context: str, chunk_tokens: Optional[int] = None,
+                         max_parallel: Optional[int] = None, map_max_tokens: int = 500,
+                         operation: str = "map_reduce"):
+        """Map этап: параллельная обработка кусков, возвращает вход для reduce и отчет"""
+        chunk_tokens = chunk_tokens or self.chunk_tokens
+        semaphore = asyncio.Semaphore(max_parallel or self.max_parallel)
+        started = time.perf_counter()
+        
+        async def summarize_chunk(index: int, total: int, chunk: str) -> str:
+            async with semaphore:
+                map_context = f"{MAP_CONTEXT.format(index=index, total=total)}\n{context}"
+                return await self.complete(self._build_messages(chunk, map_context), max_tokens=map_max_tokens,
+                                           operation=operation)
+        
+        chunks = pack_chunks(items, chunk_tokens, model=self.model)
+        partials = await asyncio.gather(*[
+            summarize_chunk(i + 1, len(chunks), chunk) for i, chunk in enumerate(chunks)
         ])
         
-        context = """
-        Проанализируй входящие письма и создай краткую сводку. 
-        Выдели:
-        1. Самые важные письма, требующие внимания
-        2. Письма, которые требуют ответа
-        3. Общую статистику
-        4. Рекомендации по действиям
+        # Если промежуточные сводки сами не помещаются в бюджет, сворачиваем их еще раз
+        rounds = 1
+        partials = [f"Сводка части {i + 1}:\n{p}" for i, p in enumerate(partials)]
+        while len(partials) > 1 and estimate_tokens("\n\n".join(partials), self.model) > chunk_tokens:
+            groups = pack_chunks(partials, chunk_tokens, model=self.model)
+            if len(groups) == len(partials):
+                break
+            partials = await asyncio.gather(*[
+                summarize_chunk(i + 1, len(groups), group) for i, group in enumerate(groups)
+            ])
+            partials = [f"Сводка части {i + 1}:\n{p}" for i, p in enumerate(partials)]
+            rounds += 1
         
-        Ответь на русском языке в структурированном виде.
+        report = {
+            'items': len(items),
+            'chunks': len(chunks),
+            'map_rounds': rounds,
+            'map_seconds': round(time.perf_counter() - started, 3)
+        }
+        return "\n\n".join(partials), report
+    
+    @staticmethod
+    def _log_map_reduce(report: Dict[str, Any]):
+        logger.info(
+            f"Map-reduce: {report['items']} элементов, {report['chunks']} кусков, "
+            f"map {report['map_seconds']} с, reduce {report['reduce_seconds']} с"
+        )
+    
+    async def analyze_items(self, items: List[str], context: str, stream: bool = False,
+                            operation: str = "analyze_items", raise_errors: bool = False) -> Union[str, AsyncIterator[str]]:
+        """Анализ списка элементов: одним запросом, если помещаются в бюджет, иначе map-reduce
+        
+        raise_errors=True - выбрасывать ошибку вместо текста "Ошибка анализа: ..."
         """
+        text = "\n\n".join(items)
+        if estimate_tokens(text, self.model) <= self.chunk_tokens:
+            return await self._respond(text, context, stream, operation, raise_errors)
+        
+        if stream:
+            return self._map_reduce_stream(items, context, operation, raise_errors)
+        return await self._map_reduce_text(items, context, operation, raise_errors)
+    
+    async def _map_reduce_text(self, items: List[str], context: str, operation: str,
+                               raise_errors: bool = False) -> str:
+        try:
+            result = await self.map_reduce(items, context, operation=operation)
+            return result['summary']
         
-        return await self.analyze_text(emails_text, context)
+        except Exception as e:
+            logger.error(f"Ошибка при map-reduce анализе: {e}")
+            if raise_errors:
+                raise
+            return f"Ошибка анализа: {str(e)}"
+    
+    async def _map_reduce_stream(self, items: List[str], context: str, operation: str,
+                                 raise_errors: bool = False) -> AsyncIterator[str]:
+        """Map-reduce с потоковой выдачей результата reduce этапа"""
+        try:
+            reduce_input, report = await self._map_stage(items, context, operation=operation)
+            
+            reduce_started = time.perf_counter()
+            messages = self._build_messages(reduce_input, f"{REDUCE_CONTEXT}\n{context}")
+            async for token in self.complete_stream(messages, operation=operation):
+                yield token
+            report['reduce_seconds'] = round(time.perf_counter() - reduce_started, 3)
+            self._log_map_reduce(report)
+        
+        except Exception as e:
+            logger.error(f"Ошибка при map-reduce анализе: {e}")
+            if raise_errors:
+                raise
+            yield f"Ошибка анализа: {str(e)}"
+    
+    async def summarize_emails(self, emails: List[Dict], stream: bool = False) -> Union[str, AsyncIterator[str]]:
+        """Создание сводки по письмам"""
+        packed = self.pack_emails(emails)
+        self._log_packing("summarize_emails", packed)
+        return await self.analyze_items(packed['items'], EMAILS_CONTEXT, stream, "summarize_emails")
+    
+    def pack_emails(self, emails: List[Dict], budget: Optional[int] = None,
+                    max_chunks: Optional[int] = None) -> Dict[str, Any]:
+        """Письма в бюджете токенов: важные получают большую долю, отчет по каждому письму
+        
+        budget - бюджет одного промпта; много писем делятся на куски map-reduce,
+        max_chunks ограничивает их число.
+        """
+        return pack_items([self.email_item(email) for email in emails], budget or self.prompt_budget, self.model,
+                          max_chunks=max_chunks)
+    
+    @staticmethod
+    def email_item(email: Dict) -> Dict[str, Any]:
+        """Письмо для упаковщика промпта: заголовок, тело без цитат и подписи, приоритет"""
+        body = email.get('body') or 'No content'
+        return {
+            'header': (
+                f"От: {email.get('from', 'Unknown')}\n"
+                f"Тема: {email.get('subject', 'No subject')}\n"
+                f"Дата: {email.get('date', 'Unknown')}\n"
+                f"Содержание: "
+            ),
+            'body': clean_body(body),
+            'original_body': body,
+            'priority': email.get('priority')
+        }
+    
+    @staticmethod
+    def format_email(email: Dict) -> str:
+        """Представление одного письма в промпте"""
+        return render_item(LLMClient.email_item(email))
+    
+    @staticmethod
+    def _log_packing(operation: str, packed: Dict[str, Any]):
+        logger.info(
+            f"Упаковка {operation}: {len(packed['items'])} элементов, ~{packed['tokens']} из "
+            f"{packed['budget']} токенов ({packed['chunks']} кусков), обрезано {packed['truncated']}, "
+            f"отброшено {packed['dropped']}"
+        )
+        logger.debug(f"Токены по элементам {operation}: {[e['body_tokens'] for e in packed['report']]}")
     
-    async def analyze_calendar_events(self, events: List[Dict]) -> str:
+    async def analyze_calendar_events(self, events: List[Dict], stream: bool = False) -> Union[str, AsyncIterator[str]]:
         """Анализ событий календаря"""
         events_text = "\n\n".join([
             f"Событие: {event.get('title', 'Без названия')}\n"
@@ -81,41 +865,34 @@ class LLMClient:
         Ответь на русском языке.
         """
         
-        return await self.analyze_text(events_text, context)
+        return await self._respond(events_text, context, stream, "analyze_calendar_events")
     
-    async def analyze_telegram_messages(self, messages: List[Dict]) -> str:
+    async def analyze_telegram_messages(self, messages: List[Dict], stream: bool = False) -> Union[str, AsyncIterator[str]]:
         """Анализ сообщений Telegram"""
-        messages_text = "\n\n".join([
+        messages_items = [self.format_telegram_message(msg) for msg in messages]
+        return await self.analyze_items(messages_items, TELEGRAM_CONTEXT, stream, "analyze_telegram_messages")
+    
+    @staticmethod
+    def format_telegram_message(msg: Dict) -> str:
+        """Представление сообщения Telegram в промпте"""
+        return (
             f"От: {msg.get('from', 'Unknown')}\n"
             f"Время: {msg.get('timestamp', 'Unknown')}\n"
             f"Сообщение: {msg.get('text', 'No text')}"
-            for msg in messages
-        ])
-        
-        context = """
-        Проанализируй непрочитанные сообщения в Telegram.
-        Выдели:
-        1. Сообщения, требующие срочного ответа
-        2. Важную информацию
-        3. Статистику по отправителям
-        4. Рекомендации по действиям
+        )
+    
+    async def analyze_tasks(self, tasks: List[Dict], stream: bool = False,
+                            structured: bool = False) -> Union[str, AsyncIterator[str], Dict[str, Any]]:
+        """Анализ задач из YouTrack
         
-        Ответь на русском языке в структурированном виде.
+        При structured=True возвращается словарь по схеме TaskAnalysis:
+        tasks, status_counts, recommendations, summary и error.
         """
-        
-        return await self.analyze_text(messages_text, context)
-    
-    async def analyze_tasks(self, tasks: List[Dict]) -> str:
-        """Анализ задач из YouTrack"""
-        tasks_text = "\n\n".join([
-            f"Задача: {task.get('title', 'Без названия')}\n"
-            f"Статус: {task.get('status', 'Unknown')}\n"
-            f"Приоритет: {task.get('priority', 'Normal')}\n"
-            f"Исполнитель: {task.get('assignee', 'Не назначен')}\n"
-            f"Дедлайн: {task.get('due_date', 'Не указан')}\n"
-            f"Описание: {task.get('description', 'Нет описания')[:100]}..."
-            for task in tasks
-        ])
+        # Структурированный ответ - один промпт, текстовый отчет при необходимости идет через map-reduce
+        packed = pack_items([self.task_item(task) for task in tasks], self.prompt_budget, self.model,
+                            max_chunks=1 if structured else None)
+        self._log_packing("analyze_tasks", packed)
+        tasks_items = packed['items']
         
         context = """
         Проанализируй задачи из системы управления задачами.
@@ -128,9 +905,30 @@ class LLMClient:
         Ответь на русском языке в структурированном виде.
         """
         
-        return await self.analyze_text(tasks_text, context)
+        if structured:
+            return await self._structured(
+                "\n\n".join(tasks_items), context, TaskAnalysis, "analyze_tasks",
+                {'tasks': [], 'status_counts': {}, 'recommendations': [], 'summary': ''}
+            )
+        return await self.analyze_items(tasks_items, context, stream, "analyze_tasks")
     
-    async def generate_meeting_agenda(self, meeting_info: Dict) -> str:
+    @staticmethod
+    def task_item(task: Dict) -> Dict[str, Any]:
+        """Задача для упаковщика промпта"""
+        return {
+            'header': (
+                f"Задача: {task.get('title', 'Без названия')}\n"
+                f"Статус: {task.get('status', 'Unknown')}\n"
+                f"Приоритет: {task.get('priority', 'Normal')}\n"
+                f"Исполнитель: {task.get('assignee', 'Не назначен')}\n"
+                f"Дедлайн: {task.get('due_date', 'Не указан')}\n"
+                f"Описание: "
+            ),
+            'body': (task.get('description') or 'Нет описания').strip(),
+            'priority': task.get('priority')
+        }
+    
+    async def generate_meeting_agenda(self, meeting_info: Dict, stream: bool = False) -> Union[str, AsyncIterator[str]]:
         """Генерация повестки встречи"""
         meeting_text = f"""
         Название встречи: {meeting_info.get('title', 'Встреча')}
@@ -152,10 +950,15 @@ class LLMClient:
         Сделай повестку практичной и четкой. Ответь на русском языке.
         """
         
-        return await self.analyze_text(meeting_text, context)
+        return await self._respond(meeting_text, context, stream, "generate_meeting_agenda")
     
-    async def create_action_items(self, meeting_notes: str) -> str:
-        """Создание задач на основе заметок встречи"""
+    async def create_action_items(self, meeting_notes: str, stream: bool = False,
+                                  structured: bool = False) -> Union[str, AsyncIterator[str], Dict[str, Any]]:
+        """Создание задач на основе заметок встречи
+        
+        При structured=True возвращается словарь {'items': [...], 'error': ...},
+        где каждая задача - text, owner, deadline (YYYY-MM-DD) и priority.
+        """
         context = """
         На основе заметок встречи создай список конкретных задач (action items).
         Для каждой задачи укажи:
@@ -167,7 +970,41 @@ class LLMClient:
         Задачи должны быть конкретными и выполнимыми. Ответь на русском языке.
         """
         
-        return await self.analyze_text(meeting_notes, context)
+        if structured:
+            return await self._structured(
+                meeting_notes, f"{context}\nСегодня {datetime.now().date().isoformat()}.",
+                ActionItemList, "create_action_items", {'items': []}
+            )
+        return await self._respond(meeting_notes, context, stream, "create_action_items")
+
+class _LazyLLMClient:
+    """Глобальный клиент, который создается при первом обращении
+    
+    Утилиты импортируют llm_client на верхнем уровне, но страницы без
+    вызовов модели не должны платить за его создание.
+    """
+    
+    def __init__(self, factory: Callable[[], LLMClient]):
+        object.__setattr__(self, '_factory', factory)
+        object.__setattr__(self, '_instance', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+    
+    def _get(self) -> LLMClient:
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    object.__setattr__(self, '_instance', self._factory())
+        return self._instance
+    
+    def __getattr__(self, name: str):
+        return getattr(self._get(), name)
+    
+    def __setattr__(self, name: str, value: Any):
+        setattr(self._get(), name, value)
+    
+    def __repr__(self) -> str:
+        state = 'не создан' if self._instance is None else repr(self._instance)
+        return f"<llm_client: {state}>"
 
 # Глобальный экземпляр клиента
-llm_client = LLMClient()
\ No newline at end of file
+llm_client = _LazyLLMClient(LLMClient)
\ No newline at end of file
@@ -0,0 +1,130 @@
+"""
+Выбор модели LLM для каждого вызова по размеру промпта, операции и целевой задержке
+"""
+
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from .config import Config
+from .telemetry import MODEL_PRICES
+
+logger = logging.getLogger(__name__)
+
+# Характеристики моделей: окно контекста в токенах, задержка до первого
+# токена и скорость генерации (типичные значения для оценки задержки)
+MODEL_PROFILES = {
+    'gpt-4o-mini': {'context_window': 128000, 'first_token_seconds': 0.4, 'tokens_per_second': 90},
+    'gpt-3.5-turbo': {'context_window': 16385, 'first_token_seconds': 0.4, 'tokens_per_second': 80},
+    'gpt-4o': {'context_window': 128000, 'first_token_seconds': 0.6, 'tokens_per_second': 60},
+    'gpt-4-turbo': {'context_window': 128000, 'first_token_seconds': 0.8, 'tokens_per_second': 30},
+    'gpt-4': {'context_window': 8192, 'first_token_seconds': 0.8, 'tokens_per_second': 25},
+}
+
+# Запас окна на служебные токены разметки сообщений
+CONTEXT_MARGIN = 0.05
+
+def _profile(model: str) -> Dict[str, Any]:
+    """Профиль модели по самому длинному совпадающему префиксу имени"""
+    prefixes = [name for name in MODEL_PROFILES if model.startswith(name)]
+    if not prefixes:
+        return {'context_window': 8192, 'first_token_seconds': 1.0, 'tokens_per_second': 30}
+    return MODEL_PROFILES[max(prefixes, key=len)]
+
+def _price(model: str) -> float:
+    """Цена модели для сортировки: 1000 токенов промпта плюс 1000 токенов ответа"""
+    prefixes = [name for name in MODEL_PRICES if model.startswith(name)]
+    if not prefixes:
+        return float('inf')
+    prompt_price, completion_price = MODEL_PRICES[max(prefixes, key=len)]
+    return prompt_price + completion_price
+
+def _split(value: str) -> List[str]:
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+class ModelRouter:
+    """Выбирает самую дешевую модель, подходящую для вызова
+
+    Модели-кандидаты упорядочены по цене. Для операций из quality_operations
+    выбирается модель не дешевле quality_model. Модель подходит, если промпт
+    вместе с max_tokens помещается в ее окно контекста и оценка задержки
+    укладывается в целевую. Если в окно не помещается ни одна модель,
+    выбирается модель с самым большим окном.
+    """
+
+    def __init__(self, models: Optional[List[str]] = None, quality_model: Optional[str] = None,
+                 quality_operations: Optional[List[str]] = None, keep_decisions: int = 200):
+        self.models = sorted(models or _split(Config.LLM_ROUTER_MODELS), key=_price)
+        self.quality_model = quality_model if quality_model is not None else Config.LLM_ROUTER_QUALITY_MODEL
+        self.quality_operations = set(
+            quality_operations if quality_operations is not None
+            else _split(Config.LLM_ROUTER_QUALITY_OPERATIONS)
+        )
+
+        self.decisions = deque(maxlen=keep_decisions)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fits(model: str, prompt_tokens: int, max_tokens: int) -> bool:
+        window = _profile(model)['context_window']
+        return prompt_tokens + max_tokens <= window * (1 - CONTEXT_MARGIN)
+
+    @staticmethod
+    def estimate_latency(model: str, max_tokens: int) -> float:
+        """Оценка времени полного ответа длиной max_tokens, сек"""
+        profile = _profile(model)
+        return profile['first_token_seconds'] + max_tokens / profile['tokens_per_second']
+
+    def route(self, prompt_tokens: int, max_tokens: int, operation: Optional[str] = None,
+              latency_target: Optional[float] = None) -> Dict[str, Any]:
+        """Решение о модели: model, reason и входные параметры выбора"""
+        candidates = list(self.models)
+        reason = 'самая дешевая подходящая'
+
+        if operation in self.quality_operations and self.quality_model in candidates:
+            candidates = candidates[candidates.index(self.quality_model):]
+            reason = 'операция требует качественной модели'
+
+        fitting = [m for m in candidates if self.fits(m, prompt_tokens, max_tokens)]
+        if not fitting:
+            # Ищем окно побольше среди всех моделей, даже ценой качества или цены
+            fitting = [m for m in self.models if self.fits(m, prompt_tokens, max_tokens)]
+            reason = 'промпт не помещается в окно предпочтительных моделей'
+
+        if not fitting:
+            model = max(self.models, key=lambda m: _profile(m)['context_window'])
+            reason = 'промпт не помещается ни в одно окно, выбрано самое большое'
+        elif latency_target:
+            fast = [m for m in fitting if self.estimate_latency(m, max_tokens) <= latency_target]
+            if fast:
+                model = fast[0]
+            else:
+                model = min(fitting, key=lambda m: self.estimate_latency(m, max_tokens))
+                reason = 'ни одна модель не укладывается в целевую задержку, выбрана самая быстрая'
+        else:
+            model = fitting[0]
+
+        decision = {
+            'model': model,
+            'reason': reason,
+            'operation': operation,
+            'prompt_tokens': prompt_tokens,
+            'max_tokens': max_tokens,
+            'latency_target': latency_target
+        }
+        with self._lock:
+            self.decisions.append(decision)
+        logger.info(
+            f"Маршрутизация {operation or 'complete'}: {model} ({reason}), "
+            f"~{prompt_tokens} + {max_tokens} токенов"
+        )
+        return decision
+
+    def stats(self) -> Dict[str, int]:
+        """Сколько раз выбиралась каждая модель среди последних решений"""
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for decision in self.decisions:
+                counts[decision['model']] = counts.get(decision['model'], 0) + 1
+            return counts
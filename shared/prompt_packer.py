@@ -0,0 +1,177 @@
+"""
+Упаковка элементов (письма, задачи) в бюджет токенов промпта с учетом приоритета
+"""
+
+import math
+import re
+from typing import Any, Dict, List, Optional
+
+from .tokens import estimate_tokens, truncate_to_tokens
+
+# Вес элемента при делении бюджета: приоритет письма (_determine_priority) или задачи
+PRIORITY_WEIGHTS = {
+    'high': 3, 'critical': 3, 'show-stopper': 3, 'urgent': 3,
+    'высокий': 3, 'критический': 3, 'срочный': 3,
+    'medium': 2, 'major': 2, 'normal': 2, 'средний': 2, 'обычный': 2,
+    'low': 1, 'minor': 1, 'trivial': 1, 'низкий': 1,
+}
+DEFAULT_WEIGHT = 2
+
+# Тело одного элемента, если он форматируется без общего бюджета
+DEFAULT_BODY_TOKENS = 80
+
+# Тело, которое каждый элемент получает до деления бюджета по приоритетам
+MIN_BODY_TOKENS = 40
+
+# Строка, с которой начинается процитированное письмо при ответе
+REPLY_HEADER = re.compile(
+    r'^\s*(?:'
+    r'On .{0,200} wrote:'
+    r'|.{0,200} (?:написал|написала|написал\(а\)|пишет):'
+    r'|-{2,}\s*(?:Original Message|Исходное сообщение)\s*-{2,}'
+    r'|(?:From|От):.*\n\s*(?:Sent|Date|Отправлено|Дата):'
+    r')',
+    re.IGNORECASE | re.MULTILINE
+)
+
+# Начало подписи: разделитель "-- " отрезается всегда, прощание - только в конце письма
+SIGNATURE_DELIMITER = re.compile(r'^--\s*$')
+SIGNATURE_START = re.compile(
+    r'^\s*(?:с уважением|с наилучшими пожеланиями|всего доброго|best regards|kind regards|regards|'
+    r'cheers|sent from my|отправлено с|отправлено из)\b',
+    re.IGNORECASE
+)
+SIGNATURE_MAX_LINES = 8
+
+def strip_quoted(text: str) -> str:
+    """Убрать процитированную переписку: строки с '>' и все после заголовка ответа"""
+    match = REPLY_HEADER.search(text)
+    if match:
+        text = text[:match.start()]
+    return "\n".join(line for line in text.splitlines() if not line.lstrip().startswith('>'))
+
+def strip_signature(text: str) -> str:
+    """Убрать подпись в конце письма"""
+    lines = text.splitlines()
+    for i, line in enumerate(lines):
+        if SIGNATURE_DELIMITER.match(line):
+            return "\n".join(lines[:i])
+        if SIGNATURE_START.match(line) and len(lines) - i <= SIGNATURE_MAX_LINES:
+            return "\n".join(lines[:i])
+    return text
+
+def clean_body(text: str) -> str:
+    """Тело письма без цитат, подписи и лишних пустых строк"""
+    text = strip_signature(strip_quoted(text or ''))
+    return re.sub(r'\n\s*\n+', '\n\n', text).strip()
+
+def priority_weight(priority: Any) -> float:
+    if priority is None:
+        return DEFAULT_WEIGHT
+    return PRIORITY_WEIGHTS.get(str(priority).strip().lower(), DEFAULT_WEIGHT)
+
+def allocate(needs: List[int], weights: List[float], budget: int, reserve: int = 0) -> List[int]:
+    """Деление бюджета пропорционально весам (max-min fairness)
+
+    Сначала каждый элемент получает до reserve токенов (если бюджета на это
+    не хватает, резерв уменьшается поровну). Затем элемент, которому нужно
+    меньше его доли, получает сколько нужно, остаток снова делится между
+    остальными.
+    """
+    remaining = max(budget, 0)
+    wanting = sum(1 for need in needs if need > 0)
+    if wanting:
+        reserve = min(reserve, remaining // wanting)
+    allocation = [min(max(need, 0), reserve) for need in needs]
+    remaining -= sum(allocation)
+    needs = [need - given for need, given in zip(needs, allocation)]
+    active = [i for i, need in enumerate(needs) if need > 0]
+
+    while active and remaining > 0:
+        total_weight = sum(weights[i] for i in active)
+        satisfied = [i for i in active if needs[i] <= remaining * weights[i] / total_weight]
+        if not satisfied:
+            for i in active:
+                allocation[i] += int(remaining * weights[i] / total_weight)
+            break
+
+        for i in satisfied:
+            allocation[i] += needs[i]
+            remaining -= needs[i]
+        active = [i for i in active if i not in satisfied]
+
+    return allocation
+
+def render_item(item: Dict[str, Any], body_tokens: Optional[int] = DEFAULT_BODY_TOKENS,
+                model: Optional[str] = None) -> str:
+    """Текст элемента: заголовок и тело, обрезанное до body_tokens (None - целиком)"""
+    body = item.get('body') or ''
+    if body_tokens is not None and estimate_tokens(body, model) > body_tokens:
+        body = truncate_to_tokens(body, body_tokens, model).rstrip() + "..."
+    return f"{item['header']}{body}"
+
+def pack_items(items: List[Dict[str, Any]], budget: int, model: Optional[str] = None,
+               separator: str = "\n\n", max_chunks: Optional[int] = 1,
+               min_body_tokens: int = MIN_BODY_TOKENS) -> Dict[str, Any]:
+    """Упаковка элементов {'header', 'body', 'priority'} в бюджет токенов
+
+    budget - бюджет одного промпта. Если заголовки и минимум тела
+    (min_body_tokens) всех элементов в него не помещаются, бюджет
+    умножается на нужное число кусков map-reduce, но не больше max_chunks
+    (None - без ограничения). Если не хватает и max_chunks кусков, первыми
+    отбрасываются элементы с низким приоритетом. Бюджет на тела делится по
+    приоритетам. Возвращает тексты оставшихся элементов в исходном порядке
+    и отчет: сколько токенов получил каждый элемент.
+    """
+    header_tokens = [estimate_tokens(item['header'], model) for item in items]
+    needs = [estimate_tokens(item.get('body') or '', model) for item in items]
+    weights = [priority_weight(item.get('priority')) for item in items]
+    separator_tokens = estimate_tokens(separator, model)
+
+    def minimum(indexes: List[int]) -> int:
+        # Заголовки, разделители, минимум тела и по токену на "..." у обрезанного тела
+        return sum(header_tokens[i] + separator_tokens + min(needs[i], min_body_tokens) + 1 for i in indexes)
+
+    kept = list(range(len(items)))
+    chunks = max(math.ceil(minimum(kept) / budget), 1) if budget > 0 else 1
+    if max_chunks is not None:
+        chunks = min(chunks, max_chunks)
+    total_budget = budget * chunks
+
+    # Сначала низкий приоритет, при равном - более поздние элементы
+    for i in sorted(kept, key=lambda i: (weights[i], -i)):
+        if len(kept) == 1 or minimum(kept) <= total_budget:
+            break
+        kept.remove(i)
+
+    overhead = sum(header_tokens[i] for i in kept) + separator_tokens * max(len(kept) - 1, 0)
+    allocation = allocate([needs[i] for i in kept], [weights[i] for i in kept],
+                          total_budget - overhead - len(kept), min_body_tokens)
+    allowed_by_index = dict(zip(kept, allocation))
+
+    texts = []
+    report = []
+    for i, item in enumerate(items):
+        dropped = i not in allowed_by_index
+        allowed = allowed_by_index.get(i, 0)
+        if not dropped:
+            texts.append(render_item(item, allowed, model))
+        report.append({
+            'priority': item.get('priority'),
+            'weight': weights[i],
+            'header_tokens': header_tokens[i],
+            'body_tokens': min(needs[i], allowed),
+            'original_body_tokens': estimate_tokens(item.get('original_body') or item.get('body') or '', model),
+            'truncated': not dropped and allowed < needs[i],
+            'dropped': dropped
+        })
+
+    return {
+        'items': texts,
+        'report': report,
+        'budget': total_budget,
+        'chunks': chunks,
+        'tokens': estimate_tokens(separator.join(texts), model),
+        'truncated': sum(entry['truncated'] for entry in report),
+        'dropped': sum(entry['dropped'] for entry in report)
+    }
@@ -0,0 +1,138 @@
+"""
+Клиентский ограничитель частоты запросов к LLM (RPM и TPM)
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+class TokenBucket:
+    """Ведро токенов, пополняемое равномерно в течение минуты"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.available = self.capacity
+        self.updated = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _refill(self, now: float):
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Сколько секунд ждать, пока в ведре накопится amount"""
+        if not self.enabled:
+            return 0.0
+        self._refill(now)
+        # Запрос больше емкости ведра пропускаем, когда оно полностью заполнено
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate
+
+    def consume(self, amount: float):
+        if self.enabled:
+            self.available -= min(amount, self.capacity)
+
+    def adjust(self, delta: float):
+        """Коррекция после получения фактического расхода (delta > 0 - возврат)"""
+        if self.enabled:
+            self.available = min(self.capacity, self.available + delta)
+
+class RateLimiter:
+    """Общий для процесса лимитер запросов в минуту и токенов в минуту
+
+    Состояние защищено threading.Lock, поэтому лимитер можно разделять
+    между потоками Streamlit и разными event loop.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+        self.total_wait = 0.0
+        self.throttled = 0
+        self.pauses = 0
+
+    async def acquire(self, estimated_tokens: int) -> float:
+        """Дождаться возможности отправить запрос, возвращает время ожидания"""
+        waited = 0.0
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = max(
+                    self.paused_until - now,
+                    self.requests.wait_time(1, now),
+                    self.tokens.wait_time(estimated_tokens, now)
+                )
+                if wait <= 0:
+                    self.requests.consume(1)
+                    self.tokens.consume(estimated_tokens)
+                    if waited:
+                        self.total_wait += waited
+                        self.throttled += 1
+                    return waited
+
+            # Небольшой джиттер, чтобы ожидающие не просыпались одновременно
+            wait += random.uniform(0, 0.05)
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """Учесть фактический расход токенов вместо оценки"""
+        if actual_tokens is None:
+            return
+        with self._lock:
+            self.tokens.adjust(estimated_tokens - actual_tokens)
+
+    def pause(self, seconds: float):
+        """Приостановить все запросы процесса (например, после ответа 429)"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.pauses += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'rpm_limit': self.requests.capacity,
+                'tpm_limit': self.tokens.capacity,
+                'throttled': self.throttled,
+                'total_wait_seconds': round(self.total_wait, 3),
+                'pauses': self.pauses
+            }
+
+def parse_retry_after(headers) -> Optional[float]:
+    """Задержка из заголовков retry-after-ms / retry-after, в секундах"""
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get('retry-after-ms')
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000.0
+        except ValueError:
+            pass
+
+    retry_after = headers.get('retry-after')
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+
+    return None
+
+def backoff_delay(attempt: int, base: float, maximum: float, retry_after: Optional[float] = None) -> float:
+    """Экспоненциальная задержка с полным джиттером; подсказка сервера имеет приоритет"""
+    if retry_after is not None:
+        return retry_after + random.uniform(0, base)
+    return random.uniform(0, min(maximum, base * (2 ** attempt)))
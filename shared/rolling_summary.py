@@ -0,0 +1,178 @@
+"""
+Инкрементальные (скользящие) сводки по источникам данных
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Union
+
+from .config import Config
+from .llm_client import LLMClient, EMAILS_CONTEXT, TELEGRAM_CONTEXT, llm_client
+
+logger = logging.getLogger(__name__)
+
+ROLLING_CONTEXT = """
+Первый элемент - сводка, составленная ранее. Остальные элементы - новые
+данные, появившиеся после нее. Обнови сводку с учетом новых данных:
+сохрани актуальное из прежней сводки и добавь новое.
+"""
+
+def message_id(item: Dict) -> Optional[str]:
+    """ID письма или сообщения; элемент без ID опознается по содержимому"""
+    return item.get('id')
+
+class RollingSummarizer:
+    """Хранит последнюю сводку и учтенные в ней элементы для каждого источника
+
+    При обновлении в модель отправляются только новые элементы вместе с
+    предыдущей сводкой, поэтому стоимость обновления растет с объемом
+    нового трафика, а не с длиной периода.
+    """
+
+    def __init__(self, client: Optional[LLMClient] = None, path: Optional[str] = None,
+                 max_ids: int = 10000):
+        self.client = client or llm_client
+        self.path = path or os.path.join(Config.DATA_DIR, 'rolling_summaries.json')
+        self.max_ids = max_ids
+        self._lock = threading.Lock()
+
+    def _load_all(self) -> Dict[str, Any]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            logger.error(f"Ошибка загрузки скользящих сводок: {e}")
+            return {}
+
+    def get_state(self, source: str) -> Dict[str, Any]:
+        """Сохраненная сводка источника: текст, учтенные ID, время обновления"""
+        with self._lock:
+            return self._load_all().get(source, {'summary': '', 'ids': [], 'updated_at': None})
+
+    def _write_all(self, states: Dict[str, Any]):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(states, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def _save_state(self, source: str, state: Dict[str, Any]):
+        with self._lock:
+            states = self._load_all()
+            states[source] = state
+            self._write_all(states)
+
+    def reset(self, source: str):
+        """Забыть сводку источника: следующее обновление пересчитает период целиком"""
+        with self._lock:
+            states = self._load_all()
+            if states.pop(source, None) is not None:
+                self._write_all(states)
+
+    @staticmethod
+    def content_id(text: str) -> str:
+        """Идентификатор элемента по его содержимому"""
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+    def pending(self, source: str, items: List[Dict], format_item: Callable[[Dict], str],
+                id_of: Optional[Callable[[Dict], str]] = None) -> List[Dict]:
+        """Элементы, которые еще не вошли в сводку источника"""
+        covered = set(self.get_state(source)['ids'])
+        return [item for item in items if self._item_id(item, format_item(item), id_of) not in covered]
+
+    def _item_id(self, item: Dict, text: str, id_of: Optional[Callable[[Dict], str]]) -> str:
+        item_id = id_of(item) if id_of else None
+        return str(item_id) if item_id is not None else self.content_id(text)
+
+    async def update(self, source: str, items: List[Dict], format_item: Callable[[Dict], str],
+                     context: str, id_of: Optional[Callable[[Dict], str]] = None,
+                     stream: bool = False, operation: str = "rolling_summary") -> Union[str, AsyncIterator[str]]:
+        """Обновить сводку источника новыми элементами и вернуть ее"""
+        state = self.get_state(source)
+        covered = set(state['ids'])
+
+        new_ids = []
+        new_texts = []
+        for item in items:
+            text = format_item(item)
+            item_id = self._item_id(item, text, id_of)
+            if item_id not in covered:
+                new_ids.append(item_id)
+                new_texts.append(text)
+
+        if not new_texts:
+            # Без новых элементов модель не вызывается: есть сводка - возвращаем ее, нет - пустую
+            logger.info(f"Сводка {source}: новых элементов нет")
+            return self._single(state['summary']) if stream else state['summary']
+
+        if state['summary']:
+            prompt_items = [f"Предыдущая сводка:\n{state['summary']}"] + new_texts
+            prompt_context = f"{ROLLING_CONTEXT}\n{context}"
+        else:
+            prompt_items = new_texts
+            prompt_context = context
+
+        logger.info(f"Сводка {source}: {len(new_texts)} новых из {len(items)}")
+        # Ошибку получаем исключением: текст ошибки нельзя сохранить как сводку и считать элементы учтенными
+        try:
+            result = await self.client.analyze_items(prompt_items, prompt_context, stream, operation=operation,
+                                                     raise_errors=True)
+        except Exception as e:
+            error = f"Ошибка анализа: {str(e)}"
+            return self._single(error) if stream else error
+
+        if stream:
+            return self._store_after_stream(source, state, new_ids, result)
+
+        self._store(source, state, new_ids, result)
+        return result
+
+    async def _single(self, text: str) -> AsyncIterator[str]:
+        yield text
+
+    async def _store_after_stream(self, source: str, state: Dict[str, Any], new_ids: List[str],
+                                  tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+        parts = []
+        try:
+            async for token in tokens:
+                parts.append(token)
+                yield token
+        except Exception as e:
+            # Обрыв посреди ответа: показываем ошибку, частичную сводку не сохраняем
+            yield f"\n\nОшибка анализа: {str(e)}"
+            return
+        self._store(source, state, new_ids, "".join(parts))
+
+    def _store(self, source: str, state: Dict[str, Any], new_ids: List[str], summary: str):
+        if not summary:
+            return
+
+        ids = (state['ids'] + new_ids)[-self.max_ids:]
+        self._save_state(source, {
+            'summary': summary,
+            'ids': ids,
+            'updated_at': datetime.now().isoformat()
+        })
+
+    async def summarize_emails(self, source: str, emails: List[Dict],
+                               stream: bool = False) -> Union[str, AsyncIterator[str]]:
+        """Скользящая сводка по письмам"""
+        return await self.update(source, emails, LLMClient.format_email, EMAILS_CONTEXT, id_of=message_id,
+                                 stream=stream, operation="rolling_summarize_emails")
+
+    async def summarize_telegram_messages(self, source: str, messages: List[Dict],
+                                          stream: bool = False) -> Union[str, AsyncIterator[str]]:
+        """Скользящая сводка по сообщениям Telegram"""
+        return await self.update(
+            source, messages, LLMClient.format_telegram_message, TELEGRAM_CONTEXT,
+            id_of=message_id, stream=stream, operation="rolling_analyze_telegram_messages"
+        )
+
+# Глобальный экземпляр
+rolling_summarizer = RollingSummarizer()
@@ -0,0 +1,84 @@
+"""
+Схемы структурированных ответов LLM (JSON с проверкой pydantic)
+"""
+
+import json
+from datetime import date
+from enum import Enum
+from typing import Any, Dict, List, Optional, Type
+
+from pydantic import BaseModel, Field, field_validator
+
+# Значения, которыми модель обозначает отсутствие данных
+EMPTY_VALUES = {'', '-', 'нет', 'не указан', 'не указано', 'не назначен', 'null', 'none', 'n/a'}
+
+class StructuredOutputError(ValueError):
+    """Ответ модели не удалось привести к схеме даже после исправления"""
+
+class Priority(str, Enum):
+    HIGH = "Высокий"
+    MEDIUM = "Средний"
+    LOW = "Низкий"
+
+def _empty_to_none(value: Any) -> Any:
+    if isinstance(value, str) and value.strip().lower() in EMPTY_VALUES:
+        return None
+    return value
+
+def _to_priority(value: Any) -> Any:
+    """Приоритет на английском или в другом регистре приводится к Priority"""
+    if isinstance(value, str):
+        aliases = {'high': Priority.HIGH, 'medium': Priority.MEDIUM, 'normal': Priority.MEDIUM, 'low': Priority.LOW}
+        return aliases.get(value.strip().lower(), value.strip().capitalize())
+    return value
+
+class ActionItem(BaseModel):
+    """Задача по итогам встречи"""
+
+    text: str = Field(description="Что нужно сделать, конкретно и выполнимо")
+    owner: Optional[str] = Field(None, description="Ответственный, если назван в заметках")
+    deadline: Optional[date] = Field(None, description="Срок в формате YYYY-MM-DD, если известен")
+    priority: Priority = Field(Priority.MEDIUM, description="Высокий, Средний или Низкий")
+
+    _normalize_empty = field_validator('owner', 'deadline', mode='before')(_empty_to_none)
+    _normalize_priority = field_validator('priority', mode='before')(_to_priority)
+
+class ActionItemList(BaseModel):
+    items: List[ActionItem]
+
+class TaskAssessment(BaseModel):
+    """Оценка одной задачи из трекера"""
+
+    title: str
+    status: Optional[str] = None
+    priority: Priority = Priority.MEDIUM
+    overdue: bool = False
+    recommendation: Optional[str] = Field(None, description="Что сделать с задачей")
+
+    _normalize_empty = field_validator('status', 'recommendation', mode='before')(_empty_to_none)
+    _normalize_priority = field_validator('priority', mode='before')(_to_priority)
+
+class TaskAnalysis(BaseModel):
+    """Отчет по списку задач"""
+
+    tasks: List[TaskAssessment]
+    status_counts: Dict[str, int] = Field(default_factory=dict, description="Число задач по статусам")
+    recommendations: List[str] = Field(default_factory=list, description="Рекомендации по приоритизации")
+    summary: str = Field("", description="Краткий вывод в 1-3 предложениях")
+
+def schema_instructions(schema: Type[BaseModel]) -> str:
+    """Инструкция для промпта: вернуть только JSON по схеме"""
+    return (
+        "Ответь только JSON объектом без пояснений и разметки, "
+        "строго по JSON Schema:\n"
+        f"{json.dumps(schema.model_json_schema(), ensure_ascii=False)}"
+    )
+
+def parse_structured(raw: str, schema: Type[BaseModel]) -> BaseModel:
+    """Разбор ответа модели; ValueError (в т.ч. ValidationError) при несоответствии схеме"""
+    text = (raw or '').strip()
+    # Некоторые модели оборачивают JSON в блок кода, несмотря на инструкцию
+    if text.startswith('```'):
+        text = text.strip('`')
+        text = text[text.find('{'):] if '{' in text else text
+    return schema.model_validate_json(text)
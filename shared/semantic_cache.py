@@ -0,0 +1,159 @@
+"""
+Семантический кэш ответов LLM для почти одинаковых промптов
+"""
+
+import hashlib
+import re
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .config import Config
+
+class HashedNgramEmbedder:
+    """Локальный офлайн эмбеддинг: хэшированные символьные n-граммы
+
+    Цифры заменяются нулями, поэтому промпты, отличающиеся только
+    временем или датой, получают одинаковые векторы.
+    """
+
+    def __init__(self, dim: int = 1024, ngram_range: Tuple[int, int] = (3, 5)):
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        text = re.sub(r'\d', '0', text.lower())
+        return re.sub(r'\s+', ' ', text).strip()
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        text = self.normalize(text)
+
+        for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+            for i in range(max(len(text) - n + 1, 0)):
+                h = zlib.crc32(text[i:i + n].encode('utf-8'))
+                # Знак из старшего бита уменьшает влияние коллизий хэша
+                vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+class SemanticCache:
+    """Индекс векторов промптов в NumPy с поиском по косинусной близости
+
+    Ответ возвращается, если близость к сохраненному промпту не ниже порога.
+    Сравниваются только записи одного пространства имен: та же модель,
+    те же параметры и тот же системный промпт. При заполнении вытесняется
+    давно не использованная запись.
+    """
+
+    def __init__(self, threshold: Optional[float] = None, max_entries: Optional[int] = None,
+                 ttl: Optional[int] = None, embedder: Optional[HashedNgramEmbedder] = None):
+        self.threshold = threshold if threshold is not None else Config.LLM_SEMANTIC_THRESHOLD
+        self.max_entries = max_entries or Config.LLM_SEMANTIC_MAX_ENTRIES
+        self.ttl = ttl if ttl is not None else Config.LLM_CACHE_TTL
+        self.embedder = embedder or HashedNgramEmbedder()
+
+        self._lock = threading.Lock()
+        self._vectors = np.zeros((self.max_entries, self.embedder.dim), dtype=np.float32)
+        self._namespaces: List[Optional[str]] = [None] * self.max_entries
+        self._responses: List[Optional[str]] = [None] * self.max_entries
+        self._expires_at = np.zeros(self.max_entries, dtype=np.float64)
+        # Логические часы для LRU: порядок обращений, а не время
+        self._last_access = np.zeros(self.max_entries, dtype=np.int64)
+        self._clock = 0
+        self._size = 0
+
+        self.lookups = 0
+        self.hits = 0
+        self.tokens_saved = 0
+        self._hit_similarity = 0.0
+        self._correct = 0
+        self._judged = 0
+
+    @staticmethod
+    def make_namespace(model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        """Все, кроме последнего сообщения, должно совпадать точно"""
+        fixed = repr((model, temperature, max_tokens, [(m['role'], m['content']) for m in messages[:-1]]))
+        return hashlib.sha256(fixed.encode('utf-8')).hexdigest()
+
+    def lookup(self, namespace: str, text: str) -> Optional[Tuple[str, float]]:
+        """Ответ на ближайший промпт и его близость или None"""
+        vector = self.embedder.embed(text)
+        now = time.time()
+
+        with self._lock:
+            self.lookups += 1
+            if not self._size:
+                return None
+
+            similarities = self._vectors[:self._size] @ vector
+            valid = np.array([ns == namespace for ns in self._namespaces[:self._size]])
+            valid &= (self._expires_at[:self._size] == 0) | (self._expires_at[:self._size] > now)
+            similarities = np.where(valid, similarities, -1.0)
+
+            index = int(np.argmax(similarities))
+            similarity = float(similarities[index])
+            if similarity < self.threshold:
+                return None
+
+            self._clock += 1
+            self._last_access[index] = self._clock
+            self.hits += 1
+            self._hit_similarity += similarity
+            return self._responses[index], similarity
+
+    def add(self, namespace: str, text: str, response: str, ttl: Optional[int] = None):
+        ttl = ttl if ttl is not None else self.ttl
+        vector = self.embedder.embed(text)
+        now = time.time()
+
+        with self._lock:
+            if self._size < self.max_entries:
+                index = self._size
+                self._size += 1
+            else:
+                # Сначала занимаем место устаревшей записи, затем давно не использованной
+                expired = np.flatnonzero((self._expires_at > 0) & (self._expires_at <= now))
+                index = int(expired[0]) if expired.size else int(np.argmin(self._last_access))
+
+            self._vectors[index] = vector
+            self._namespaces[index] = namespace
+            self._responses[index] = response
+            self._expires_at[index] = now + ttl if ttl and ttl > 0 else 0
+            self._clock += 1
+            self._last_access[index] = self._clock
+
+    def record_saving(self, tokens: int):
+        """Учесть токены, не потраченные благодаря попаданию"""
+        with self._lock:
+            self.tokens_saved += tokens
+
+    def record_outcome(self, correct: bool):
+        """Оценка попадания при проверке на размеченной нагрузке"""
+        with self._lock:
+            self._judged += 1
+            self._correct += int(correct)
+
+    def clear(self):
+        with self._lock:
+            self._size = 0
+            self._namespaces = [None] * self.max_entries
+            self._responses = [None] * self.max_entries
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': self._size,
+                'threshold': self.threshold,
+                'lookups': self.lookups,
+                'hits': self.hits,
+                'hit_rate': self.hits / self.lookups if self.lookups else 0.0,
+                'mean_hit_similarity': self._hit_similarity / self.hits if self.hits else None,
+                'accuracy': self._correct / self._judged if self._judged else None,
+                'tokens_saved': self.tokens_saved
+            }
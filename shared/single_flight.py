@@ -0,0 +1,169 @@
+"""
+Объединение одинаковых одновременных запросов к LLM (single-flight)
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class LeaderCancelled(RuntimeError):
+    """Запрос, к которому присоединились ожидающие, был прерван"""
+
+_END = object()
+
+class _Broadcast:
+    """Рассылка фрагментов одного потокового ответа нескольким подписчикам
+
+    Подписчики могут жить в разных потоках и event loop (вкладки Streamlit),
+    поэтому фрагменты доставляются через call_soon_threadsafe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tokens: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._listeners: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+
+    def _notify(self, item):
+        for loop, queue in list(self._listeners):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                # Event loop подписчика уже закрыт
+                self._listeners.remove((loop, queue))
+
+    def publish(self, token: str):
+        with self._lock:
+            self.tokens.append(token)
+            self._notify(token)
+
+    def close(self, error: Optional[BaseException] = None):
+        with self._lock:
+            self.done = True
+            self.error = error
+            self._notify(_END)
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        queue = asyncio.Queue()
+        with self._lock:
+            backlog = list(self.tokens)
+            done = self.done
+            if not done:
+                self._listeners.append((asyncio.get_running_loop(), queue))
+
+        for token in backlog:
+            yield token
+
+        while not done:
+            item = await queue.get()
+            if item is _END:
+                break
+            yield item
+
+        if self.error is not None:
+            raise self.error
+
+class SingleFlight:
+    """Одновременные запросы с одинаковым ключом выполняются одним вызовом"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, concurrent.futures.Future] = {}
+        self._streams: Dict[str, _Broadcast] = {}
+
+        self.leaders = 0
+        self.collapsed = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Выполнить fn или дождаться результата уже идущего вызова с тем же ключом"""
+        while True:
+            with self._lock:
+                future = self._calls.get(key)
+                leader = future is None
+                if leader:
+                    future = concurrent.futures.Future()
+                    self._calls[key] = future
+                    self.leaders += 1
+                else:
+                    self.collapsed += 1
+
+            if leader:
+                return await self._lead(key, future, fn)
+
+            try:
+                # shield: отмена одного ожидающего не должна отменять общий результат
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except LeaderCancelled:
+                # Ведущий вызов прерван до результата - пробуем выполнить запрос сами
+                logger.debug(f"Ведущий запрос {key[:12]} прерван, повторяем")
+
+    async def _lead(self, key: str, future: concurrent.futures.Future, fn: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.set_exception(LeaderCancelled())
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    async def stream(self, key: str, factory: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Потоковый вариант: подписчики получают те же фрагменты, что и ведущий"""
+        while True:
+            with self._lock:
+                broadcast = self._streams.get(key)
+                leader = broadcast is None
+                if leader:
+                    broadcast = _Broadcast()
+                    self._streams[key] = broadcast
+                    self.leaders += 1
+                else:
+                    self.collapsed += 1
+
+            if leader:
+                error = None
+                try:
+                    async for token in factory():
+                        broadcast.publish(token)
+                        yield token
+                except (asyncio.CancelledError, GeneratorExit):
+                    error = LeaderCancelled()
+                    raise
+                except BaseException as e:
+                    error = e
+                    raise
+                finally:
+                    with self._lock:
+                        self._streams.pop(key, None)
+                    broadcast.close(error)
+                return
+
+            received = 0
+            try:
+                async for token in broadcast.subscribe():
+                    received += 1
+                    yield token
+                return
+            except LeaderCancelled:
+                # Без полученных фрагментов можно прозрачно выполнить запрос самим
+                if received:
+                    raise
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'leaders': self.leaders,
+                'collapsed': self.collapsed,
+                'in_flight': len(self._calls) + len(self._streams)
+            }
@@ -0,0 +1,246 @@
+"""
+Телеметрия вызовов LLM: задержки, токены, стоимость и ошибки по операциям
+"""
+
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм задержек, секунды
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60]
+
+# Цены OpenAI в долларах за 1000 токенов: (промпт, ответ)
+MODEL_PRICES = {
+    'gpt-3.5-turbo': (0.0005, 0.0015),
+    'gpt-4o-mini': (0.00015, 0.0006),
+    'gpt-4o': (0.0025, 0.01),
+    'gpt-4-turbo': (0.01, 0.03),
+    'gpt-4': (0.03, 0.06),
+}
+
+# Скидка Batch API относительно обычных запросов
+BATCH_DISCOUNT = 0.5
+
+# Источники ответа, за которые платим: обычный запрос и пакетное задание
+BILLED_SOURCES = ('api', 'batch')
+
+# Размер журнала, после которого он переименовывается в .1
+MAX_LOG_BYTES = 10 * 1024 * 1024
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Стоимость вызова в долларах, 0 для неизвестной модели"""
+    # Самый длинный совпадающий префикс: gpt-4o-mini-2024-07-18 -> gpt-4o-mini
+    prefixes = [name for name in MODEL_PRICES if model.startswith(name)]
+    if not prefixes:
+        return 0.0
+    prompt_price, completion_price = MODEL_PRICES[max(prefixes, key=len)]
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами и оценкой перцентилей"""
+
+    def __init__(self, bounds: Optional[List[float]] = None):
+        self.bounds = bounds or LATENCY_BUCKETS
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Верхняя граница корзины, в которую попадает перцентиль q (0-100)"""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return self.bounds[i] if i < len(self.bounds) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'max': self.max,
+            'buckets': dict(zip([str(b) for b in self.bounds] + ['inf'], self.counts))
+        }
+
+class TelemetryAggregator:
+    """Агрегаты записей телеметрии по операциям"""
+
+    def __init__(self):
+        self.operations: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, record: Dict[str, Any]):
+        stats = self.operations.get(record['operation'])
+        if stats is None:
+            stats = self.operations[record['operation']] = {
+                'calls': 0,
+                'errors': 0,
+                'api_calls': 0,
+                'hedged': 0,
+                'prompt_tokens': 0,
+                'completion_tokens': 0,
+                'cost_usd': 0.0,
+                'latency': Histogram(),
+                'ttfb': Histogram(),
+                'queue_wait': Histogram()
+            }
+
+        stats['calls'] += 1
+        stats['errors'] += int(bool(record.get('error')))
+        stats['hedged'] += int(bool(record.get('hedged')))
+        stats['latency'].observe(record.get('latency') or 0.0)
+
+        # Токены и стоимость - у оплачиваемых запросов, очередь и TTFB - только у интерактивных
+        if record.get('source') in BILLED_SOURCES:
+            stats['api_calls'] += 1
+            stats['prompt_tokens'] += record.get('prompt_tokens') or 0
+            stats['completion_tokens'] += record.get('completion_tokens') or 0
+            stats['cost_usd'] += record.get('cost_usd') or 0.0
+        if record.get('source') == 'api':
+            stats['queue_wait'].observe(record.get('queue_wait') or 0.0)
+            if record.get('ttfb') is not None:
+                stats['ttfb'].observe(record['ttfb'])
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            operation: {
+                name: value.to_dict() if isinstance(value, Histogram) else value
+                for name, value in stats.items()
+            }
+            for operation, stats in self.operations.items()
+        }
+
+class LLMTelemetry:
+    """Сбор записей о каждом вызове LLM
+
+    Записи агрегируются в памяти процесса и дописываются в JSONL журнал,
+    который читает страница телеметрии в main.py (утилиты работают
+    отдельными процессами).
+    """
+
+    def __init__(self, path: Optional[str] = None, keep_recent: int = 1000):
+        self.path = path
+        self.recent = deque(maxlen=keep_recent)
+        self.aggregator = TelemetryAggregator()
+        self._lock = threading.Lock()
+
+    def start(self, operation: Optional[str], model: str, stream: bool) -> Dict[str, Any]:
+        """Новая запись вызова; поля заполняются по ходу выполнения"""
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'operation': operation or 'complete',
+            'model': model,
+            'stream': stream,
+            'source': 'api',
+            'prompt_tokens': 0,
+            'completion_tokens': 0,
+            'queue_wait': 0.0,
+            'retries': 0,
+            'hedged': False,
+            'ttfb': None,
+            'error': None,
+            '_started': time.perf_counter()
+        }
+
+    def first_byte(self, record: Dict[str, Any]):
+        if record['ttfb'] is None:
+            record['ttfb'] = round(time.perf_counter() - record['_started'], 4)
+
+    def finish(self, record: Dict[str, Any], latency: Optional[float] = None):
+        """Завершить запись; latency задается явно, если вызов начался в другом процессе"""
+        started = record.pop('_started')
+        # Служебные поля с подчеркиванием (дедлайн и т.п.) в журнал не пишем
+        for name in [name for name in record if name.startswith('_')]:
+            del record[name]
+        record['latency'] = round(latency if latency is not None else time.perf_counter() - started, 4)
+        record['queue_wait'] = round(record['queue_wait'], 4)
+
+        cost = 0.0
+        if record['source'] in BILLED_SOURCES:
+            cost = estimate_cost(record['model'], record['prompt_tokens'], record['completion_tokens'])
+            if record['source'] == 'batch':
+                cost *= BATCH_DISCOUNT
+        record['cost_usd'] = round(cost, 6)
+
+        with self._lock:
+            self.recent.append(record)
+            self.aggregator.add(record)
+            if self.path:
+                self._write(record)
+
+    def _write(self, record: Dict[str, Any]):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            if os.path.exists(self.path) and os.path.getsize(self.path) > MAX_LOG_BYTES:
+                os.replace(self.path, f"{self.path}.1")
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        except IOError as e:
+            logger.error(f"Ошибка записи телеметрии LLM: {e}")
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return self.aggregator.summary()
+
+    def ttfb_percentile(self, operation: Optional[str], q: float = 95,
+                        min_samples: int = 1) -> Optional[float]:
+        """Перцентиль времени до первого байта операции; None, пока наблюдений меньше min_samples"""
+        with self._lock:
+            stats = self.aggregator.operations.get(operation or 'complete')
+            if stats is None or stats['ttfb'].count < min_samples:
+                return None
+            return stats['ttfb'].percentile(q)
+
+    def export_jsonl(self, path: str) -> int:
+        """Выгрузить последние записи процесса в JSONL, возвращает их число"""
+        with self._lock:
+            records = list(self.recent)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        return len(records)
+
+def load_records(path: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Записи из JSONL журнала телеметрии (последние limit)"""
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records[-limit:] if limit else records
+
+def aggregate(records: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Сводка по операциям для набора записей"""
+    aggregator = TelemetryAggregator()
+    for record in records:
+        aggregator.add(record)
+    return aggregator.summary()
+
+def default_log_path() -> str:
+    return Config.LLM_TELEMETRY_PATH or os.path.join(Config.DATA_DIR, 'llm_telemetry.jsonl')
@@ -0,0 +1,85 @@
+"""
+Оценка количества токенов и упаковка текста в бюджет токенов
+"""
+
+from typing import List, Optional
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken необязателен, без него используется эвристика
+    tiktoken = None
+
+# Средняя длина токена в символах для смешанного русского и английского текста
+CHARS_PER_TOKEN = 3
+
+_encodings = {}
+
+def _get_encoding(model: Optional[str]):
+    """Кодировка tiktoken для модели или None, если tiktoken недоступен"""
+    if tiktoken is None:
+        return None
+
+    key = model or ''
+    if key not in _encodings:
+        try:
+            _encodings[key] = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding('cl100k_base')
+        except Exception:
+            _encodings[key] = tiktoken.get_encoding('cl100k_base')
+    return _encodings[key]
+
+def estimate_tokens(text: str, model: Optional[str] = None) -> int:
+    """Оценка количества токенов в тексте"""
+    if not text:
+        return 0
+
+    encoding = _get_encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def truncate_to_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    """Обрезка текста до заданного количества токенов"""
+    if max_tokens <= 0:
+        return ""
+
+    encoding = _get_encoding(model)
+    if encoding is not None:
+        tokens = encoding.encode(text)
+        return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    return text if len(text) <= max_chars else text[:max_chars]
+
+def pack_chunks(items: List[str], max_tokens: int, separator: str = "\n\n",
+                model: Optional[str] = None) -> List[str]:
+    """Жадная упаковка элементов в куски не длиннее max_tokens
+
+    Порядок элементов сохраняется, слишком длинный элемент обрезается
+    до размера одного куска.
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    separator_tokens = estimate_tokens(separator, model)
+
+    for item in items:
+        item_tokens = estimate_tokens(item, model)
+        if item_tokens > max_tokens:
+            item = truncate_to_tokens(item, max_tokens, model)
+            item_tokens = max_tokens
+
+        extra = item_tokens + (separator_tokens if current else 0)
+        if current and current_tokens + extra > max_tokens:
+            chunks.append(separator.join(current))
+            current = []
+            current_tokens = 0
+            extra = item_tokens
+
+        current.append(item)
+        current_tokens += extra
+
+    if current:
+        chunks.append(separator.join(current))
+
+    return chunks
@@ -6,9 +6,12 @@ import logging
 import os
 import json
 import asyncio
+import inspect
+import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import pandas as pd
 import math
 
@@ -128,18 +131,80 @@ def display_data_table(data: List[Dict], title: str = "Данные"):
     with st.expander(f"📊 {title} ({len(data)} элементов)"):
         st.dataframe(df, use_container_width=True)
 
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Event loop текущего потока, создается при необходимости"""
+    try:
+        loop = asyncio.get_event_loop()
+    except RuntimeError:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+    
+    return loop
+
+def run_cancellable(awaitable, poll_interval: float = 0.25):
+    """Выполнение корутины с отменой при остановке или перезапуске скрипта Streamlit
+    
+    Streamlit прерывает скрипт исключением в момент вывода очередного элемента,
+    поэтому, пока корутина ждет ответа LLM, пустой элемент периодически
+    обновляется. Если пользователь ушел со страницы или перезапустил скрипт,
+    задача отменяется и закрывает запрос, а не дорабатывает в фоне.
+    """
+    loop = get_event_loop()
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return loop.run_until_complete(awaitable)
+    
+    heartbeat = st.empty()
+    task = asyncio.ensure_future(awaitable, loop=loop)
+    try:
+        while not task.done():
+            loop.run_until_complete(asyncio.wait({task}, timeout=poll_interval))
+            if not task.done():
+                heartbeat.empty()
+        return task.result()
+    finally:
+        if not task.done():
+            task.cancel()
+            loop.run_until_complete(asyncio.wait({task}))
+        if not task.cancelled():
+            # Ошибка уже проброшена или отменена вместе со скриптом
+            task.exception()
+
 def async_to_sync(async_func):
     """Декоратор для выполнения асинхронных функций в синхронном контексте"""
     def wrapper(*args, **kwargs):
+        return run_cancellable(async_func(*args, **kwargs))
+    
+    return wrapper
+
+def stream_markdown(token_stream, refresh_interval: float = 0.05) -> str:
+    """Прогрессивный вывод ответа LLM в Streamlit по мере прихода токенов
+    
+    Принимает асинхронный итератор токенов или корутину, которая его возвращает
+    (например, llm_client.summarize_emails(emails, stream=True)).
+    При остановке или перезапуске скрипта поток закрывается вместе с запросом.
+    """
+    placeholder = st.empty()
+    
+    async def consume() -> str:
+        stream = await token_stream if inspect.isawaitable(token_stream) else token_stream
+        text = ""
+        last_refresh = 0.0
+        
         try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+            async for token in stream:
+                text += token
+                # Не перерисовываем элемент на каждый токен
+                if time.monotonic() - last_refresh >= refresh_interval:
+                    placeholder.markdown(text + "▌")
+                    last_refresh = time.monotonic()
+        finally:
+            await stream.aclose()
         
-        return loop.run_until_complete(async_func(*args, **kwargs))
+        return text
     
-    return wrapper
+    text = run_cancellable(consume())
+    placeholder.markdown(text)
+    return text
 
 def create_sidebar_filters(filter_options: Dict[str, List]) -> Dict[str, Any]:
     """Создание фильтров в боковой панели"""
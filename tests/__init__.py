@@ -4,5 +4,23 @@ from . import test_llm_client
 from . import test_utilities
 from . import test_utils
 from . import test_basic
+from . import test_llm_cache
+from . import test_rate_limiter
+from . import test_single_flight
+from . import test_rolling_summary
+from . import test_semantic_cache
+from . import test_fake_llm
+from . import test_telemetry
+from . import test_model_router
+from . import test_batch
+from . import test_schemas
+from . import test_deadlines
+from . import test_prompt_packer
+from . import test_email_client
+from . import test_mail_store
+from . import test_mail_ingest
+from . import test_imap_idle
+from . import test_priority_classifier
+from . import test_mime_stream
 
-__all__ = ['test_config', 'test_llm_client', 'test_utilities', 'test_utils', 'test_basic']
\ No newline at end of file
+__all__ = ['test_config', 'test_llm_client', 'test_utilities', 'test_utils', 'test_basic', 'test_llm_cache', 'test_rate_limiter', 'test_single_flight', 'test_rolling_summary', 'test_semantic_cache', 'test_fake_llm', 'test_telemetry', 'test_model_router', 'test_batch', 'test_schemas', 'test_deadlines', 'test_prompt_packer', 'test_email_client', 'test_mail_store', 'test_mail_ingest', 'test_imap_idle', 'test_priority_classifier', 'test_mime_stream']
\ No newline at end of file
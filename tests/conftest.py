@@ -0,0 +1,53 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'utilities', 'email_manager'))
+
+from email_client import EmailClient
+from fake_imap import FakeIMAPServer, make_message
+from imap_pool import IMAPPool
+from shared import llm_client as llm_client_module
+from shared.config import Config
+from shared.fake_llm import FakeLLMServer
+from shared.llm_client import LLMClient
+from shared.telemetry import LLMTelemetry
+
+@pytest.fixture(autouse=True)
+def isolated_data_dir(tmp_path, monkeypatch):
+    """Журнал телеметрии, кэши и сводки тестов - во временном каталоге, а не в data/"""
+    data_dir = tmp_path / "data"
+    monkeypatch.setattr(Config, 'DATA_DIR', str(data_dir))
+    monkeypatch.setattr(Config, 'LLM_TELEMETRY_PATH', str(data_dir / "llm_telemetry.jsonl"))
+    # Клиенты без telemetry= пишут в общий экземпляр модуля, созданный при импорте
+    monkeypatch.setattr(llm_client_module, 'llm_telemetry', LLMTelemetry(str(data_dir / "llm_telemetry.jsonl")))
+
+@pytest.fixture
+def fake_server():
+    with FakeLLMServer(latency=0.01, tokens_per_second=500) as server:
+        yield server
+
+@pytest.fixture
+def make_llm_client():
+    """Фабрика LLMClient для фейкового сервера: без кэша, со своей телеметрией"""
+    def make(server, **options):
+        options.setdefault('telemetry', LLMTelemetry())
+        return LLMClient(api_key="sk-test", base_url=server.base_url, cache_enabled=False, **options)
+    return make
+
+@pytest.fixture
+def imap_server():
+    with FakeIMAPServer() as server:
+        for i in range(10):
+            server.add_message(make_message(f"Report {i}", f"Текст письма {i}"))
+        yield server
+
+@pytest.fixture
+def make_email_client():
+    """Фабрика EmailClient для фейкового IMAP сервера; options - параметры IMAPPool"""
+    def make(server, store=None, **options):
+        client = EmailClient(server.username, server.password, server.host, server.port, use_ssl=False, store=store)
+        # Отдельный пул на тест, чтобы общий реестр процесса не смешивал серверы
+        client.pool = IMAPPool(client._open_connection, **options)
+        return client
+    return make
@@ -0,0 +1,48 @@
+import pytest
+from shared import batch as batch_module
+from shared.batch import BatchSubmitter, LocalBatchSubmitter, OpenAIBatchSubmitter, read_jsonl
+from shared.fake_llm import FakeLLMServer
+from shared.llm_cache import LLMCache
+from shared.llm_client import LLMClient
+from shared.telemetry import LLMTelemetry
+
+@pytest.mark.asyncio
+async def test_local_batch_maps_results_and_warms_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_module.Config, 'LLM_BATCH_DIR', str(tmp_path / "batches"))
+    
+    with FakeLLMServer(responder=lambda request: f"ответ: {request['messages'][-1]['content']}") as server:
+        client = LLMClient(api_key="sk-test", base_url=server.base_url, cache_enabled=False,
+                           telemetry=LLMTelemetry())
+        client.cache = LLMCache(path=str(tmp_path / "cache.sqlite3"))
+        submitter = LocalBatchSubmitter(client, max_parallel=2)
+        
+        texts = ["первый", "второй", "третий"]
+        results = await client.analyze_batch(texts, operation="nightly", submitter=submitter, poll_interval=0.01)
+        assert results == ["ответ: первый", "ответ: второй", "ответ: третий"]
+        assert server.stats()['requests'] == 3
+        
+        # Повторный прогон целиком обслуживается кэшем, пакет не отправляется
+        batch = client.batch("nightly", submitter)
+        batch.add(client._build_messages("второй"))
+        assert await batch.run(poll_interval=0.01) == {'req-0': {'content': "ответ: второй", 'error': None}}
+        assert batch.batch_id is None
+    
+    inputs = list((tmp_path / "batches").glob("nightly_*_input.jsonl"))
+    assert len(inputs) == 1
+    assert read_jsonl(str(inputs[0]))[0]['url'] == "/v1/chat/completions"
+    # Каждый запрос пакета записан один раз, при сборе результатов
+    summary = client.telemetry_summary()
+    assert summary['nightly']['api_calls'] == 3
+    assert set(summary) == {'nightly'}
+
+
+def test_batch_is_created_outside_event_loop(monkeypatch):
+    monkeypatch.setattr(batch_module.Config, 'LLM_BATCH_SUBMITTER', 'openai')
+    client = LLMClient(api_key="sk-test", cache_enabled=False)
+    
+    # Синхронный код Streamlit: клиент OpenAI создается позже, внутри корутин отправителя
+    batch = client.batch("nightly")
+    assert isinstance(batch.submitter, OpenAIBatchSubmitter)
+    
+    with pytest.raises(TypeError):
+        BatchSubmitter()
@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import time
+import pytest
+from shared.config import Config
+from shared.fake_llm import FakeLLMServer, echo_responder
+from shared.llm_client import DeadlineExceeded
+from shared.utils import run_cancellable
+
+@pytest.mark.asyncio
+async def test_complete_raises_after_deadline(make_llm_client):
+    with FakeLLMServer(latency=2.0) as server:
+        client = make_llm_client(server)
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            await client.complete([{"role": "user", "content": "долгий запрос"}], deadline=0.2)
+        assert time.monotonic() - started < 1.0
+    
+    record = client.telemetry.recent[-1]
+    assert record['error'].startswith('DeadlineExceeded')
+    assert '_deadline_at' not in record
+
+@pytest.mark.asyncio
+async def test_analyze_text_reports_deadline_as_error(monkeypatch, make_llm_client):
+    monkeypatch.setattr(Config, 'LLM_REQUEST_TIMEOUT', 0.2)
+    with FakeLLMServer(latency=2.0) as server:
+        result = await make_llm_client(server).analyze_text("долгий запрос")
+    
+    assert result.startswith("Ошибка анализа")
+
+@pytest.mark.asyncio
+async def test_stream_idle_timeout_between_tokens(monkeypatch, make_llm_client):
+    monkeypatch.setattr(Config, 'LLM_STREAM_IDLE_TIMEOUT', 0.1)
+    with FakeLLMServer(tokens_per_second=2) as server:
+        client = make_llm_client(server)
+        tokens = []
+        with pytest.raises(DeadlineExceeded):
+            async for token in client.complete_stream([{"role": "user", "content": "поток"}]):
+                tokens.append(token)
+    
+    assert len(tokens) == 1
+    assert client.telemetry.recent[-1]['ttfb'] is not None
+
+@pytest.mark.asyncio
+async def test_hedged_request_wins_over_slow_attempt(make_llm_client):
+    calls = []
+    lock = threading.Lock()
+    
+    def slow_first(request):
+        with lock:
+            calls.append(request)
+            first = len(calls) == 1
+        if first:
+            time.sleep(1.5)
+        return echo_responder(request)
+    
+    with FakeLLMServer(responder=slow_first) as server:
+        client = make_llm_client(server)
+        client.hedge_enabled = True
+        client.hedge_min_samples = 1
+        
+        # Типичное время ответа операции - 0.05 с
+        sample = client.telemetry.start("hedge_test", client.model, stream=False)
+        sample['ttfb'] = 0.05
+        client.telemetry.finish(sample)
+        
+        started = time.monotonic()
+        result = await client.complete([{"role": "user", "content": "хедж"}], operation="hedge_test")
+        elapsed = time.monotonic() - started
+    
+    assert result == echo_responder({"messages": [{"content": "хедж"}]})
+    assert elapsed < 1.0
+    assert len(calls) == 2
+    assert client.telemetry.recent[-1]['hedged'] is True
+    assert client.telemetry_summary()['hedge_test']['hedged'] == 1
+
+@pytest.mark.asyncio
+async def test_no_hedge_without_enough_samples(make_llm_client):
+    with FakeLLMServer(latency=0.05) as server:
+        client = make_llm_client(server)
+        client.hedge_enabled = True
+        await client.complete([{"role": "user", "content": "один запрос"}], operation="hedge_test")
+    
+    assert server.stats()['requests'] == 1
+    assert client.telemetry.recent[-1]['hedged'] is False
+
+def test_run_cancellable_outside_streamlit():
+    async def answer():
+        await asyncio.sleep(0.01)
+        return 42
+    
+    assert run_cancellable(answer()) == 42
@@ -0,0 +1,246 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'utilities', 'email_manager'))
+
+import email_client
+from email_client import compact_message_set
+from fake_imap import FakeIMAPServer, make_message
+from mail_store import MailStore
+
+def test_get_emails_parses_messages(imap_server, make_email_client):
+    emails = make_email_client(imap_server).get_emails(limit=5)
+    assert [e['subject'] for e in emails] == [f"Report {i}" for i in range(5, 10)]
+    assert emails[0]['body'] == "Текст письма 5"
+
+def test_session_is_reused_across_operations(imap_server, make_email_client):
+    client = make_email_client(imap_server)
+    for i in range(1, 11):
+        assert client.mark_as_read(str(i))
+    
+    stats = imap_server.stats()
+    assert stats['logins'] == 1
+    # Папка выбирается один раз на сессию
+    assert stats['commands']['SELECT'] == 1
+    assert stats['commands']['STORE'] == 10
+    assert client.pool.stats()['reused'] == 9
+
+def test_reconnects_after_dropped_connection(imap_server, make_email_client):
+    client = make_email_client(imap_server)
+    assert client.mark_as_read("1")
+    
+    imap_server.drop_connections()
+    assert client.mark_as_read("2")
+    assert imap_server.stats()['logins'] == 2
+    assert client.pool.stats()['reconnects'] == 1
+
+def test_noop_health_check_replaces_dead_session(imap_server, make_email_client):
+    client = make_email_client(imap_server, check_interval=0)
+    client.connect()
+    
+    imap_server.drop_connections()
+    assert len(client.get_emails(limit=3)) == 3
+    assert client.pool.stats()['health_checks'] == 1
+    assert imap_server.stats()['logins'] == 2
+
+def test_idle_sessions_expire(imap_server, make_email_client):
+    client = make_email_client(imap_server, idle_timeout=0)
+    client.mark_as_read("1")
+    client.mark_as_read("2")
+    
+    assert imap_server.stats()['logins'] == 2
+    assert client.pool.stats()['expired'] == 1
+
+def test_delete_email_expunges(imap_server, make_email_client):
+    client = make_email_client(imap_server)
+    assert client.delete_email("1")
+    assert len(client.get_emails(limit=0)) == 9
+
+def test_bad_credentials_fail_cleanly(imap_server, make_email_client):
+    client = make_email_client(imap_server)
+    client.password = "wrong"
+    assert client.connect() is False
+    assert client.get_emails() == []
+    assert client.pool.stats()['in_use'] == 0
+
+def test_compact_message_set():
+    assert compact_message_set([5, 1, 2, 3, 7, 8]) == "1:3,5,7:8"
+    assert compact_message_set([4]) == "4"
+
+def test_get_emails_fetches_in_batches(make_email_client):
+    with FakeIMAPServer() as server:
+        for i in range(500):
+            server.add_message(make_message(f"Message {i}", "body"))
+        client = make_email_client(server)
+        client.fetch_batch_size = 50
+        
+        emails = client.get_emails(limit=0)
+        assert [e['id'] for e in emails] == [str(i) for i in range(1, 501)]
+        assert emails[-1]['subject'] == "Message 499"
+        assert server.stats()['commands']['FETCH'] == 10
+
+def test_sync_fetches_only_new_messages(imap_server, make_email_client):
+    client = make_email_client(imap_server, store=MailStore(':memory:'))
+    assert len(client.get_emails(limit=0)) == 10
+    assert client.last_sync['new'] == 10 and client.last_sync['full_resync']
+    
+    imap_server.add_message(make_message("Report 10", "новое"))
+    sent = imap_server.stats()['bytes_sent']
+    emails = client.get_emails(limit=0)
+    
+    assert [e['id'] for e in emails] == [str(uid) for uid in range(1, 12)]
+    assert client.last_sync['new'] == 1
+    # Повторно загружается только новое письмо и флаги остальных
+    assert imap_server.stats()['bytes_sent'] - sent < 2000
+    assert imap_server.stats()['commands']['UID FETCH'] == 3
+
+def test_sync_refreshes_flags_and_removals(imap_server, make_email_client):
+    client = make_email_client(imap_server, store=MailStore(':memory:'))
+    client.get_emails(limit=0)
+    # Загрузка через BODY.PEEK не отмечает письма прочитанными
+    assert imap_server.stats()['commands'].get('STORE') is None
+    
+    imap_server.set_flags(3, ('\\Seen',))
+    assert client.mark_as_read("4")
+    assert client.delete_email("5")
+    emails = {e['id']: e for e in client.get_emails(limit=0)}
+    
+    assert emails['3']['read'] and emails['4']['read'] and not emails['6']['read']
+    assert '5' not in emails
+    assert client.last_sync['flags_updated'] == 1
+    assert client.last_sync['new'] == 0
+
+def test_unparsed_flags_do_not_remove_messages(imap_server, monkeypatch, make_email_client):
+    client = make_email_client(imap_server, store=MailStore(':memory:'))
+    client.get_emails(limit=0)
+    
+    # Сервер прислал строку FETCH без UID для письма 7: оно не считается удаленным
+    parse = email_client.parse_fetch_attributes
+    def parse_without_uid(response):
+        number, uid, flags = parse(response)
+        return (number, None, flags) if uid == 7 else (number, uid, flags)
+    monkeypatch.setattr(email_client, 'parse_fetch_attributes', parse_without_uid)
+    
+    imap_server.remove_message(5)
+    assert client.refresh_flags() == (0, 1)
+    assert client.store.uids(client.account, "INBOX") == [1, 2, 3, 4, 6, 7, 8, 9, 10]
+
+def test_sync_without_date_downloads_only_limit(imap_server, make_email_client):
+    client = make_email_client(imap_server, store=MailStore(':memory:'))
+    emails = client.get_emails(limit=3)
+    
+    assert [e['subject'] for e in emails] == ["Report 7", "Report 8", "Report 9"]
+    assert client.last_sync['new'] == 3
+    
+    imap_server.add_message(make_message("Report 10", "новое"))
+    assert [e['subject'] for e in client.get_emails(limit=3)] == ["Report 8", "Report 9", "Report 10"]
+    assert client.last_sync['new'] == 1
+
+def test_uidvalidity_change_forces_full_resync(imap_server, make_email_client):
+    client = make_email_client(imap_server, store=MailStore(':memory:'))
+    client.get_emails(limit=0)
+    
+    imap_server.reset_uidvalidity()
+    client.pool.close_all()
+    emails = client.get_emails(limit=0)
+    
+    assert client.last_sync['full_resync']
+    assert client.last_sync['new'] == 10
+    assert [e['id'] for e in emails] == [str(uid) for uid in range(1, 11)]
+
+def test_stored_emails_are_shown_when_server_is_down(imap_server, make_email_client):
+    store = MailStore(':memory:')
+    make_email_client(imap_server, store=store).get_emails(limit=0)
+    
+    client = make_email_client(imap_server, store=store)
+    client.password = "wrong"
+    assert len(client.get_emails(limit=3)) == 3
+    assert 'error' in client.last_sync
+
+def test_preview_mode_skips_attachments(make_email_client):
+    with FakeIMAPServer() as server:
+        for i in range(5):
+            server.add_message(make_message(
+                f"Report {i}", "Срочно посмотрите " * 300, attachments=[("scan.pdf", b"%PDF" * 250000)]
+            ))
+        client = make_email_client(server, store=MailStore(':memory:'))
+        client.preview_bytes = 512
+        
+        emails = client.get_emails(limit=0)
+        assert client.last_sync['bytes'] < 5 * 1024
+        assert emails[0]['body'].startswith("Срочно посмотрите")
+        assert emails[0]['priority'] == "high"
+        assert emails[0]['attachments'] == ["scan.pdf"]
+        assert emails[0]['preview'] and emails[0]['size'] > 1000000
+        
+        details = client.get_email_body(emails[0]['id'])
+        assert len(details['body']) > len(emails[0]['body'])
+        assert not client.get_emails(limit=0)[0]['preview']
+        # Превью и полная загрузка не отмечают письма прочитанными
+        assert not client.get_emails(limit=0)[0]['read']
+
+def test_preview_finds_nested_text_part(make_email_client):
+    with FakeIMAPServer() as server:
+        server.add_message(make_message("Alt", "plain text", html="<p>html text</p>", attachments=[("a.bin", b"x")]))
+        server.add_message(make_message("Plain", "simple body"))
+        emails = make_email_client(server).get_emails(limit=0)
+        
+        assert [e['body'] for e in emails] == ["plain text", "simple body"]
+        assert emails[0]['attachments'] == ["a.bin"]
+        # Для текста из раздела 1.1 нужен один дополнительный FETCH
+        assert server.stats()['commands']['FETCH'] == 2
+
+def test_literal_inside_bodystructure():
+    filename = "отчёт.pdf".encode('utf-8')
+    response = [
+        (b'1 (UID 5 BODYSTRUCTURE (("text" "plain" ("charset" "utf-8") NIL NIL "7bit" 4 1 NIL NIL NIL NIL)'
+         b'("application" "pdf" NIL NIL NIL "base64" 100 NIL ("attachment" ("filename" {%d}' % len(filename), filename),
+        b')) NIL NIL) "mixed" ("boundary" "b") NIL NIL NIL))'
+    ]
+    message = email_client.group_fetch_response(response)[0]
+    structure = email_client.parse_bodystructure(message['attributes'].decode('utf-8', 'replace'))
+    
+    parts = email_client.message_parts(structure)
+    assert [p['filename'] for p in parts] == [None, "отчёт.pdf"]
+    assert parts[1]['attachment'] and parts[1]['size'] == 100
+
+def test_broken_bodystructure_falls_back_to_full_fetch(imap_server, make_email_client, monkeypatch):
+    parse_bodystructure = email_client.parse_bodystructure
+    
+    def parse(attributes):
+        if attributes.startswith('3 ('):
+            raise IndexError("string index out of range")
+        return parse_bodystructure(attributes)
+    
+    monkeypatch.setattr(email_client, 'parse_bodystructure', parse)
+    emails = make_email_client(imap_server).get_emails(limit=0)
+    
+    assert [e['body'] for e in emails] == [f"Текст письма {i}" for i in range(10)]
+    # Письмо с неразобранной структурой догружается целиком отдельным FETCH, остальные остаются превью
+    assert imap_server.stats()['commands']['FETCH'] == 2
+
+def test_full_fetch_mode(imap_server, make_email_client):
+    client = make_email_client(imap_server)
+    client.fetch_mode = "full"
+    emails = client.get_emails(limit=2)
+    assert [e['body'] for e in emails] == ["Текст письма 8", "Текст письма 9"]
+    assert 'preview' not in emails[0]
+
+def test_full_fetch_mode_classifies_whole_body(make_email_client):
+    with FakeIMAPServer() as server:
+        server.add_message(make_message("Отчет", "Добрый день. " * 1000 + "Ответьте срочно"))
+        client = make_email_client(server)
+        assert client.get_emails(limit=0)[0]['priority'] == "medium"
+        
+        client.fetch_mode = "full"
+        assert client.get_emails(limit=0)[0]['priority'] == "high"
+
+def test_search_runs_without_server_round_trips(imap_server, make_email_client):
+    client = make_email_client(imap_server, store=MailStore(':memory:'))
+    client.get_emails(limit=0)
+    commands = sum(imap_server.stats()['commands'].values())
+    
+    assert [e['subject'] for e in client.search_emails("письма 7")] == ["Report 7"]
+    assert client.activity_stats()['total'] == 10
+    assert sum(imap_server.stats()['commands'].values()) == commands
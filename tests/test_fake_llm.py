@@ -0,0 +1,30 @@
+import json
+import pytest
+from shared.fake_llm import FakeLLMServer, LLMRecorder, ReplayResponder
+from shared.llm_client import LLMClient
+
+@pytest.mark.asyncio
+async def test_record_and_replay(tmp_path):
+    path = str(tmp_path / "recording.jsonl")
+    messages = [{"role": "user", "content": "Что нового?"}]
+    
+    with FakeLLMServer(responder=lambda request: "записанный ответ") as server:
+        client = LLMClient(api_key="sk-test", base_url=server.base_url, cache_enabled=False,
+                           recorder=LLMRecorder(path))
+        assert await client.complete(messages) == "записанный ответ"
+    
+    with open(path, encoding='utf-8') as f:
+        entry = json.loads(f.readline())
+    assert entry['messages'] == messages
+    assert entry['response'] == "записанный ответ"
+    
+    replay = ReplayResponder(path)
+    with FakeLLMServer(responder=replay) as server:
+        client = LLMClient(api_key="sk-test", base_url=server.base_url, cache_enabled=False)
+        assert await client.complete(messages) == "записанный ответ"
+        
+        with pytest.raises(Exception):
+            await client.complete([{"role": "user", "content": "не записан"}])
+    
+    assert replay.hits == 1
+    assert replay.misses == 1
@@ -0,0 +1,90 @@
+import os
+import sys
+import time
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'utilities', 'email_manager'))
+
+from fake_imap import make_message
+from imap_idle import IdleListener
+from mail_store import MailStore
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+@pytest.fixture
+def listen(imap_server):
+    listeners = []
+
+    def start(client, **options):
+        listener = IdleListener(client, poll_interval=0.05, **options).start()
+        listeners.append(listener)
+        wait_until(lambda: imap_server.stats()['commands'].get('IDLE'))
+        return listener
+
+    yield start
+    for listener in listeners:
+        listener.stop()
+
+def test_new_mail_is_pushed_without_polling(imap_server, listen, make_email_client):
+    client = make_email_client(imap_server, store=MailStore(':memory:'))
+    client.get_emails(limit=0)
+    listener = listen(client)
+    commands = imap_server.stats()['commands']
+
+    started = time.monotonic()
+    imap_server.add_message(make_message("Report 10", "новое письмо"))
+    assert listener.wait(0, timeout=5) == 1
+    assert time.monotonic() - started < 2
+
+    event = listener.events_since(0)[0]
+    assert [e['subject'] for e in event['emails']] == ["Report 10"]
+    assert [e['subject'] for e in client.get_emails(limit=1)] == ["Report 10"]
+    # Загружено только новое письмо, полного поиска по папке не было
+    after = imap_server.stats()['commands']
+    assert after['UID FETCH'] - commands['UID FETCH'] <= 3
+    assert after.get('SEARCH', 0) == commands.get('SEARCH', 0)
+
+def test_expunge_removes_stored_message(imap_server, listen, make_email_client):
+    client = make_email_client(imap_server, store=MailStore(':memory:'))
+    client.get_emails(limit=0)
+    listener = listen(client)
+
+    imap_server.remove_message(2)
+    assert listener.wait(0, timeout=5) == 1
+    assert listener.events_since(0)[0]['removed'] == 1
+    assert client.store.uids(client.account, "INBOX") == [1] + list(range(3, 11))
+
+def test_listener_without_store_tracks_uids(imap_server, listen, make_email_client):
+    events = []
+    listener = listen(make_email_client(imap_server))
+    listener.subscribe(events.append)
+
+    imap_server.add_message(make_message("First", "a"))
+    listener.wait(0, timeout=5)
+    imap_server.add_message(make_message("Second", "b"))
+    listener.wait(1, timeout=5)
+
+    assert [[e['subject'] for e in event['emails']] for event in events] == [["First"], ["Second"]]
+    assert listener.highest_uid == 12
+
+def test_idle_is_renewed_and_reconnects(imap_server, listen, make_email_client):
+    listener = listen(make_email_client(imap_server), renew_interval=0.1, retry_delay=0)
+    wait_until(lambda: listener.idle_commands >= 3)
+    assert listener.version == 0
+
+    imap_server.drop_connections()
+    wait_until(lambda: listener.reconnects == 1)
+    imap_server.add_message(make_message("After reconnect", "c"))
+    listener.wait(0, timeout=5)
+    assert listener.events_since(0)[0]['emails'][0]['subject'] == "After reconnect"
+
+def test_stop_ends_idle_and_logs_out(imap_server, listen, make_email_client):
+    listener = listen(make_email_client(imap_server))
+    listener.stop()
+
+    assert not listener.running
+    assert imap_server.stats()['commands']['LOGOUT'] == 1
@@ -0,0 +1,50 @@
+import time
+import pytest
+from shared.llm_cache import LLMCache
+from shared.llm_client import LLMClient
+
+def test_cache_hit_and_miss(tmp_path):
+    cache = LLMCache(path=str(tmp_path / "cache.sqlite3"), max_entries=10, default_ttl=60)
+    key = LLMCache.make_key("gpt", [{"role": "user", "content": "hi"}], 0.7, 100)
+    
+    assert cache.get(key) is None
+    cache.set(key, "hello")
+    assert cache.get(key) == "hello"
+    
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+
+def test_cache_ttl_expiry(tmp_path, monkeypatch):
+    cache = LLMCache(path=str(tmp_path / "cache.sqlite3"), max_entries=10, default_ttl=60)
+    cache.set("short", "old", ttl=1)
+    cache.set("long", "new")
+    
+    now = time.time()
+    monkeypatch.setattr("shared.llm_cache.time.time", lambda: now + 10)
+    
+    assert cache.get("short") is None
+    assert cache.get("long") == "new"
+
+def test_cache_lru_eviction(tmp_path):
+    cache = LLMCache(path=str(tmp_path / "cache.sqlite3"), max_entries=2, default_ttl=60)
+    
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+    
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+    assert cache.stats()['entries'] == 2
+
+@pytest.mark.asyncio
+async def test_complete_served_from_cache(tmp_path):
+    client = LLMClient(api_key="", cache_enabled=False)
+    client.cache = LLMCache(path=str(tmp_path / "cache.sqlite3"))
+    messages = [{"role": "user", "content": "cached"}]
+    client.cache.set(LLMCache.make_key(client.model, messages, 0.7, 1000), "from cache")
+    
+    assert await client.complete(messages) == "from cache"
+    assert client.cache_stats()['hits'] == 1
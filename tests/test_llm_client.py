@@ -1,10 +1,91 @@
 import pytest
 import asyncio
-from shared.llm_client import LLMClient
+import subprocess
+import sys
+from shared.fake_llm import FakeLLMServer
+from shared.llm_client import LLMClient, _LazyLLMClient
+from shared.tokens import estimate_tokens, pack_chunks
 
 @pytest.mark.asyncio
-async def test_analyze_text():
-    client = LLMClient()
+async def test_analyze_text(fake_server, make_llm_client):
+    client = make_llm_client(fake_server)
     result = await client.analyze_text("Hello, world!", context="test")
     assert isinstance(result, str)
-    assert len(result) > 0
\ No newline at end of file
+    assert len(result) > 0
+    assert not result.startswith("Ошибка анализа")
+    assert fake_server.stats()['requests'] == 1
+
+@pytest.mark.asyncio
+async def test_analyze_text_stream(fake_server, make_llm_client):
+    client = make_llm_client(fake_server)
+    tokens = [token async for token in client.analyze_text_stream("Hello, stream!")]
+    assert len(tokens) > 1
+    assert "".join(tokens) == await make_llm_client(fake_server).analyze_text("Hello, stream!")
+
+@pytest.mark.asyncio
+async def test_injected_errors_surface_after_retries(make_llm_client):
+    with FakeLLMServer(error_rate=1.0) as server:
+        client = make_llm_client(server)
+        client.max_retries = 0
+        result = await client.analyze_text("fail")
+    
+    assert result.startswith("Ошибка анализа")
+    assert server.stats()['errors'] == 1
+
+def test_pack_chunks_respects_budget():
+    items = ["x" * 300 for _ in range(10)]
+    chunks = pack_chunks(items, max_tokens=250)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 250 for chunk in chunks)
+    assert sum(chunk.count("x") for chunk in chunks) == 3000
+
+@pytest.mark.asyncio
+async def test_map_reduce_reports_chunks():
+    client = LLMClient(api_key="", cache_enabled=False, chunk_tokens=200, max_parallel=2)
+    calls = []
+    
+    async def fake_complete(messages, **kwargs):
+        calls.append(messages[-1]["content"])
+        return "частичная сводка"
+    
+    client.complete = fake_complete
+    result = await client.map_reduce(["письмо " * 100 for _ in range(6)], "контекст")
+    
+    assert result['chunks'] == 6
+    assert len(calls) == result['chunks'] + 1
+    assert result['summary'] == "частичная сводка"
+    assert result['map_seconds'] >= 0 and result['reduce_seconds'] >= 0
+
+@pytest.mark.asyncio
+async def test_helper_stream_yields_tokens():
+    client = LLMClient(api_key="", cache_enabled=False)
+    
+    async def fake_stream(messages, **kwargs):
+        for token in ["1. ", "Задача"]:
+            yield token
+    
+    client.complete_stream = fake_stream
+    stream = await client.create_action_items("заметки", stream=True)
+    assert [token async for token in stream] == ["1. ", "Задача"]
+
+def test_import_does_not_load_openai():
+    code = (
+        "import sys; from shared.llm_client import llm_client; "
+        "print('openai' in sys.modules, llm_client._instance is None)"
+    )
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert output.stdout.split() == ["False", "True"]
+
+def test_lazy_client_is_created_once_on_first_use():
+    created = []
+    
+    def factory():
+        created.append(LLMClient(api_key="", cache_enabled=False))
+        return created[-1]
+    
+    client = _LazyLLMClient(factory)
+    assert created == []
+    
+    client.max_retries = 1
+    assert client.cache_stats() == {'enabled': False}
+    assert len(created) == 1 and created[0].max_retries == 1
@@ -0,0 +1,90 @@
+import os
+import sys
+import time
+from contextlib import ExitStack
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'utilities', 'email_manager'))
+
+from email_client import EmailClient
+from fake_imap import FakeIMAPServer, make_message
+from imap_pool import IMAPPool
+from mail_ingest import MailIngestor
+from mail_store import MailStore
+
+FOLDERS = ["INBOX", "Sent", "Drafts"]
+
+def start_servers(stack, count, latency=0.0):
+    servers = []
+    for n in range(count):
+        server = stack.enter_context(FakeIMAPServer(username=f"boss{n}", latency=latency))
+        for i, folder in enumerate(FOLDERS):
+            sent = datetime(2024, 6, 1, tzinfo=timezone.utc) + timedelta(hours=n * 10 + i)
+            server.add_message(make_message(f"{folder} {n}", "text", date=sent), folder=folder)
+        servers.append(server)
+    return servers
+
+def make_clients(servers, pool_size=1, store=None):
+    clients = []
+    for server in servers:
+        client = EmailClient(server.username, server.password, server.host, server.port, use_ssl=False, store=store)
+        client.pool = IMAPPool(client._open_connection, max_size=pool_size)
+        clients.append(client)
+    return clients
+
+def test_ingest_merges_all_mailboxes_and_folders():
+    with ExitStack() as stack:
+        servers = start_servers(stack, 3)
+        result = MailIngestor(make_clients(servers, store=MailStore(':memory:'))).ingest({'*': FOLDERS})
+        
+        assert len(result['emails']) == 9
+        assert [e['subject'] for e in result['emails'][:2]] == ["Drafts 2", "Sent 2"]
+        assert {(e['mailbox'], e['folder']) for e in result['emails']} == {
+            (f"boss{n}", folder) for n in range(3) for folder in FOLDERS
+        }
+        assert [r['new'] for r in result['reports']] == [1] * 9
+
+def test_dateless_ingest_downloads_only_limit():
+    with FakeIMAPServer() as server:
+        for i in range(20):
+            server.add_message(make_message(f"Report {i}", "text"))
+        store = MailStore(':memory:')
+        result = MailIngestor(make_clients([server], store=store)).ingest(since_date=None, limit=5)
+        
+        assert result['reports'][0]['new'] == 5
+        assert len(result['emails']) == 5
+        assert store.stats()['messages'] == 5
+
+def test_per_account_connection_limit():
+    with ExitStack() as stack:
+        servers = start_servers(stack, 2, latency=0.02)
+        clients = make_clients(servers, pool_size=1)
+        MailIngestor(clients, max_workers=6).ingest({'*': FOLDERS})
+        
+        # Папки одного ящика идут по очереди через единственную сессию
+        assert [server.stats()['logins'] for server in servers] == [1, 1]
+        assert [client.pool.stats()['created'] for client in clients] == [1, 1]
+
+def test_wall_time_is_close_to_slowest_mailbox():
+    with ExitStack() as stack:
+        servers = start_servers(stack, 6, latency=0.05)
+        clients = make_clients(servers)
+        
+        started = time.perf_counter()
+        clients[0].get_emails("INBOX", limit=0)
+        single = time.perf_counter() - started
+        clients[0].pool.close_all()
+        
+        result = MailIngestor(clients, max_workers=6).ingest()
+        assert len(result['emails']) == 6
+        assert result['seconds'] < single * 3
+
+def test_failed_mailbox_does_not_stop_others():
+    with ExitStack() as stack:
+        servers = start_servers(stack, 2)
+        clients = make_clients(servers)
+        clients[0].password = "wrong"
+        result = MailIngestor(clients).ingest({'boss1': ["INBOX", "Sent"]})
+        
+        assert [e['mailbox'] for e in result['emails']] == ["boss1", "boss1"]
+        assert [r['emails'] for r in result['reports']] == [0, 1, 1]
@@ -0,0 +1,78 @@
+import os
+import sqlite3
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'utilities', 'email_manager'))
+
+from mail_store import MailStore, fts_query
+
+def make_email(uid, subject, body="", sender="anna@example.com", hour=10, day=1, priority="low",
+               flags=(), attachments=()):
+    return {
+        'id': str(uid), 'uid': uid, 'subject': subject, 'from': sender, 'to': "me@example.com",
+        'date': f"2024-06-{day:02d}T{hour:02d}:15:00+03:00", 'body': body, 'priority': priority,
+        'attachments': list(attachments), 'flags': list(flags)
+    }
+
+def filled_store():
+    store = MailStore(':memory:')
+    store.save_messages("acc", "INBOX", [
+        make_email(1, "Квартальный отчет", "Отчеты готовы к пятнице", priority="medium", hour=9),
+        make_email(2, "Срочно: сервер упал", "Нужна помощь", sender="ops@example.com", priority="high",
+                   hour=9, flags=("\\Seen",)),
+        make_email(3, "Обед", "Пойдем в кафе", hour=13, day=5),
+        make_email(4, "Договор", "см. вложение", attachments=("договор_2024.pdf",), hour=18, day=5),
+    ])
+    return store
+
+def test_fts_query_quotes_words_as_prefixes():
+    assert fts_query('отчет "пятница" OR') == '"отчет"* "пятница"* "OR"*'
+
+def test_search_by_text_sender_and_attachment():
+    store = filled_store()
+    search = lambda q: [e['uid'] for e in store.list_messages("acc", "INBOX", query=q)]
+    
+    assert search("отчет") == [1]
+    assert search("ops") == [2]
+    assert search("договор") == [4]
+    assert search("кафе обед") == [3]
+    assert search("несуществующее") == []
+
+def test_filters_counts_and_hourly_activity():
+    store = filled_store()
+    
+    assert [e['uid'] for e in store.list_messages("acc", "INBOX", priority="high")] == [2]
+    assert [e['uid'] for e in store.list_messages("acc", "INBOX", read=False, since=date(2024, 6, 5))] == [3, 4]
+    assert store.counts("acc", "INBOX") == {'total': 4, 'unread': 3, 'important': 1}
+    assert store.hourly_counts("acc", "INBOX") == {9: 2, 13: 1, 18: 1}
+    assert store.hourly_counts("acc", "INBOX", since=date(2024, 6, 5)) == {13: 1, 18: 1}
+
+def test_index_follows_updates_and_removals():
+    store = filled_store()
+    store.update_message("acc", "INBOX", 3, {'body': "Пойдем в столовую"})
+    store.update_flags("acc", "INBOX", {3: ["\\Seen"]})
+    store.remove_messages("acc", "INBOX", {1})
+    
+    assert store.list_messages("acc", "INBOX", query="кафе") == []
+    assert [e['uid'] for e in store.list_messages("acc", "INBOX", query="столовую", read=True)] == [3]
+    assert store.list_messages("acc", "INBOX", query="отчет") == []
+    
+    store.reset_folder("acc", "INBOX", uidvalidity=2, since=None)
+    assert store.list_messages("acc", None, query="договор") == []
+
+def test_old_store_is_migrated(tmp_path):
+    path = str(tmp_path / "mail.sqlite3")
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE messages (account TEXT NOT NULL, folder TEXT NOT NULL, uid INTEGER NOT NULL, day TEXT, "
+        "flags TEXT NOT NULL, data TEXT NOT NULL, PRIMARY KEY (account, folder, uid))"
+    )
+    connection.execute("INSERT INTO messages VALUES ('acc', 'INBOX', 1, NULL, '', '{}')")
+    connection.commit()
+    connection.close()
+    
+    store = MailStore(path)
+    assert store.stats()['messages'] == 0
+    store.save_messages("acc", "INBOX", [make_email(1, "Новая схема")])
+    assert store.counts("acc", "INBOX")['total'] == 1
@@ -0,0 +1,69 @@
+import os
+import sys
+import tracemalloc
+from email.message import EmailMessage
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'utilities', 'email_manager'))
+
+from fake_imap import make_message
+from mime_stream import StreamingMessageParser, parse_message
+
+def test_text_and_attachments_from_one_pass():
+    raw = make_message("Hello", "Привет, коллеги", html="<p>html</p>",
+                       attachments=[("отчёт.pdf", b"%PDF" * 1000), ("b.bin", b"x" * 10)])
+    parsed = parse_message(raw)
+    
+    assert parsed['headers']['From'] == "sender@example.com"
+    assert parsed['body'] == "Привет, коллеги"
+    assert not parsed['truncated']
+    assert parsed['attachments'] == [
+        {'filename': "отчёт.pdf", 'type': "application/octet-stream", 'size': 4000},
+        {'filename': "b.bin", 'type': "application/octet-stream", 'size': 10}
+    ]
+    assert parsed['size'] == len(raw)
+
+def test_small_chunks_give_same_result():
+    raw = make_message("Hello", "текст\n--\nподпись", html="<b>x</b>", attachments=[("a.bin", bytes(range(256)) * 50)])
+    parser = StreamingMessageParser()
+    for offset in range(0, len(raw), 7):
+        parser.feed(raw[offset:offset + 7])
+    
+    chunked, whole = parser.close(), parse_message(raw)
+    assert chunked['body'] == whole['body'] == "текст\n--\nподпись"
+    assert chunked['attachments'] == whole['attachments']
+
+def test_html_fallback_and_text_limit():
+    assert parse_message(make_message("Hi", "", html="<p>только <b>html</b></p>"))['body'] == "только html"
+    
+    parsed = parse_message(make_message("Hi", "длинный текст " * 1000), text_limit=100)
+    assert len(parsed['body']) <= 100 and parsed['body'].startswith("длинный текст")
+    assert parsed['truncated']
+
+def test_nested_parts_and_declared_size():
+    inner = EmailMessage()
+    inner['Subject'] = "Вложенное"
+    inner.set_content("inner text")
+    
+    message = EmailMessage()
+    message['Subject'] = "Outer"
+    message.set_content("внешний текст", cte='quoted-printable')
+    message.add_alternative("<p>html</p>", subtype='html')
+    message.add_attachment(b"data", maintype='application', subtype='pdf', filename="scan.pdf")
+    list(message.iter_attachments())[-1].set_param('size', '12345', header='Content-Disposition')
+    message.add_attachment(inner, filename="forward.eml")
+    
+    parsed = parse_message(message.as_bytes())
+    assert parsed['body'] == "внешний текст"
+    assert [(a['filename'], a['size']) for a in parsed['attachments']][0] == ("scan.pdf", 12345)
+    assert parsed['attachments'][1]['type'] == "message/rfc822"
+
+def test_attachment_payload_is_not_kept_in_memory():
+    raw = make_message("Scan", "см. вложение", attachments=[("scan.pdf", os.urandom(5 * 1024 * 1024))])
+    
+    tracemalloc.start()
+    parsed = parse_message(raw)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    assert parsed['attachments'][0]['size'] == 5 * 1024 * 1024
+    assert peak < 1024 * 1024
@@ -0,0 +1,72 @@
+import pytest
+from shared import llm_client as llm_client_module
+from shared.fake_llm import FakeLLMServer
+from shared.llm_client import LLMClient
+from shared.model_router import ModelRouter
+from shared.telemetry import LLMTelemetry
+from shared.tokens import estimate_tokens
+
+def make_router():
+    return ModelRouter(models=['gpt-4o', 'gpt-3.5-turbo', 'gpt-4o-mini'], quality_model='gpt-4o',
+                       quality_operations=['create_action_items'])
+
+def test_small_prompt_gets_cheapest_model():
+    router = make_router()
+    assert router.models[0] == 'gpt-4o-mini'
+    assert router.route(200, 500, 'summarize_emails')['model'] == 'gpt-4o-mini'
+    assert router.route(200, 500, 'create_action_items')['model'] == 'gpt-4o'
+
+def test_large_prompt_falls_back_to_bigger_window():
+    router = ModelRouter(models=['gpt-3.5-turbo', 'gpt-4o'], quality_model='', quality_operations=[])
+    
+    assert router.route(5000, 1000)['model'] == 'gpt-3.5-turbo'
+    decision = router.route(60000, 1000)
+    assert decision['model'] == 'gpt-4o'
+    assert router.stats() == {'gpt-3.5-turbo': 1, 'gpt-4o': 1}
+
+def test_latency_target_prefers_faster_model():
+    router = ModelRouter(models=['gpt-4-turbo', 'gpt-4o'], quality_model='', quality_operations=[])
+    # Первой считаем более дешевую, но медленную модель
+    router.models = ['gpt-4-turbo', 'gpt-4o']
+    
+    assert router.route(100, 600)['model'] == 'gpt-4-turbo'
+    assert router.route(100, 600, latency_target=15)['model'] == 'gpt-4o'
+
+@pytest.mark.asyncio
+async def test_client_sends_routed_model():
+    models = []
+    
+    def responder(request):
+        models.append(request['model'])
+        return "ок"
+    
+    with FakeLLMServer(responder=responder) as server:
+        client = LLMClient(api_key="sk-test", base_url=server.base_url, cache_enabled=False,
+                           router=make_router())
+        await client.analyze_text("короткий вопрос")
+        await client.create_action_items("заметки")
+    
+    assert models == ['gpt-4o-mini', 'gpt-4o']
+
+@pytest.mark.asyncio
+async def test_stream_counts_tokens_with_routed_model(monkeypatch):
+    counted = []
+    
+    def spy(text, model=None):
+        counted.append(model)
+        return estimate_tokens(text, model)
+    
+    with FakeLLMServer(responder=lambda request: "потоковый ответ") as server:
+        client = LLMClient(api_key="sk-test", base_url=server.base_url, cache_enabled=False,
+                           router=make_router(), telemetry=LLMTelemetry())
+        model = client.select_model(client._build_messages("заметки"), 1000, "create_action_items")
+        assert model != client.model
+        monkeypatch.setattr(llm_client_module, 'estimate_tokens', spy)
+        tokens = await client.create_action_items("заметки", stream=True)
+        assert "".join([token async for token in tokens]) == "потоковый ответ"
+    
+    record = client.telemetry.recent[-1]
+    assert record['model'] == model == 'gpt-4o'
+    assert record['completion_tokens'] > 0
+    # Расход в конце потока: системное сообщение, промпт и ответ считаются токенизатором выбранной модели
+    assert counted[-3:] == [model] * 3
@@ -0,0 +1,52 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'utilities', 'email_manager'))
+
+from priority_classifier import PriorityClassifier, priority_classifier
+
+def test_russian_word_forms_match():
+    result = priority_classifier.classify("Срочного ответа ждем", "Прошу прислать отчёт по проекту")
+    assert result == {'priority': 'high', 'keywords': ['срочно', 'отчет', 'проект']}
+    assert priority_classifier.classify("", "Назначим встречу на завтра")['keywords'] == ["встреча"]
+
+def test_long_russian_endings_match():
+    # Окончания длиннее четырех букв находила и прежняя проверка подстрокой
+    assert priority_classifier.classify("Встречаемся в пятницу", "")['priority'] == "medium"
+    assert priority_classifier.classify("", "Созвонимся после обеда")['keywords'] == ["созвон"]
+    assert priority_classifier.classify("", "с важнейшими замечаниями")['priority'] == "high"
+
+def test_whole_words_only():
+    assert priority_classifier.classify("Unimportant recall", "multitasking callback")['priority'] == "low"
+    assert priority_classifier.classify("", "two calls and several meetings")['keywords'] == ["call", "meeting"]
+    assert priority_classifier.classify("Emergencies", "")['keywords'] == ["emergency"]
+
+def test_headers_raise_priority():
+    result = priority_classifier.classify("Hello", "text", {'X-Priority': '1'})
+    assert result == {'priority': 'high', 'keywords': []}
+    assert priority_classifier.classify("Hello", "text", {'Importance': 'High'})['priority'] == "high"
+
+def test_batch_matches_single_calls():
+    messages = [
+        {'subject': "Задача", 'body': "Проверить важные документы"},
+        {'subject': "Newsletter", 'body': "weekly digest"},
+        {'subject': "", 'body': "ASAP please", 'headers': {'Importance': 'normal'}},
+        {'subject': "Созвон", 'body': ""}
+    ]
+    expected = [priority_classifier.classify(m['subject'], m['body'], m.get('headers')) for m in messages]
+    assert priority_classifier.classify_batch(messages) == expected
+    assert [r['priority'] for r in expected] == ["high", "low", "high", "medium"]
+
+def test_scan_window_and_custom_keywords():
+    body = "текст " * 1000 + "срочно"
+    assert PriorityClassifier(scan_chars=100).classify("", body)['priority'] == "low"
+    assert PriorityClassifier(scan_chars=0).classify("", body)['priority'] == "high"
+    assert PriorityClassifier(scan_chars=100).classify_batch([{'body': body}], scan_chars=0)[0]['priority'] == "high"
+    
+    classifier = PriorityClassifier(high_keywords=["авария"], medium_keywords=["счет"])
+    assert classifier.classify("Авария на сервере", "")['keywords'] == ["авария"]
+    assert classifier.classify("Счёта за май", "срочно")['priority'] == "medium"
+    
+    # Пустой список - без ключевых слов уровня, а не слова по умолчанию
+    assert PriorityClassifier(high_keywords=[]).classify("Срочно", "встреча")['priority'] == "medium"
+    assert PriorityClassifier(high_keywords=[], medium_keywords=[]).classify("Срочно", "")['priority'] == "low"
@@ -0,0 +1,92 @@
+from shared.llm_client import LLMClient
+from shared.prompt_packer import allocate, clean_body, pack_items
+from shared.tokens import estimate_tokens
+
+REPLY = """Коллеги, отчет готов, посмотрите до пятницы.
+
+С уважением,
+Иван Петров
++7 900 000-00-00
+
+On Mon, 3 Jun 2024 at 10:00, Анна <anna@example.com> wrote:
+> Когда будет отчет?
+> Спасибо"""
+
+def test_clean_body_strips_quotes_and_signature():
+    assert clean_body(REPLY) == "Коллеги, отчет готов, посмотрите до пятницы."
+    assert clean_body("Текст\n-- \nПодпись") == "Текст"
+    assert clean_body("> цитата\nответ") == "ответ"
+
+def test_signature_phrase_in_middle_is_kept():
+    body = "Regards to the team for the release.\n" + "\n".join(f"строка {i}" for i in range(20))
+    assert clean_body(body) == body
+
+def test_allocate_is_fair_by_weight():
+    # Маленькой потребности хватает своей доли, остаток делится по весам
+    assert allocate([10, 1000, 1000], [1, 3, 1], 410) == [10, 300, 100]
+    assert sum(allocate([500] * 5, [2] * 5, 1000)) <= 1000
+
+def test_pack_items_fits_budget_and_reports_tokens():
+    items = [
+        {'header': f"Письмо {i}\nСодержание: ", 'body': "текст " * 400, 'priority': p}
+        for i, p in enumerate(['high', 'low', 'medium', 'low'])
+    ]
+    packed = pack_items(items, budget=600)
+    
+    assert estimate_tokens("\n\n".join(packed['items'])) <= 600
+    assert packed['tokens'] <= 600
+    tokens = [entry['body_tokens'] for entry in packed['report']]
+    assert tokens[0] > tokens[2] > tokens[1] == tokens[3] > 0
+    assert packed['truncated'] == 4
+    assert packed['items'][0].endswith("...")
+
+def test_short_items_are_not_truncated():
+    packed = pack_items([{'header': "Задача: ", 'body': "коротко", 'priority': 'Normal'}], budget=1000)
+    assert packed['items'] == ["Задача: коротко"]
+    assert packed['truncated'] == 0
+
+def test_pack_emails_gives_important_email_more_tokens():
+    client = LLMClient(api_key="", cache_enabled=False, chunk_tokens=400)
+    emails = [
+        {'from': 'a', 'subject': 'Срочно', 'body': "важно " * 500, 'priority': 'high'},
+        {'from': 'b', 'subject': 'Рассылка', 'body': "новости " * 500, 'priority': 'low'},
+        {'from': 'c', 'subject': 'Ответ', 'body': REPLY, 'priority': 'medium'},
+    ]
+    packed = client.pack_emails(emails)
+    report = packed['report']
+    
+    assert report[0]['body_tokens'] > report[1]['body_tokens']
+    assert report[2]['body_tokens'] < report[2]['original_body_tokens']
+    assert not report[2]['truncated']
+    assert "wrote:" not in packed['items'][2]
+    assert packed['tokens'] <= 400
+
+def test_many_emails_keep_bodies_across_chunks():
+    client = LLMClient(api_key="", cache_enabled=False, chunk_tokens=3000)
+    emails = [
+        {'from': f'user{i}@example.com', 'subject': f'Тема {i}', 'body': "подробности письма " * 100,
+         'priority': ['high', 'medium', 'low'][i % 3]}
+        for i in range(150)
+    ]
+    packed = client.pack_emails(emails)
+    bodies = [entry['body_tokens'] for entry in packed['report']]
+    
+    # Заголовки 150 писем не помещаются в один кусок: бюджет растет, тела остаются
+    assert packed['chunks'] > 1
+    assert packed['dropped'] == 0
+    assert min(bodies) >= 40
+    assert bodies[0] > bodies[2]
+    assert packed['tokens'] <= packed['budget']
+
+def test_single_prompt_drops_low_priority_items_first():
+    items = [
+        {'header': f"Задача {i}\nОписание: ", 'body': "описание задачи " * 50, 'priority': p}
+        for i, p in enumerate(['low', 'high', 'low', 'medium'] * 10)
+    ]
+    packed = pack_items(items, budget=600, max_chunks=1)
+    kept = [entry for entry in packed['report'] if not entry['dropped']]
+    
+    assert packed['dropped'] > 0
+    assert all(entry['priority'] != 'low' for entry in kept)
+    assert all(entry['body_tokens'] >= 40 for entry in kept)
+    assert packed['tokens'] <= 600
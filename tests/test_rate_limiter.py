@@ -0,0 +1,49 @@
+import time
+from types import SimpleNamespace
+import httpx
+import openai
+import pytest
+from shared.llm_client import LLMClient
+from shared.rate_limiter import RateLimiter, parse_retry_after
+
+@pytest.mark.asyncio
+async def test_rpm_bucket_throttles_burst():
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=0)
+    limiter.requests.available = 1
+    
+    started = time.monotonic()
+    await limiter.acquire(100)
+    await limiter.acquire(100)
+    
+    # 600 RPM = 10 запросов в секунду, второй запрос ждет ~0.1 с
+    assert time.monotonic() - started >= 0.09
+    assert limiter.stats()['throttled'] == 1
+
+def test_parse_retry_after():
+    assert parse_retry_after({'retry-after-ms': '250'}) == 0.25
+    assert parse_retry_after({'retry-after': '2'}) == 2.0
+    assert parse_retry_after({}) is None
+
+@pytest.mark.asyncio
+async def test_complete_retries_after_429():
+    limiter = RateLimiter(requests_per_minute=0, tokens_per_minute=0)
+    client = LLMClient(api_key="sk-test", cache_enabled=False, limiter=limiter)
+    request = httpx.Request("POST", "http://localhost/v1/chat/completions")
+    attempts = []
+    
+    async def create(**kwargs):
+        attempts.append(kwargs)
+        if len(attempts) == 1:
+            response = httpx.Response(429, headers={"retry-after-ms": "10"}, request=request)
+            raise openai.RateLimitError("rate limited", response=response, body=None)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="готово"))],
+            usage=SimpleNamespace(total_tokens=5)
+        )
+    
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    client._get_client = lambda: fake
+    
+    assert await client.complete([{"role": "user", "content": "hi"}]) == "готово"
+    assert len(attempts) == 2
+    assert limiter.stats()['pauses'] == 1
@@ -0,0 +1,75 @@
+import pytest
+from shared.fake_llm import FakeLLMServer
+from shared.llm_client import LLMClient
+from shared.rolling_summary import RollingSummarizer
+
+@pytest.mark.asyncio
+async def test_only_new_items_are_sent(tmp_path):
+    client = LLMClient(api_key="", cache_enabled=False)
+    prompts = []
+    
+    async def fake_analyze_items(items, context, stream=False, operation=None, raise_errors=False):
+        prompts.append(items)
+        return f"сводка {len(prompts)}"
+    
+    client.analyze_items = fake_analyze_items
+    summarizer = RollingSummarizer(client=client, path=str(tmp_path / "summaries.json"))
+    emails = [{'from': f'user{i}', 'subject': f'Тема {i}', 'body': 'текст'} for i in range(3)]
+    
+    assert await summarizer.summarize_emails("inbox", emails) == "сводка 1"
+    assert len(prompts[0]) == 3
+    
+    emails.append({'from': 'user3', 'subject': 'Новое письмо', 'body': 'текст'})
+    assert summarizer.pending("inbox", emails, LLMClient.format_email) == emails[-1:]
+    assert await summarizer.summarize_emails("inbox", emails) == "сводка 2"
+    
+    # Предыдущая сводка и одно новое письмо
+    assert len(prompts[1]) == 2
+    assert prompts[1][0].endswith("сводка 1")
+    
+    # Без новых писем модель не вызывается
+    assert await summarizer.summarize_emails("inbox", emails) == "сводка 2"
+    assert len(prompts) == 2
+
+
+@pytest.mark.asyncio
+async def test_stream_error_is_not_stored(tmp_path):
+    summarizer_path = str(tmp_path / "summaries.json")
+    emails = [{'from': 'user', 'subject': 'Отчет', 'body': 'текст письма'}]
+    
+    with FakeLLMServer(responder=lambda request: "частичная сводка по письмам", stream_error_after=2) as server:
+        client = LLMClient(api_key="sk-test", base_url=server.base_url, cache_enabled=False)
+        summarizer = RollingSummarizer(client=client, path=summarizer_path)
+        tokens = await summarizer.summarize_emails("inbox", emails, stream=True)
+        text = "".join([token async for token in tokens])
+    
+    # Начало ответа показано вместе с ошибкой, но сводкой не стало
+    assert text.startswith("частичная")
+    assert "Ошибка анализа" in text
+    assert summarizer.get_state("inbox")['summary'] == ""
+    assert summarizer.pending("inbox", emails, LLMClient.format_email) == emails
+
+@pytest.mark.asyncio
+async def test_emails_are_tracked_by_id_and_empty_input_is_not_sent(tmp_path):
+    client = LLMClient(api_key="", cache_enabled=False)
+    prompts = []
+    
+    async def fake_analyze_items(items, context, stream=False, operation=None, raise_errors=False):
+        prompts.append(items)
+        return f"сводка {len(prompts)}"
+    
+    client.analyze_items = fake_analyze_items
+    summarizer = RollingSummarizer(client=client, path=str(tmp_path / "summaries.json"))
+    
+    # Пустой период без прежней сводки - модель не вызывается
+    assert await summarizer.summarize_emails("inbox", []) == ""
+    assert prompts == []
+    
+    emails = [{'id': str(uid), 'from': 'user', 'subject': f'Тема {uid}', 'body': 'текст'} for uid in (7, 8)]
+    await summarizer.summarize_emails("inbox", emails)
+    assert summarizer.get_state("inbox")['ids'] == ['7', '8']
+    
+    # Письма с теми же ID считаются учтенными, даже если их представление изменилось
+    emails[0]['body'] = 'текст с уточнением'
+    assert await summarizer.summarize_emails("inbox", emails) == "сводка 1"
+    assert len(prompts) == 1
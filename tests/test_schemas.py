@@ -0,0 +1,45 @@
+import json
+import pytest
+from shared.fake_llm import FakeLLMServer
+from shared.llm_client import LLMClient
+from shared.schemas import ActionItemList, Priority, parse_structured
+
+VALID = json.dumps({"items": [
+    {"text": "Подготовить отчет", "owner": "Анна", "deadline": "2024-01-15", "priority": "high"},
+    {"text": "Обновить документацию", "owner": "не указан", "deadline": "", "priority": "Низкий"}
+]}, ensure_ascii=False)
+
+def test_parse_normalizes_empty_values_and_priority():
+    result = parse_structured(f"```json\n{VALID}\n```", ActionItemList)
+    assert result.items[0].priority == Priority.HIGH
+    assert result.items[1].owner is None
+    assert result.items[1].deadline is None
+
+@pytest.mark.asyncio
+async def test_action_items_repaired_after_invalid_json():
+    answers = ['{"items": [{"owner": "Анна"}]}', VALID]
+    requests = []
+    
+    def responder(request):
+        requests.append(request)
+        return answers[len(requests) - 1]
+    
+    with FakeLLMServer(responder=responder) as server:
+        client = LLMClient(api_key="sk-test", base_url=server.base_url, cache_enabled=False)
+        result = await client.create_action_items("Анна готовит отчет к 15 января", structured=True)
+    
+    assert result['error'] is None
+    assert [item['text'] for item in result['items']] == ["Подготовить отчет", "Обновить документацию"]
+    assert result['items'][0]['deadline'] == "2024-01-15"
+    assert requests[0]['response_format'] == {"type": "json_object"}
+    assert "не прошел проверку" in requests[1]['messages'][-1]['content']
+
+@pytest.mark.asyncio
+async def test_structured_error_after_failed_repair():
+    with FakeLLMServer(responder=lambda request: "не JSON") as server:
+        client = LLMClient(api_key="sk-test", base_url=server.base_url, cache_enabled=False)
+        result = await client.analyze_tasks([{'title': 'Задача'}], structured=True)
+    
+    assert result['tasks'] == []
+    assert result['error'].startswith("Ошибка анализа")
+    assert server.stats()['requests'] == 2
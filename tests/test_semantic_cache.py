@@ -0,0 +1,46 @@
+import pytest
+from shared.llm_client import LLMClient
+from shared.semantic_cache import SemanticCache, HashedNgramEmbedder
+
+PROMPT = "Сводка писем на 10:15\n\nОт: boss@example.com\nТема: Отчет за квартал\nТекст: Нужен отчет до пятницы"
+
+def test_near_duplicate_hit_and_unrelated_miss():
+    cache = SemanticCache(threshold=0.9, max_entries=10, ttl=0)
+    cache.add("ns", PROMPT, "ответ")
+    
+    assert cache.lookup("ns", PROMPT.replace("10:15", "17:42"))[0] == "ответ"
+    assert cache.lookup("ns", "Совсем другой запрос про календарь на неделю") is None
+    assert cache.lookup("other", PROMPT) is None
+    
+    stats = cache.stats()
+    assert stats['lookups'] == 3
+    assert stats['hits'] == 1
+
+def test_lru_eviction():
+    cache = SemanticCache(threshold=0.99, max_entries=2, ttl=0, embedder=HashedNgramEmbedder(dim=256))
+    cache.add("ns", "первый промпт про бюджет", "1")
+    cache.add("ns", "второй промпт про релиз", "2")
+    cache.lookup("ns", "первый промпт про бюджет")
+    cache.add("ns", "третий промпт про отпуск", "3")
+    
+    assert cache.lookup("ns", "второй промпт про релиз") is None
+    assert cache.lookup("ns", "первый промпт про бюджет")[0] == "1"
+    assert cache.stats()['entries'] == 2
+
+def test_accuracy_metric():
+    cache = SemanticCache(threshold=0.9, max_entries=10)
+    cache.record_outcome(True)
+    cache.record_outcome(False)
+    
+    assert cache.stats()['accuracy'] == 0.5
+
+@pytest.mark.asyncio
+async def test_complete_served_from_semantic_cache():
+    client = LLMClient(api_key="", cache_enabled=False, semantic_cache=SemanticCache(threshold=0.9, ttl=0))
+    messages = client._build_messages(PROMPT)
+    namespace = SemanticCache.make_namespace(client.model, messages, 0.7, 1000)
+    client.semantic_cache.add(namespace, messages[-1]['content'], "из семантического кэша")
+    
+    similar = client._build_messages(PROMPT.replace("10:15", "09:03"))
+    assert await client.complete(similar) == "из семантического кэша"
+    assert client.semantic_cache_stats()['tokens_saved'] > 0
@@ -0,0 +1,57 @@
+import asyncio
+import threading
+import time
+import pytest
+from shared.single_flight import SingleFlight
+
+@pytest.mark.asyncio
+async def test_identical_calls_collapsed():
+    flight = SingleFlight()
+    calls = []
+    
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "сводка"
+    
+    results = await asyncio.gather(*[flight.do("key", fetch) for _ in range(5)])
+    
+    assert results == ["сводка"] * 5
+    assert len(calls) == 1
+    assert flight.stats()['collapsed'] == 4
+
+@pytest.mark.asyncio
+async def test_streams_share_one_upstream():
+    flight = SingleFlight()
+    calls = []
+    
+    async def fetch():
+        calls.append(1)
+        for token in ["а", "б", "в"]:
+            await asyncio.sleep(0.01)
+            yield token
+    
+    async def consume():
+        return [token async for token in flight.stream("key", fetch)]
+    
+    results = await asyncio.gather(*[consume() for _ in range(3)])
+    
+    assert results == [["а", "б", "в"]] * 3
+    assert len(calls) == 1
+
+def test_collapsed_across_event_loops():
+    flight = SingleFlight()
+    calls = []
+    
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.2)
+        return "ответ"
+    
+    leader = threading.Thread(target=lambda: asyncio.run(flight.do("key", fetch)))
+    leader.start()
+    time.sleep(0.05)
+    
+    assert asyncio.run(flight.do("key", fetch)) == "ответ"
+    leader.join()
+    assert len(calls) == 1
@@ -0,0 +1,38 @@
+import pytest
+from shared.fake_llm import FakeLLMServer
+from shared.llm_client import LLMClient
+from shared.telemetry import Histogram, LLMTelemetry, aggregate, estimate_cost, load_records
+
+def test_histogram_percentiles():
+    histogram = Histogram([0.1, 1, 10])
+    for value in [0.05] * 90 + [5] * 10:
+        histogram.observe(value)
+    
+    assert histogram.percentile(50) == 0.1
+    assert histogram.percentile(95) == 10
+    assert histogram.to_dict()['count'] == 100
+
+def test_estimate_cost_uses_longest_model_prefix():
+    assert estimate_cost("gpt-4o-mini-2024-07-18", 1000, 1000) == pytest.approx(0.00075)
+    assert estimate_cost("local-model", 1000, 1000) == 0.0
+
+@pytest.mark.asyncio
+async def test_calls_are_recorded_per_helper(tmp_path):
+    path = str(tmp_path / "telemetry.jsonl")
+    
+    with FakeLLMServer(latency=0.02) as server:
+        client = LLMClient(api_key="sk-test", base_url=server.base_url, cache_enabled=False,
+                           telemetry=LLMTelemetry(path))
+        await client.create_action_items("заметки встречи")
+        tokens = await client.summarize_emails([{'from': 'a', 'subject': 'b', 'body': 'c'}], stream=True)
+        [token async for token in tokens]
+    
+    summary = client.telemetry_summary()
+    assert summary['create_action_items']['calls'] == 1
+    assert summary['create_action_items']['prompt_tokens'] > 0
+    assert summary['create_action_items']['latency']['max'] >= 0.02
+    assert summary['summarize_emails']['ttfb']['count'] == 1
+    
+    records = load_records(path)
+    assert [r['operation'] for r in records] == ['create_action_items', 'summarize_emails']
+    assert aggregate(records)['summarize_emails']['completion_tokens'] > 0
@@ -11,4 +11,11 @@ def test_format_datetime():
 def test_truncate_text():
     text = "a" * 200
     truncated = utils.truncate_text(text, max_length=50)
-    assert len(truncated) <= 50
\ No newline at end of file
+    assert len(truncated) <= 50
+
+def test_stream_markdown_collects_tokens():
+    async def tokens():
+        for token in ["Повестка", " ", "встречи"]:
+            yield token
+    
+    assert utils.stream_markdown(tokens()) == "Повестка встречи"
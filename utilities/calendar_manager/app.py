@@ -13,7 +13,7 @@ from shared.config import Config
 from shared.utils import (
     create_streamlit_header, display_metrics, 
     display_data_table, send_notification, 
-    validate_config, async_to_sync
+    validate_config, stream_markdown
 )
 from datetime import datetime, timedelta
 import json
@@ -206,14 +206,8 @@ def main():
             if st.button("🔍 Запустить анализ календаря", type="primary"):
                 with st.spinner("Анализ календаря с помощью ИИ..."):
                     
-                    @async_to_sync
-                    async def analyze_calendar():
-                        return await llm_client.analyze_calendar_events(events)
-                    
-                    analysis = analyze_calendar()
-                    
                     st.subheader("📝 Результат анализа")
-                    st.markdown(analysis)
+                    analysis = stream_markdown(llm_client.analyze_calendar_events(events, stream=True))
                     
                     # Дополнительные рекомендации
                     st.subheader("💡 Рекомендации")
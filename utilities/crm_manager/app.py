@@ -12,7 +12,7 @@ from shared.llm_client import llm_client
 from shared.config import Config
 from shared.utils import (
     create_streamlit_header, display_metrics, 
-    validate_config, async_to_sync
+    validate_config, stream_markdown
 )
 from datetime import datetime, timedelta
 
@@ -369,18 +369,12 @@ def main():
                 - Малый бизнес: 120 (большой объем)
                 """
                 
-                @async_to_sync
-                async def analyze_crm():
-                    return await llm_client.analyze_text(
-                        crm_data,
-                        "Проанализируй данные CRM. Выдели ключевые тренды, "
-                        "проблемы в воронке продаж, возможности роста и рекомендации."
-                    )
-                
-                analysis = analyze_crm()
-                
                 st.subheader("📝 Анализ CRM")
-                st.markdown(analysis)
+                analysis = stream_markdown(llm_client.analyze_text_stream(
+                    crm_data,
+                    "Проанализируй данные CRM. Выдели ключевые тренды, "
+                    "проблемы в воронке продаж, возможности роста и рекомендации."
+                ))
         
         # Рекомендации по клиентам
         st.subheader("💡 Умные рекомендации")
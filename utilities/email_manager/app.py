@@ -10,13 +10,16 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
 from shared.llm_client import llm_client
+from shared.rolling_summary import message_id, rolling_summarizer
 from shared.config import Config
 from shared.utils import (
     create_streamlit_header, display_metrics, 
     display_data_table, send_notification, 
-    validate_config, async_to_sync
+    validate_config, stream_markdown
 )
 from email_client import EmailClient
+from mail_store import get_store
+from mail_ingest import MailIngestor, load_accounts
 from datetime import datetime, timedelta
 import asyncio
 
@@ -34,12 +37,24 @@ def main():
         st.stop()
     
     # Инициализация клиента почты
-    email_client = EmailClient(
-        username=config['email_user'],
-        password=config['email_password'],
-        imap_server=config['imap_server'],
-        imap_port=config['imap_port']
-    )
+    def create_client(username, password, imap_server=None, imap_port=None, use_ssl=None, **_):
+        return EmailClient(
+            username=username,
+            password=password,
+            imap_server=imap_server or config['imap_server'],
+            imap_port=imap_port or config['imap_port'],
+            use_ssl=config['imap_ssl'] if use_ssl is None else use_ssl,
+            pool_size=config['imap_pool_size'],
+            pool_idle_timeout=config['imap_pool_idle_timeout'],
+            fetch_batch_size=config['imap_fetch_batch_size'],
+            fetch_mode=config['email_fetch_mode'],
+            preview_bytes=config['email_preview_bytes'],
+            body_max_chars=config['email_body_max_chars'],
+            store=get_store(config['email_store_path']) if config['email_sync_enabled'] else None
+        )
+    
+    email_client = create_client(config['email_user'], config['email_password'])
+    clients = {email_client.username: email_client}
     
     # Боковая панель с настройками
     with st.sidebar:
@@ -62,12 +77,42 @@ def main():
             index=0
         )
         
-        # Автоматическое обновление
-        auto_refresh = st.checkbox("Автообновление каждые 5 мин", False)
+        # Параллельная загрузка всех ящиков из EMAIL_ACCOUNTS_FILE и папок EMAIL_SYNC_FOLDERS
+        all_mailboxes = st.checkbox("Все ящики и папки", False)
+        
+        # Новые письма приходят уведомлением IMAP IDLE, а не опросом сервера
+        push_mode = st.checkbox("Мгновенные уведомления о письмах", config['email_idle_enabled'])
         
         if st.button("🔄 Обновить данные", type="primary"):
             st.rerun()
     
+    if push_mode and not all_mailboxes:
+        listener = email_client.watch(folder, config['email_idle_renew_interval'])
+        version_key = f"email_push_version:{folder}"
+        
+        @st.fragment(run_every=config['email_push_check_interval'])
+        def watch_mailbox():
+            # Проверяется только счетчик событий слушателя в памяти, сервер не опрашивается
+            seen = st.session_state.setdefault(version_key, listener.version)
+            if listener.version > seen:
+                events = listener.events_since(seen)
+                st.session_state[version_key] = listener.version
+                st.session_state.email_pushed = sum(len(event['emails']) for event in events)
+                st.rerun()
+            
+            if listener.error:
+                st.caption(f"📡 IDLE: переподключение ({listener.error})")
+            else:
+                st.caption("📡 Ожидание новых писем (IMAP IDLE)")
+        
+        with st.sidebar:
+            watch_mailbox()
+    
+    # Перезапуск по уведомлению: новые письма уже в хранилище
+    pushed = st.session_state.pop('email_pushed', None)
+    if pushed:
+        st.toast(f"📬 Новых писем: {pushed}")
+    
     # Основное содержимое
     tab1, tab2, tab3, tab4 = st.tabs([
         "📊 Обзор", "📧 Письма", "🤖 ИИ Анализ", "📋 Задачи"
@@ -90,17 +135,55 @@ def main():
                     since_date = datetime.now().date() - timedelta(days=7)
                 
                 # Получение писем
-                emails = email_client.get_emails(
-                    folder=folder,
-                    since_date=since_date,
-                    limit=email_limit
-                )
+                if all_mailboxes:
+                    accounts = load_accounts(config['email_accounts_file'])
+                    folders = {'*': config['email_sync_folders']}
+                    for account in accounts:
+                        clients.setdefault(account['username'], create_client(**account))
+                        if account.get('folders'):
+                            folders[account['username']] = account['folders']
+                    
+                    ingest = MailIngestor(list(clients.values()), config['email_ingest_workers']).ingest(
+                        folders, since_date, email_limit
+                    )
+                    emails = ingest['emails']
+                    sync = {}
+                    
+                    failed = [f"{r['mailbox']}/{r['folder']}" for r in ingest['reports'] if 'error' in r]
+                    if failed:
+                        st.warning(f"Не удалось загрузить: {', '.join(failed)}")
+                    slowest = max((r.get('seconds', 0) for r in ingest['reports']), default=0)
+                    st.caption(
+                        f"Загружено {len(ingest['reports'])} папок из {len(clients)} ящиков за "
+                        f"{ingest['seconds']:.1f} с (самая долгая папка {slowest:.1f} с)"
+                    )
+                elif pushed is not None and email_client.store is not None:
+                    emails = email_client.search_emails("", folder, since_date, email_limit)
+                    sync = {}
+                else:
+                    emails = email_client.get_emails(
+                        folder=folder,
+                        since_date=since_date,
+                        limit=email_limit
+                    )
+                    sync = email_client.last_sync
+                
+                if sync.get('error'):
+                    st.warning(f"Сервер недоступен, показаны сохраненные письма: {sync['error']}")
+                elif sync:
+                    st.caption(
+                        f"Синхронизация: новых {sync['new']}, изменены флаги {sync['flags_updated']}, "
+                        f"удалено {sync['removed']}" + (" (полная)" if sync['full_resync'] else "")
+                    )
+                
+                # С локальным хранилищем счетчики и график считаются запросами по всему периоду
+                activity = {} if all_mailboxes else email_client.activity_stats(folder, since_date)
                 
                 if emails:
                     # Метрики
-                    total_emails = len(emails)
-                    unread_emails = len([e for e in emails if not e.get('read', True)])
-                    important_emails = len([e for e in emails if e.get('priority') == 'high'])
+                    total_emails = activity.get('total', len(emails))
+                    unread_emails = activity.get('unread', len([e for e in emails if not e.get('read', True)]))
+                    important_emails = activity.get('important', len([e for e in emails if e.get('priority') == 'high']))
                     
                     metrics = {
                         "Всего писем": total_emails,
@@ -118,18 +201,23 @@ def main():
                     import plotly.express as px
                     
                     # Подготовка данных для графика
-                    email_times = []
-                    for email in emails:
-                        if email.get('date'):
-                            try:
-                                email_date = datetime.fromisoformat(str(email['date']))
-                                email_times.append({
-                                    'hour': email_date.hour,
-                                    'date': email_date.date(),
-                                    'count': 1
-                                })
-                            except:
-                                continue
+                    if activity:
+                        email_times = [
+                            {'hour': hour, 'count': count} for hour, count in activity['hourly'].items()
+                        ]
+                    else:
+                        email_times = []
+                        for email in emails:
+                            if email.get('date'):
+                                try:
+                                    email_date = datetime.fromisoformat(str(email['date']))
+                                    email_times.append({
+                                        'hour': email_date.hour,
+                                        'date': email_date.date(),
+                                        'count': 1
+                                    })
+                                except:
+                                    continue
                     
                     if email_times:
                         df = pd.DataFrame(email_times)
@@ -156,6 +244,7 @@ def main():
         
         if 'emails' in locals() and emails:
             # Фильтры
+            search_query = st.text_input("🔍 Поиск по теме, отправителю, тексту и вложениям:")
             col1, col2 = st.columns(2)
             
             with col1:
@@ -168,22 +257,40 @@ def main():
                     ["Все", "Высокий", "Средний", "Низкий"]
                 )
             
+            priority_values = {"Высокий": "high", "Средний": "medium", "Низкий": "low"}
+            
             # Фильтрация писем
-            filtered_emails = []
-            for email in emails:
-                # Фильтр по прочитанности
-                if not show_read and email.get('read', True):
-                    continue
-                if not show_unread and not email.get('read', True):
-                    continue
-                
-                # Фильтр по приоритету
-                if priority_filter != "Все":
-                    email_priority = email.get('priority', 'medium')
-                    if priority_filter.lower() != email_priority:
+            if email_client.store is not None and not all_mailboxes:
+                # Индексный запрос к локальному хранилищу; поиск идет по всей сохраненной почте
+                filtered_emails = email_client.search_emails(
+                    search_query,
+                    folder=folder,
+                    since_date=None if search_query else since_date,
+                    limit=email_limit,
+                    priority=priority_values.get(priority_filter),
+                    read=None if show_read == show_unread else show_read
+                ) if show_read or show_unread else []
+            else:
+                filtered_emails = []
+                for email in emails:
+                    # Фильтр по прочитанности
+                    if not show_read and email.get('read', True):
                         continue
-                
-                filtered_emails.append(email)
+                    if not show_unread and not email.get('read', True):
+                        continue
+                    
+                    # Фильтр по приоритету
+                    if priority_filter != "Все":
+                        email_priority = email.get('priority', 'medium')
+                        if priority_values[priority_filter] != email_priority:
+                            continue
+                    
+                    # Поиск по загруженным письмам
+                    text = f"{email.get('subject', '')} {email.get('from', '')} {email.get('body', '')}".lower()
+                    if search_query and search_query.lower() not in text:
+                        continue
+                    
+                    filtered_emails.append(email)
             
             # Отображение писем
             for i, email in enumerate(filtered_emails):
@@ -201,9 +308,15 @@ def main():
                         
                         # Содержимое письма
                         body = email.get('body', 'Нет содержимого')
-                        if len(body) > 500:
+                        if len(body) > 500 or email.get('preview'):
                             st.markdown(f"**Содержимое:** {body[:500]}...")
-                            if st.button(f"Показать полностью #{i}"):
+                            # Ключ по письму, а не по номеру в списке: список обновляется фрагментом
+                            full_key = f"full_{email.get('mailbox', '')}_{email.get('folder', folder)}_{email.get('uid', email['id'])}"
+                            if st.button(f"Показать полностью #{i}", key=full_key):
+                                # В режиме превью полный текст загружается только по запросу
+                                if email.get('preview'):
+                                    client = clients.get(email.get('mailbox'), email_client)
+                                    body = client.get_email_body(email['id'], email.get('folder', folder)).get('body', body)
                                 st.text(body)
                         else:
                             st.markdown(f"**Содержимое:** {body}")
@@ -217,6 +330,12 @@ def main():
                         priority = email.get('priority', 'medium')
                         priority_icon = "🔴" if priority == 'high' else "🟡" if priority == 'medium' else "🟢"
                         st.markdown(f"**Приоритет:** {priority_icon} {priority.title()}")
+                        if email.get('priority_keywords'):
+                            st.caption(f"Ключевые слова: {', '.join(email['priority_keywords'])}")
+                        
+                        # Размер вложений известен из заголовков и структуры письма, содержимое не загружается
+                        for attachment in email.get('attachment_details', []):
+                            st.caption(f"📎 {attachment['filename']} ({attachment['size'] / 1024:.0f} КБ)")
                         
                         # Действия
                         if st.button(f"Создать задачу #{i}", key=f"task_{i}"):
@@ -231,17 +350,26 @@ def main():
         st.subheader("🤖 ИИ Анализ писем")
         
         if 'emails' in locals() and emails:
-            if st.button("🔍 Запустить анализ ИИ", type="primary"):
+            # Сводка обновляется инкрементально: в модель уходят только новые письма
+            summary_source = f"email:{config['email_user']}:{folder}:{period}"
+            new_emails = rolling_summarizer.pending(summary_source, emails, llm_client.format_email, message_id)
+            st.caption(f"Новых писем с прошлого анализа: {len(new_emails)} из {len(emails)}")
+            
+            rebuild_summary = st.checkbox("Пересчитать сводку с нуля", False)
+            
+            # По уведомлению о новых письмах уже составленная сводка дополняется ими автоматически
+            auto_update = bool(pushed and new_emails and rolling_summarizer.get_state(summary_source)['summary'])
+            
+            if st.button("🔍 Запустить анализ ИИ", type="primary") or auto_update:
                 with st.spinner("Анализ писем с помощью ИИ..."):
                     
-                    @async_to_sync
-                    async def analyze_emails():
-                        return await llm_client.summarize_emails(emails)
-                    
-                    analysis = analyze_emails()
+                    if rebuild_summary:
+                        rolling_summarizer.reset(summary_source)
                     
                     st.subheader("📝 Результат анализа")
-                    st.markdown(analysis)
+                    analysis = stream_markdown(
+                        rolling_summarizer.summarize_emails(summary_source, emails, stream=True)
+                    )
                     
                     # Сохранение результата
                     if st.button("💾 Сохранить анализ"):
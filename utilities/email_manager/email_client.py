@@ -4,112 +4,554 @@
 
 import imaplib
 import email
+import email.message
 from email.header import decode_header
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Optional, Tuple
 from datetime import datetime, date
+from concurrent.futures import ThreadPoolExecutor
 import logging
 import ssl
 import re
 
+from imap_idle import IdleListener, get_listener
+from imap_pool import IMAPPool, PooledSession, get_pool
+from mail_store import MailStore
+from message_preview import decode_partial, message_parts, parse_bodystructure, text_part
+from mime_stream import DEFAULT_TEXT_LIMIT, parse_message
+from priority_classifier import priority_classifier
+
 logger = logging.getLogger(__name__)
 
+# UID в одной команде обновления флагов: ответ на письмо - несколько десятков байт
+FLAGS_BATCH_SIZE = 500
+
+# Заголовки, нужные списку писем и определению приоритета в режиме превью
+PREVIEW_HEADERS = "FROM TO SUBJECT DATE X-PRIORITY IMPORTANCE"
+
+# Имя элемента FETCH перед литералом: RFC822, BODY[], BODY[HEADER.FIELDS (...)], BODY[1]<0>
+LITERAL_NAME = re.compile(rb'(RFC822|BODY\[[^\]]*\](?:<\d+>)?) \{\d+\}$')
+
+def compact_message_set(numbers: Iterable[int]) -> str:
+    """Компактный набор номеров для FETCH: [1, 2, 3, 5] -> '1:3,5'"""
+    ranges = []
+    for n in sorted(set(numbers)):
+        if ranges and n == ranges[-1][1] + 1:
+            ranges[-1][1] = n
+        else:
+            ranges.append([n, n])
+    return ",".join(str(a) if a == b else f"{a}:{b}" for a, b in ranges)
+
+def group_fetch_response(message_data: List[Any]) -> List[Dict[str, Any]]:
+    """Ответ imaplib на FETCH по письмам: текст атрибутов и литералы по именам элементов"""
+    # Литерал приходит кортежем (b'5 (UID 12 BODY[] {1234}', b'...'), следующий литерал того же
+    # письма - кортежем (b' BODY[1]<0> {512}', b'...'), конец ответа - байтами b')'
+    messages = []
+    for item in message_data:
+        text, literal = item if isinstance(item, tuple) else (item, None)
+        if not isinstance(text, bytes):
+            continue
+        if re.match(rb'\d+ \(', text):
+            messages.append({'attributes': b'', 'literals': {}})
+        if not messages:
+            continue
+        if literal is not None:
+            name = LITERAL_NAME.search(text)
+            if name:
+                messages[-1]['literals'][name.group(1).decode().upper()] = literal
+            else:
+                # Литерал внутри значения, например имя файла в BODYSTRUCTURE - оставляем его на месте
+                text += b'\r\n' + literal
+        messages[-1]['attributes'] += text
+    return messages
+
+def parse_fetch_attributes(response: bytes) -> Tuple[int, Optional[int], Optional[List[str]]]:
+    """Номер, UID и флаги из строки ответа FETCH: b'5 (UID 12 FLAGS (\\Seen) BODY[] {123}'"""
+    number = re.match(rb'(\d+)', response)
+    uid = re.search(rb'UID (\d+)', response)
+    flags = re.search(rb'FLAGS \(([^)]*)\)', response)
+    return (
+        int(number.group(1)) if number else 0,
+        int(uid.group(1)) if uid else None,
+        flags.group(1).decode().split() if flags else None
+    )
+
 class EmailClient:
-    def __init__(self, username: str, password: str, imap_server: str = "imap.gmail.com", imap_port: int = 993):
+    def __init__(self, username: str, password: str, imap_server: str = "imap.gmail.com", imap_port: int = 993,
+                 use_ssl: bool = True, pool_size: int = 2, pool_idle_timeout: float = 300.0,
+                 pool: Optional[IMAPPool] = None, fetch_batch_size: int = 50, store: Optional[MailStore] = None,
+                 fetch_mode: str = "preview", preview_bytes: int = 2048, body_max_chars: int = DEFAULT_TEXT_LIMIT):
         self.username = username
         self.password = password
         self.imap_server = imap_server
         self.imap_port = imap_port
-        self.connection = None
+        self.use_ssl = use_ssl
+        self.fetch_batch_size = max(1, fetch_batch_size)
+        
+        # preview - заголовки, структура и начало текста, полное письмо по запросу; full - письма целиком
+        self.fetch_mode = fetch_mode
+        self.preview_bytes = preview_bytes
+        # Полное письмо разбирается потоково: текст не длиннее body_max_chars, вложения не декодируются
+        self.body_max_chars = body_max_chars
+        self.bytes_fetched = 0
+        
+        # С хранилищем письма синхронизируются по UID, а id писем - это UID
+        self.store = store
+        self.account = f"{username}@{imap_server}:{imap_port}"
+        self.last_sync: Dict[str, Any] = {}
+        
+        # Сессии общие для всех копий клиента одного ящика в процессе
+        self.pool = pool or get_pool(
+            (imap_server, imap_port, username, use_ssl), self._open_connection,
+            max_size=pool_size, idle_timeout=pool_idle_timeout
+        )
+    
+    def _open_connection(self) -> imaplib.IMAP4:
+        """Новое авторизованное соединение: TLS рукопожатие и LOGIN"""
+        if self.use_ssl:
+            connection = imaplib.IMAP4_SSL(self.imap_server, self.imap_port, ssl_context=ssl.create_default_context())
+        else:
+            connection = imaplib.IMAP4(self.imap_server, self.imap_port)
+        
+        try:
+            connection.login(self.username, self.password)
+        except Exception:
+            connection.shutdown()
+            raise
+        
+        logger.info(f"Успешное подключение к {self.imap_server}")
+        return connection
     
     def connect(self) -> bool:
-        """Подключение к почтовому серверу"""
+        """Проверка подключения к почтовому серверу (сессия остается в пуле)"""
         try:
-            # Создание SSL контекста
-            context = ssl.create_default_context()
-            
-            # Подключение к IMAP серверу
-            self.connection = imaplib.IMAP4_SSL(self.imap_server, self.imap_port, ssl_context=context)
-            
-            # Авторизация
-            self.connection.login(self.username, self.password)
-            logger.info(f"Успешное подключение к {self.imap_server}")
-            return True
-            
+            with self.pool.session():
+                return True
+        
         except Exception as e:
             logger.error(f"Ошибка подключения к почтовому серверу: {e}")
             return False
     
     def disconnect(self):
-        """Отключение от почтового сервера"""
-        if self.connection:
-            try:
-                self.connection.close()
-                self.connection.logout()
-                logger.info("Отключение от почтового сервера")
-            except Exception as e:
-                logger.error(f"Ошибка при отключении: {e}")
+        """Закрытие свободных сессий пула"""
+        self.pool.close_all()
+        logger.info("Отключение от почтового сервера")
     
     def get_emails(self, folder: str = "INBOX", since_date: Optional[date] = None, limit: int = 20) -> List[Dict[str, Any]]:
         """Получение списка писем"""
-        if not self.connect():
+        if self.store is not None:
+            self.sync_folder(folder, since_date, limit)
+            # При недоступном сервере показываем ранее синхронизированные письма
+            return self.store.list_messages(self.account, folder, since_date, limit)
+        
+        try:
+            return self.pool.run(lambda session: self._fetch_emails(session, folder, since_date, limit))
+        
+        except Exception as e:
+            logger.error(f"Ошибка получения писем: {e}")
+            return []
+    
+    def search_emails(self, query: str = "", folder: Optional[str] = "INBOX", since_date: Optional[date] = None,
+                      limit: int = 50, priority: Optional[str] = None, read: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """Поиск по локальному хранилищу: полнотекстовый запрос и фильтры, без обращения к серверу"""
+        if self.store is None:
             return []
+        return self.store.list_messages(self.account, folder, since_date, limit, priority, read, query)
+    
+    def activity_stats(self, folder: Optional[str] = "INBOX", since_date: Optional[date] = None) -> Dict[str, Any]:
+        """Счетчики писем и распределение по часам из локального хранилища"""
+        if self.store is None:
+            return {}
+        return {
+            **self.store.counts(self.account, folder, since_date),
+            'hourly': self.store.hourly_counts(self.account, folder, since_date)
+        }
+    
+    def sync_folder(self, folder: str = "INBOX", since_date: Optional[date] = None,
+                    limit: Optional[int] = None) -> Dict[str, Any]:
+        """Инкрементальная синхронизация папки с локальным хранилищем
         
+        Без since_date первичная загрузка ограничена limit последними письмами
+        (0 или None - вся папка), дальше загружаются только новые UID.
+        """
         try:
-            # Выбор папки
-            self.connection.select(folder)
-            
-            # Формирование критерия поиска
-            search_criteria = "ALL"
-            if since_date:
-                date_str = since_date.strftime("%d-%b-%Y")
-                search_criteria = f'SINCE {date_str}'
-            
-            # Поиск писем
-            status, message_ids = self.connection.search(None, search_criteria)
-            
+            self.last_sync = self.pool.run(lambda session: self._sync_folder(session, folder, since_date, limit))
+        
+        except Exception as e:
+            logger.error(f"Ошибка синхронизации папки {folder}: {e}")
+            self.last_sync = {'folder': folder, 'error': str(e)}
+        
+        return self.last_sync
+    
+    def fetch_new_emails(self, folder: str = "INBOX", after_uid: int = 0) -> List[Dict[str, Any]]:
+        """Письма с UID больше after_uid (id писем - UID); с хранилищем они сразу сохраняются"""
+        def fetch(session: PooledSession) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+            session.select(folder)
+            status, data = session.connection.uid('SEARCH', None, f"UID {after_uid + 1}:*")
+            if status != 'OK':
+                raise imaplib.IMAP4.error(f"Ошибка поиска писем: {data}")
+            # UID n:* всегда включает последнее письмо, даже если его UID меньше n
+            uids = [int(uid) for uid in data[0].split() if int(uid) > after_uid]
+            return self._download(session.connection, uids, uid=True), session.uidvalidity
+        
+        emails, uidvalidity = self.pool.run(fetch)
+        if self.store is not None and emails:
+            state = self.store.get_state(self.account, folder)
+            self.store.save_messages(self.account, folder, emails)
+            # Состояние сдвигаем только для той же версии папки, иначе следующая синхронизация полная
+            if state is not None and state['uidvalidity'] == (uidvalidity or 0):
+                highest = max([state['highest_uid']] + [int(e['id']) for e in emails])
+                self.store.update_state(self.account, folder, highest, state['since'])
+        return emails
+    
+    def refresh_flags(self, folder: str = "INBOX") -> Tuple[int, int]:
+        """Обновление флагов сохраненных писем: (изменено, удалено с сервера)"""
+        if self.store is None:
+            return 0, 0
+        
+        def refresh(session: PooledSession) -> Tuple[int, int]:
+            session.select(folder)
+            known = set(self.store.uids(self.account, folder))
+            return self._refresh_flags(session.connection, folder, known) if known else (0, 0)
+        
+        return self.pool.run(refresh)
+    
+    def watch(self, folder: str = "INBOX", renew_interval: float = 1500.0) -> 'IdleListener':
+        """Фоновый IMAP IDLE слушатель папки, общий для всех копий клиента ящика"""
+        listener = get_listener(self, folder, renew_interval=renew_interval)
+        listener.start()
+        return listener
+    
+    def _sync_folder(self, session: PooledSession, folder: str, since_date: Optional[date],
+                     limit: Optional[int] = None) -> Dict[str, Any]:
+        connection = session.connection
+        session.select(folder)
+        uidvalidity = session.uidvalidity or 0
+        since = since_date.isoformat() if since_date else None
+        
+        report = {'folder': folder, 'full_resync': False, 'new': 0, 'flags_updated': 0, 'removed': 0, 'bytes': 0}
+        bytes_fetched = self.bytes_fetched
+        state = self.store.get_state(self.account, folder)
+        
+        if state is None or state['uidvalidity'] != uidvalidity:
+            # UID прежней версии папки недействительны, загружаем ее заново
+            if state is not None:
+                logger.warning(f"UIDVALIDITY папки {folder} изменился, полная синхронизация")
+            self.store.reset_folder(self.account, folder, uidvalidity, since)
+            state = {'highest_uid': 0, 'since': since}
+            report['full_resync'] = True
+            known = set()
+        else:
+            known = set(self.store.uids(self.account, folder))
+            if known:
+                report['flags_updated'], report['removed'] = self._refresh_flags(connection, folder, known)
+                known = set(self.store.uids(self.account, folder))
+        
+        # Период расширился (или первая загрузка) - ищем по дате, иначе только UID больше известного
+        backfill = report['full_resync'] or (state['since'] is not None and (since is None or since < state['since']))
+        if backfill:
+            criteria = f"SINCE {since_date.strftime('%d-%b-%Y')}" if since_date else "ALL"
+        else:
+            criteria = f"UID {state['highest_uid'] + 1}:*"
+        
+        status, data = connection.uid('SEARCH', None, criteria)
+        if status != 'OK':
+            raise imaplib.IMAP4.error(f"Ошибка поиска писем: {data}")
+        
+        found = [int(uid) for uid in data[0].split()]
+        # UID n:* всегда включает последнее письмо, даже если его UID меньше n
+        new_uids = [uid for uid in found if uid not in known and (backfill or uid > state['highest_uid'])]
+        if backfill and since_date is None and limit:
+            # Без даты папка не выкачивается целиком: только последние limit писем
+            new_uids = new_uids[-limit:]
+        
+        emails = self._download(connection, new_uids, uid=True)
+        self.store.save_messages(self.account, folder, emails)
+        report['new'] = len(emails)
+        report['bytes'] = self.bytes_fetched - bytes_fetched
+        
+        self.store.update_state(
+            self.account, folder, max(found + [state['highest_uid']]), since if backfill else state['since']
+        )
+        return report
+    
+    def _refresh_flags(self, connection: imaplib.IMAP4, folder: str, known: set) -> Tuple[int, int]:
+        """Текущие флаги известных писем; пропавшие с сервера удаляются из хранилища
+        
+        Письмо без строки в ответе FETCH удаляется, только если UID SEARCH
+        подтвердил, что его нет на сервере: строку могли не разобрать.
+        """
+        uids = sorted(known)
+        flags: Dict[int, List[str]] = {}
+        
+        for i in range(0, len(uids), FLAGS_BATCH_SIZE):
+            status, data = connection.uid('FETCH', compact_message_set(uids[i:i + FLAGS_BATCH_SIZE]), '(FLAGS)')
             if status != 'OK':
-                logger.error("Ошибка поиска писем")
-                return []
+                raise imaplib.IMAP4.error(f"Ошибка получения флагов: {data}")
             
-            # Получение ID писем
-            email_ids = message_ids[0].split()
+            for item in data:
+                if isinstance(item, bytes):
+                    _, uid, values = parse_fetch_attributes(item)
+                    if uid is not None:
+                        flags[uid] = values or []
+        
+        removed = self._confirm_removed(connection, known - set(flags))
+        if removed:
+            self.store.remove_messages(self.account, folder, removed)
+        
+        return self.store.update_flags(self.account, folder, flags), len(removed)
+    
+    def _confirm_removed(self, connection: imaplib.IMAP4, missing: set) -> set:
+        """UID из missing, которых действительно нет в папке (по UID SEARCH)"""
+        if not missing:
+            return set()
+        
+        uids = sorted(missing)
+        present = set()
+        for i in range(0, len(uids), FLAGS_BATCH_SIZE):
+            status, data = connection.uid('SEARCH', None, f"UID {compact_message_set(uids[i:i + FLAGS_BATCH_SIZE])}")
+            if status != 'OK':
+                raise imaplib.IMAP4.error(f"Ошибка поиска писем: {data}")
+            present.update(int(uid) for uid in data[0].split())
+        
+        if missing & present:
+            logger.warning(f"Не разобраны флаги {len(missing & present)} писем, они остаются в хранилище")
+        return missing - present
+    
+    def _fetch_emails(self, session: PooledSession, folder: str, since_date: Optional[date],
+                      limit: int) -> List[Dict[str, Any]]:
+        connection = session.connection
+        session.select(folder)
+        
+        # Формирование критерия поиска
+        search_criteria = "ALL"
+        if since_date:
+            date_str = since_date.strftime("%d-%b-%Y")
+            search_criteria = f'SINCE {date_str}'
+        
+        # Поиск писем
+        status, message_ids = connection.search(None, search_criteria)
+        
+        if status != 'OK':
+            logger.error("Ошибка поиска писем")
+            return []
+        
+        # Получение ID писем
+        email_ids = message_ids[0].split()
+        
+        # Ограничение количества писем
+        if limit:
+            email_ids = email_ids[-limit:]
+        
+        return self._download(connection, [int(email_id) for email_id in email_ids])
+    
+    def _download(self, connection: imaplib.IMAP4, numbers: List[int], uid: bool = False) -> List[Dict[str, Any]]:
+        """Загрузка писем пачками по номерам или UID"""
+        batches = [numbers[i:i + self.fetch_batch_size] for i in range(0, len(numbers), self.fetch_batch_size)]
+        
+        emails = []
+        pending = None
+        
+        # Пачка разбирается в отдельном потоке, пока по сети идет FETCH следующей
+        with ThreadPoolExecutor(max_workers=1) as parser:
+            for batch in batches:
+                messages = self._fetch_batch(connection, batch, uid)
+                if pending is not None:
+                    emails.extend(pending.result())
+                pending = parser.submit(self._parse_batch, messages)
             
-            # Ограничение количества писем
-            if limit:
-                email_ids = email_ids[-limit:]
+            if pending is not None:
+                emails.extend(pending.result())
+        
+        return emails
+    
+    def _fetch_items(self) -> str:
+        """Элементы FETCH для режима загрузки; BODY.PEEK не ставит \\Seen"""
+        if self.fetch_mode == "full":
+            return "FLAGS BODY.PEEK[]"
+        return (f"FLAGS RFC822.SIZE BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS ({PREVIEW_HEADERS})] "
+                f"BODY.PEEK[1]<0.{self.preview_bytes}>")
+    
+    def _fetch_batch(self, connection: imaplib.IMAP4, numbers: List[int], uid: bool = False) -> List[Dict[str, Any]]:
+        """Один FETCH на пачку писем вместо запроса на каждое"""
+        message_set = compact_message_set(numbers)
+        if uid:
+            status, message_data = connection.uid('FETCH', message_set, f"(UID {self._fetch_items()})")
+        elif self.fetch_mode == "full":
+            status, message_data = connection.fetch(message_set, '(RFC822)')
+        else:
+            status, message_data = connection.fetch(message_set, f"({self._fetch_items()})")
+        
+        if status != 'OK':
+            logger.error(f"Ошибка получения писем {message_set}: {message_data}")
+            return []
+        
+        messages = group_fetch_response(message_data)
+        if self.fetch_mode != "full":
+            self._fetch_text_sections(connection, messages, uid)
+        
+        self.bytes_fetched += sum(len(data) for m in messages for data in m['literals'].values())
+        return messages
+    
+    def _fetch_text_sections(self, connection: imaplib.IMAP4, messages: List[Dict[str, Any]], uid: bool):
+        """Начало текстовой части для писем, у которых текст не в разделе 1"""
+        sections: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        broken: Dict[int, Dict[str, Any]] = {}
+        
+        for message in messages:
+            number, message_uid, _ = parse_fetch_attributes(message['attributes'])
+            try:
+                structure = parse_bodystructure(message['attributes'].decode('utf-8', 'replace'))
+                message['parts'] = message_parts(structure) if structure else []
+                message['text_part'] = text_part(message['parts'])
+            except Exception as e:
+                logger.warning(f"Не удалось разобрать BODYSTRUCTURE письма {message_uid or number}: {e}")
+                message['parts'], message['text_part'] = [], None
+                broken[message_uid if uid else number] = message
+                continue
             
-            emails = []
+            section = message['text_part']['section'] if message['text_part'] else None
+            if section and section != '1':
+                sections.setdefault(section, {})[message_uid if uid else number] = message
+        
+        # Один дополнительный FETCH на раздел, обычно 1.1 у multipart/alternative во вложенном mixed
+        for section, wanted in sections.items():
+            message_set = compact_message_set(wanted)
+            item = f"BODY.PEEK[{section}]<0.{self.preview_bytes}>"
+            if uid:
+                status, message_data = connection.uid('FETCH', message_set, f"(UID {item})")
+            else:
+                status, message_data = connection.fetch(message_set, f"({item})")
+            if status != 'OK':
+                continue
             
-            for email_id in email_ids:
-                try:
-                    # Получение письма
-                    status, message_data = self.connection.fetch(email_id, '(RFC822)')
-                    
-                    if status != 'OK':
-                        continue
-                    
-                    # Парсинг письма
-                    email_message = email.message_from_bytes(message_data[0][1])
-                    
-                    # Извлечение данных
-                    email_data = self._parse_email(email_message, email_id.decode())
-                    emails.append(email_data)
-                    
-                except Exception as e:
-                    logger.error(f"Ошибка обработки письма {email_id}: {e}")
-                    continue
+            for response in group_fetch_response(message_data):
+                number, message_uid, _ = parse_fetch_attributes(response['attributes'])
+                message = wanted.get(message_uid if uid else number)
+                if message is not None:
+                    message['literals'][f"BODY[{section}]<0>"] = response['literals'].get(f"BODY[{section}]<0>", b'')
+        
+        if broken:
+            self._fetch_full(connection, broken, uid)
+    
+    def _fetch_full(self, connection: imaplib.IMAP4, wanted: Dict[int, Dict[str, Any]], uid: bool):
+        """Письма целиком для тех, чью структуру не удалось разобрать"""
+        message_set = compact_message_set(wanted)
+        if uid:
+            status, message_data = connection.uid('FETCH', message_set, "(UID BODY.PEEK[])")
+        else:
+            status, message_data = connection.fetch(message_set, "(BODY.PEEK[])")
+        if status != 'OK':
+            logger.error(f"Ошибка получения писем {message_set} целиком: {message_data}")
+            return
+        
+        for response in group_fetch_response(message_data):
+            number, message_uid, _ = parse_fetch_attributes(response['attributes'])
+            message = wanted.get(message_uid if uid else number)
+            if message is not None and 'BODY[]' in response['literals']:
+                message['literals']['BODY[]'] = response['literals']['BODY[]']
+    
+    def _parse_batch(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Разбор полученной пачки писем"""
+        emails = []
+        headers = []
+        
+        for message in messages:
+            number, uid, flags = parse_fetch_attributes(message['attributes'])
+            email_id = str(uid if uid is not None else number)
+            raw = message['literals'].get('BODY[]', message['literals'].get('RFC822'))
+            try:
+                if raw is not None:
+                    parsed = parse_message(raw, self.body_max_chars)
+                    email_message = parsed['headers']
+                    email_data = self._parse_email(parsed, email_id)
+                    email_data['size'] = len(raw)
+                else:
+                    email_message = self._preview_headers(message)
+                    email_data = self._parse_preview(message, email_id, email_message)
+                
+                if flags is not None:
+                    email_data.update({'flags': flags, 'read': '\\Seen' in flags})
+                if uid is not None:
+                    email_data['uid'] = uid
+                emails.append(email_data)
+                headers.append(email_message)
             
-            return emails
+            except Exception as e:
+                logger.error(f"Ошибка обработки письма {email_id}: {e}")
+                continue
+        
+        self._determine_priority(emails, headers)
+        return emails
+    
+    def _preview_headers(self, message: Dict[str, Any]) -> email.message.Message:
+        """Заголовки письма, загруженные в режиме превью"""
+        header = next((data for name, data in message['literals'].items() if name.startswith('BODY[HEADER.FIELDS')), b'')
+        return email.message_from_bytes(header)
+    
+    def _parse_preview(self, message: Dict[str, Any], email_id: str,
+                       headers: Optional[email.message.Message] = None) -> Dict[str, Any]:
+        """Письмо из заголовков, BODYSTRUCTURE и начала текстовой части"""
+        if headers is None:
+            headers = self._preview_headers(message)
+        fields = self._parse_headers(headers)
+        
+        body = ""
+        part = message.get('text_part')
+        if part:
+            data = message['literals'].get(f"BODY[{part['section']}]<0>", b'')
+            body = decode_partial(data, part['encoding'], part['charset'])
+            if part['type'] == 'text/html':
+                body = re.sub('<[^<]+?>', '', body)
+        
+        size = re.search(rb'RFC822\.SIZE (\d+)', message['attributes'])
+        return {
+            'id': email_id,
+            **fields,
+            'body': body.strip(),
+            'read': False,
+            'attachments': [p['filename'] for p in message['parts'] if p['attachment'] and p['filename']],
+            'attachment_details': [
+                {'filename': p['filename'], 'type': p['type'], 'size': p['size']}
+                for p in message['parts'] if p['attachment'] and p['filename']
+            ],
+            # Текст загружен не полностью, полное письмо - get_email_body
+            'preview': bool(part) and part['size'] > self.preview_bytes,
+            'size': int(size.group(1)) if size else 0
+        }
+    
+    def get_email_body(self, email_id: str, folder: str = "INBOX") -> Dict[str, Any]:
+        """Полный текст и вложения письма, загруженного в режиме превью"""
+        def fetch(session: PooledSession) -> bytes:
+            session.select(folder)
+            if self.store is not None:
+                status, message_data = session.connection.uid('FETCH', email_id, '(UID BODY.PEEK[])')
+            else:
+                status, message_data = session.connection.fetch(email_id, '(BODY.PEEK[])')
             
+            messages = group_fetch_response(message_data) if status == 'OK' else []
+            if not messages or 'BODY[]' not in messages[0]['literals']:
+                raise imaplib.IMAP4.error(f"Письмо {email_id} не найдено")
+            return messages[0]['literals']['BODY[]']
+        
+        try:
+            full = self._parse_email(parse_message(self.pool.run(fetch), self.body_max_chars), email_id)
+        
         except Exception as e:
-            logger.error(f"Ошибка получения писем: {e}")
-            return []
+            logger.error(f"Ошибка загрузки письма {email_id}: {e}")
+            return {}
         
-        finally:
-            self.disconnect()
+        details = {
+            'body': full['body'],
+            'attachments': full['attachments'],
+            'attachment_details': full['attachment_details'],
+            'preview': False
+        }
+        if self.store is not None:
+            self.store.update_message(self.account, folder, int(email_id), details)
+        return details
     
-    def _parse_email(self, email_message: email.message.EmailMessage, email_id: str) -> Dict[str, Any]:
-        """Парсинг одного письма"""
+    def _parse_headers(self, email_message: email.message.Message) -> Dict[str, Any]:
+        """Тема, адреса и дата из заголовков письма"""
         
         # Декодирование заголовков
         def decode_email_header(header):
@@ -135,95 +577,39 @@ class EmailClient:
             except Exception as e:
                 logger.warning(f"Ошибка парсинга даты {date_str}: {e}")
         
-        # Извлечение содержимого письма
-        body = self._extract_email_body(email_message)
-        
-        # Определение приоритета
-        priority = self._determine_priority(email_message, subject, body)
-        
-        # Проверка статуса прочтения
-        read_status = self._check_read_status(email_message)
-        
         return {
-            'id': email_id,
             'subject': subject,
             'from': from_address,
             'to': to_address,
-            'date': email_date.isoformat() if email_date else date_str,
-            'body': body,
-            'priority': priority,
-            'read': read_status,
-            'attachments': self._get_attachments(email_message)
+            'date': email_date.isoformat() if email_date else date_str
         }
     
-    def _extract_email_body(self, email_message: email.message.EmailMessage) -> str:
-        """Извлечение текста письма"""
-        body = ""
-        
-        try:
-            if email_message.is_multipart():
-                # Обработка многочастного письма
-                for part in email_message.walk():
-                    content_type = part.get_content_type()
-                    content_disposition = str(part.get("Content-Disposition", ""))
-                    
-                    # Пропуск вложений
-                    if "attachment" in content_disposition:
-                        continue
-                    
-                    if content_type == "text/plain":
-                        charset = part.get_content_charset() or 'utf-8'
-                        body = part.get_payload(decode=True).decode(charset, errors='ignore')
-                        break
-                    elif content_type == "text/html" and not body:
-                        charset = part.get_content_charset() or 'utf-8'
-                        html_body = part.get_payload(decode=True).decode(charset, errors='ignore')
-                        # Простое удаление HTML тегов
-                        body = re.sub('<[^<]+?>', '', html_body)
-            else:
-                # Обработка простого письма
-                charset = email_message.get_content_charset() or 'utf-8'
-                body = email_message.get_payload(decode=True).decode(charset, errors='ignore')
+    def _parse_email(self, parsed: Dict[str, Any], email_id: str) -> Dict[str, Any]:
+        """Письмо из результата потокового разбора parse_message"""
+        fields = self._parse_headers(parsed['headers'])
         
-        except Exception as e:
-            logger.error(f"Ошибка извлечения содержимого письма: {e}")
-            body = "Ошибка чтения содержимого письма"
+        # Проверка статуса прочтения
+        read_status = self._check_read_status(parsed['headers'])
         
-        return body.strip()
+        return {
+            'id': email_id,
+            **fields,
+            'body': parsed['body'],
+            'read': read_status,
+            'attachments': [a['filename'] for a in parsed['attachments']],
+            'attachment_details': parsed['attachments']
+        }
     
-    def _determine_priority(self, email_message: email.message.EmailMessage, subject: str, body: str) -> str:
-        """Определение приоритета письма"""
-        
-        # Проверка заголовков приоритета
-        priority_header = email_message.get("X-Priority", "").lower()
-        importance_header = email_message.get("Importance", "").lower()
-        
-        if priority_header in ["1", "2"] or importance_header == "high":
-            return "high"
-        
-        # Ключевые слова высокого приоритета
-        high_priority_keywords = [
-            "срочно", "urgent", "важно", "important", "критично", "critical",
-            "немедленно", "asap", "emergency", "экстренно"
-        ]
-        
-        # Ключевые слова среднего приоритета  
-        medium_priority_keywords = [
-            "встреча", "meeting", "созвон", "call", "задача", "task",
-            "проект", "project", "отчет", "report"
-        ]
-        
-        text_to_check = (subject + " " + body).lower()
-        
-        for keyword in high_priority_keywords:
-            if keyword in text_to_check:
-                return "high"
-        
-        for keyword in medium_priority_keywords:
-            if keyword in text_to_check:
-                return "medium"
-        
-        return "low"
+    def _determine_priority(self, emails: List[Dict[str, Any]], headers: List[email.message.Message]):
+        """Приоритет и найденные ключевые слова для пачки писем одним проходом классификатора"""
+        # Окно просмотра нужно только превью, письма целиком проверяются по всему тексту
+        results = priority_classifier.classify_batch(
+            ({'subject': e['subject'], 'body': e['body'], 'headers': h} for e, h in zip(emails, headers)),
+            scan_chars=0 if self.fetch_mode == "full" else None
+        )
+        for email_data, result in zip(emails, results):
+            email_data['priority'] = result['priority']
+            email_data['priority_keywords'] = result['keywords']
     
     def _check_read_status(self, email_message: email.message.EmailMessage) -> bool:
         """Проверка статуса прочтения письма"""
@@ -231,62 +617,46 @@ class EmailClient:
         # Пока возвращаем False (непрочитано) для демонстрации
         return False
     
-    def _get_attachments(self, email_message: email.message.EmailMessage) -> List[str]:
-        """Получение списка вложений"""
-        attachments = []
-        
-        try:
-            for part in email_message.walk():
-                content_disposition = str(part.get("Content-Disposition", ""))
-                
-                if "attachment" in content_disposition:
-                    filename = part.get_filename()
-                    if filename:
-                        # Декодирование имени файла
-                        decoded_filename = decode_header(filename)[0]
-                        if decoded_filename[1]:
-                            filename = decoded_filename[0].decode(decoded_filename[1])
-                        else:
-                            filename = str(decoded_filename[0])
-                        
-                        attachments.append(filename)
-        
-        except Exception as e:
-            logger.error(f"Ошибка получения вложений: {e}")
-        
-        return attachments
-    
     def mark_as_read(self, email_id: str, folder: str = "INBOX") -> bool:
         """Отметить письмо как прочитанное"""
-        if not self.connect():
-            return False
+        def store(session: PooledSession):
+            session.select(folder)
+            if self.store is None:
+                session.connection.store(email_id, '+FLAGS', '\\Seen')
+                return
+            
+            _, data = session.connection.uid('STORE', email_id, '+FLAGS', '(\\Seen)')
+            flags = {}
+            for item in data:
+                if isinstance(item, bytes):
+                    _, uid, values = parse_fetch_attributes(item)
+                    if uid is not None:
+                        flags[uid] = values or []
+            self.store.update_flags(self.account, folder, flags)
         
         try:
-            self.connection.select(folder)
-            self.connection.store(email_id, '+FLAGS', '\\Seen')
+            self.pool.run(store)
             return True
         
         except Exception as e:
             logger.error(f"Ошибка отметки письма как прочитанного: {e}")
             return False
-        
-        finally:
-            self.disconnect()
     
     def delete_email(self, email_id: str, folder: str = "INBOX") -> bool:
         """Удаление письма"""
-        if not self.connect():
-            return False
+        def delete(session: PooledSession):
+            session.select(folder)
+            if self.store is None:
+                session.connection.store(email_id, '+FLAGS', '\\Deleted')
+            else:
+                session.connection.uid('STORE', email_id, '+FLAGS', '(\\Deleted)')
+                self.store.remove_messages(self.account, folder, {int(email_id)})
+            session.connection.expunge()
         
         try:
-            self.connection.select(folder)
-            self.connection.store(email_id, '+FLAGS', '\\Deleted')
-            self.connection.expunge()
+            self.pool.run(delete)
             return True
         
         except Exception as e:
             logger.error(f"Ошибка удаления письма: {e}")
-            return False
-        
-        finally:
-            self.disconnect()
\ No newline at end of file
+            return False
\ No newline at end of file
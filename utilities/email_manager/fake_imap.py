@@ -0,0 +1,627 @@
+"""
+Локальный IMAP сервер для тестов и бенчмарков EmailClient
+
+Поддерживает подмножество IMAP4rev1, которое использует EmailClient:
+LOGIN, SELECT/EXAMINE, NOOP, SEARCH, FETCH, STORE, EXPUNGE, CLOSE, LOGOUT.
+FETCH отдает RFC822, BODY[] и части писем: BODYSTRUCTURE,
+BODY.PEEK[HEADER.FIELDS (...)] и BODY.PEEK[<раздел>]<смещение.длина>.
+Работает без TLS, задержка ответа на команду и стоимость входа
+(TLS рукопожатие и LOGIN реального сервера) настраиваются.
+
+Запуск отдельным процессом:
+    python fake_imap.py --port 1143 --latency 0.02 --messages 500
+"""
+
+import argparse
+import email
+import email.utils
+import logging
+import re
+import socket
+import socketserver
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from email.message import EmailMessage, Message
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CAPABILITIES = "IMAP4rev1 LITERAL+ UIDPLUS IDLE"
+
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+def make_message(subject: str, body: str, sender: str = "sender@example.com",
+                 to: str = "me@example.com", date: Optional[datetime] = None,
+                 attachments: Optional[List[Tuple[str, bytes]]] = None, headers: Optional[Dict[str, str]] = None,
+                 html: Optional[str] = None) -> bytes:
+    """RFC822 письмо для наполнения ящика; html - альтернативная HTML версия текста"""
+    message = EmailMessage()
+    message['From'] = sender
+    message['To'] = to
+    message['Subject'] = subject
+    message['Date'] = email.utils.format_datetime(date or datetime.now(timezone.utc))
+    for name, value in (headers or {}).items():
+        message[name] = value
+    message.set_content(body)
+    if html is not None:
+        message.add_alternative(html, subtype='html')
+    for filename, payload in attachments or []:
+        message.add_attachment(payload, maintype='application', subtype='octet-stream', filename=filename)
+    return message.as_bytes()
+
+def parse_message_set(spec: str, largest: int) -> List[int]:
+    """Номера из набора вида 1:50,60,70:* (RFC 3501), * - наибольший номер"""
+    numbers = set()
+    for part in spec.split(','):
+        if ':' in part:
+            start, end = part.split(':', 1)
+            start = largest if start == '*' else int(start)
+            end = largest if end == '*' else int(end)
+            numbers.update(range(min(start, end), max(start, end) + 1))
+        else:
+            numbers.add(largest if part == '*' else int(part))
+    return sorted(numbers)
+
+def split_items(spec: str) -> List[str]:
+    """Разбиение списка атрибутов FETCH с учетом скобок: (UID BODY.PEEK[HEADER.FIELDS (FROM)])"""
+    spec = spec.strip()
+    if spec.startswith('(') and spec.endswith(')'):
+        spec = spec[1:-1]
+
+    items = []
+    depth = 0
+    current = ''
+    for char in spec:
+        if char in '[(':
+            depth += 1
+        elif char in '])':
+            depth -= 1
+        if char == ' ' and depth == 0:
+            if current:
+                items.append(current)
+            current = ''
+        else:
+            current += char
+    if current:
+        items.append(current)
+    return items
+
+def quote(value: str) -> str:
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+def section_part(message: Message, section: str) -> Message:
+    """Часть письма по номеру раздела IMAP: 1, 2.1; у простого письма раздел 1 - само тело"""
+    part = message
+    for index in section.split('.'):
+        if part.is_multipart():
+            part = part.get_payload()[int(index) - 1]
+        elif index != '1':
+            raise ValueError(f"no section {section}")
+    return part
+
+def section_body(part: Message) -> bytes:
+    """Тело части без заголовков, в исходной кодировке передачи"""
+    return part.as_bytes().replace(b'\r\n', b'\n').split(b'\n\n', 1)[-1]
+
+def body_structure(part: Message) -> str:
+    """BODYSTRUCTURE части (RFC 3501, без конвертов вложенных писем)"""
+    if part.is_multipart():
+        children = "".join(body_structure(child) for child in part.get_payload())
+        return f"({children} {quote(part.get_content_subtype().upper())})"
+
+    params = part.get_params()[1:] if part.get_params() else []
+    params = "(" + " ".join(f"{quote(k.upper())} {quote(str(v))}" for k, v in params) + ")" if params else "NIL"
+    body = section_body(part)
+    encoding = part.get('Content-Transfer-Encoding', '7bit').upper()
+    fields = (f"{quote(part.get_content_maintype().upper())} {quote(part.get_content_subtype().upper())} "
+              f"{params} NIL NIL {quote(encoding)} {len(body)}")
+    if part.get_content_maintype() == 'text':
+        fields += f" {len(body.splitlines())}"
+
+    disposition = "NIL"
+    if part.get_content_disposition():
+        filename = part.get_filename()
+        extra = f"({quote('FILENAME')} {quote(filename)})" if filename else "NIL"
+        disposition = f"({quote(part.get_content_disposition().upper())} {extra})"
+    return f"({fields} NIL {disposition} NIL)"
+
+def header_fields(message: Message, names: List[str]) -> bytes:
+    lines = [f"{name}: {value}" for name in names for value in message.get_all(name, [])]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode('utf-8')
+
+def tokenize(line: str) -> List[str]:
+    """Аргументы команды: атомы, строки в кавычках и списки в скобках целиком"""
+    tokens = []
+    i = 0
+    while i < len(line):
+        char = line[i]
+        if char == ' ':
+            i += 1
+        elif char == '"':
+            end = i + 1
+            value = ''
+            while line[end] != '"':
+                if line[end] == '\\':
+                    end += 1
+                value += line[end]
+                end += 1
+            tokens.append(value)
+            i = end + 1
+        elif char == '(':
+            depth = 0
+            end = i
+            while True:
+                if line[end] == '(':
+                    depth += 1
+                elif line[end] == ')':
+                    depth -= 1
+                    if depth == 0:
+                        break
+                end += 1
+            tokens.append(line[i:end + 1])
+            i = end + 1
+        else:
+            end = i
+            depth = 0
+            while end < len(line) and (line[end] != ' ' or depth):
+                if line[end] in '[(':
+                    depth += 1
+                elif line[end] in '])':
+                    depth -= 1
+                end += 1
+            tokens.append(line[i:end])
+            i = end
+    return tokens
+
+class Mailbox:
+    """Папка: письма с UID и флагами"""
+
+    def __init__(self, uidvalidity: int = 1):
+        self.uidvalidity = uidvalidity
+        self.uidnext = 1
+        self.messages: List[Dict[str, Any]] = []
+
+    def add(self, raw: bytes, flags: Tuple[str, ...] = (), internaldate: Optional[datetime] = None) -> int:
+        uid = self.uidnext
+        self.uidnext += 1
+        self.messages.append({
+            'uid': uid,
+            'flags': set(flags),
+            'raw': raw,
+            'internaldate': internaldate or datetime.now(timezone.utc)
+        })
+        return uid
+
+class FakeIMAPServer:
+    """IMAP сервер в отдельном потоке
+
+    latency - задержка ответа на каждую команду, сек (сетевой RTT)
+    login_delay - дополнительная задержка LOGIN (TLS рукопожатие и авторизация)
+    """
+
+    def __init__(self, username: str = "user", password: str = "password", latency: float = 0.0,
+                 login_delay: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.login_delay = login_delay
+        self.host = host
+        self.port = port
+
+        self.mailboxes: Dict[str, Mailbox] = {'INBOX': Mailbox()}
+        self.lock = threading.RLock()
+        # Сигнал сессиям в IDLE об изменении папок
+        self.changed = threading.Condition(self.lock)
+        self._server: Optional[socketserver.ThreadingTCPServer] = None
+        self._handlers: List[Any] = []
+
+        self.connections = 0
+        self.logins = 0
+        self.bytes_sent = 0
+        self.commands: Counter = Counter()
+
+    def add_message(self, raw: bytes, folder: str = "INBOX", flags: Tuple[str, ...] = (),
+                    internaldate: Optional[datetime] = None) -> int:
+        """Добавить письмо в папку, возвращает UID"""
+        with self.lock:
+            mailbox = self.mailboxes.setdefault(folder, Mailbox())
+            uid = mailbox.add(raw, flags, internaldate)
+            self.changed.notify_all()
+            return uid
+
+    def remove_message(self, uid: int, folder: str = "INBOX"):
+        """Удалить письмо, как при удалении из другого почтового клиента"""
+        with self.lock:
+            messages = self.mailboxes[folder].messages
+            messages[:] = [m for m in messages if m['uid'] != uid]
+            self.changed.notify_all()
+
+    def set_flags(self, uid: int, flags: Tuple[str, ...], folder: str = "INBOX"):
+        """Заменить флаги письма, как при изменении из другого почтового клиента"""
+        with self.lock:
+            for message in self.mailboxes[folder].messages:
+                if message['uid'] == uid:
+                    message['flags'] = set(flags)
+
+    def reset_uidvalidity(self, folder: str = "INBOX"):
+        """Пересоздать папку с новым UIDVALIDITY и перенумерованными UID"""
+        with self.lock:
+            old = self.mailboxes[folder]
+            mailbox = self.mailboxes[folder] = Mailbox(old.uidvalidity + 1)
+            for message in old.messages:
+                mailbox.add(message['raw'], tuple(message['flags']), message['internaldate'])
+
+    def start(self) -> 'FakeIMAPServer':
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._server = socketserver.ThreadingTCPServer((self.host, self.port), self._make_handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self.drop_connections()
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> 'FakeIMAPServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def drop_connections(self):
+        """Оборвать все открытые сессии, как при перезапуске сервера или таймауте"""
+        with self.lock:
+            handlers = list(self._handlers)
+        for handler in handlers:
+            handler.drop()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'connections': self.connections,
+                'logins': self.logins,
+                'bytes_sent': self.bytes_sent,
+                'commands': dict(self.commands)
+            }
+
+    def _make_handler(self):
+        server = self
+
+        class IMAPHandler(socketserver.StreamRequestHandler):
+
+            def setup(self):
+                super().setup()
+                # Ответы пишутся несколькими строками, без NODELAY Nagle добавляет ~40 мс
+                self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                self.authenticated = False
+                self.mailbox: Optional[Mailbox] = None
+                self.readonly = False
+                self.closed = False
+                # UID писем папки, о которых знает клиент: по ним считаются уведомления IDLE
+                self.known: List[int] = []
+                with server.lock:
+                    server.connections += 1
+                    server._handlers.append(self)
+
+            def finish(self):
+                with server.lock:
+                    if self in server._handlers:
+                        server._handlers.remove(self)
+                try:
+                    super().finish()
+                except OSError:
+                    pass
+
+            def drop(self):
+                self.closed = True
+                try:
+                    self.request.shutdown(2)
+                except OSError:
+                    pass
+
+            def send(self, data: bytes):
+                with server.lock:
+                    server.bytes_sent += len(data)
+                self.wfile.write(data)
+
+            def line(self, text: str):
+                self.send(text.encode('utf-8') + b"\r\n")
+
+            def handle(self):
+                time.sleep(server.latency)
+                self.line(f"* OK [CAPABILITY {CAPABILITIES}] Fake IMAP ready")
+                while not self.closed:
+                    try:
+                        raw = self.rfile.readline()
+                    except OSError:
+                        return
+                    if not raw:
+                        return
+                    parts = raw.decode('utf-8', 'replace').rstrip('\r\n').split(' ', 2)
+                    if len(parts) < 2:
+                        continue
+                    tag, command = parts[0], parts[1].upper()
+                    args = parts[2] if len(parts) > 2 else ''
+
+                    uid = command == 'UID'
+                    if uid:
+                        command, _, args = args.partition(' ')
+                        command = command.upper()
+
+                    with server.lock:
+                        server.commands[f"UID {command}" if uid else command] += 1
+                    time.sleep(server.latency)
+
+                    try:
+                        result = self.dispatch(command, args, uid)
+                    except Exception as e:
+                        logger.debug(f"Ошибка команды {command}: {e}")
+                        self.line(f"{tag} BAD {command} {e}")
+                        continue
+                    # Сессия оборвана во время IDLE
+                    if self.closed:
+                        return
+                    self.line(f"{tag} {result}")
+                    if command == 'LOGOUT':
+                        return
+
+            def dispatch(self, command: str, args: str, uid: bool) -> str:
+                if command == 'CAPABILITY':
+                    self.line(f"* CAPABILITY {CAPABILITIES}")
+                    return "OK CAPABILITY completed"
+                if command == 'NOOP':
+                    return "OK NOOP completed"
+                if command == 'LOGOUT':
+                    self.line("* BYE logging out")
+                    return "OK LOGOUT completed"
+                if command == 'LOGIN':
+                    time.sleep(server.login_delay)
+                    username, password = tokenize(args)[:2]
+                    if (username, password) != (server.username, server.password):
+                        return "NO [AUTHENTICATIONFAILED] Invalid credentials"
+                    with server.lock:
+                        server.logins += 1
+                    self.authenticated = True
+                    return "OK LOGIN completed"
+
+                if not self.authenticated:
+                    return f"BAD {command} requires authentication"
+
+                if command in ('SELECT', 'EXAMINE'):
+                    return self.select(tokenize(args)[0], command == 'EXAMINE')
+
+                if self.mailbox is None:
+                    return f"BAD {command} requires a selected mailbox"
+
+                if command == 'CLOSE':
+                    if not self.readonly:
+                        self.expunge(notify=False)
+                    self.mailbox = None
+                    return "OK CLOSE completed"
+                if command == 'EXPUNGE':
+                    self.expunge(notify=True)
+                    return "OK EXPUNGE completed"
+                if command == 'IDLE':
+                    return self.idle()
+                if command == 'SEARCH':
+                    found = self.search(tokenize(args), uid)
+                    self.line("* SEARCH" + "".join(f" {n}" for n in found))
+                    return "OK SEARCH completed"
+                if command == 'FETCH':
+                    spec, items = args.split(' ', 1)
+                    for seq, message in self.resolve(spec, uid):
+                        self.fetch(seq, message, split_items(items), uid)
+                    return "OK FETCH completed"
+                if command == 'STORE':
+                    spec, mode, flags = args.split(' ', 2)
+                    for seq, message in self.resolve(spec, uid):
+                        self.store(seq, message, mode.upper(), flags, uid)
+                    return "OK STORE completed"
+
+                return f"BAD unknown command {command}"
+
+            def select(self, name: str, readonly: bool) -> str:
+                with server.lock:
+                    mailbox = server.mailboxes.get(name)
+                    if mailbox is None:
+                        self.mailbox = None
+                        return "NO [NONEXISTENT] Mailbox does not exist"
+                    self.mailbox = mailbox
+                    self.readonly = readonly
+                    self.known = [m['uid'] for m in mailbox.messages]
+                    exists = len(mailbox.messages)
+                    uidvalidity = mailbox.uidvalidity
+                    uidnext = mailbox.uidnext
+                self.line("* FLAGS (\\Answered \\Flagged \\Deleted \\Seen \\Draft)")
+                self.line(f"* {exists} EXISTS")
+                self.line("* 0 RECENT")
+                self.line(f"* OK [UIDVALIDITY {uidvalidity}] UIDs valid")
+                self.line(f"* OK [UIDNEXT {uidnext}] Predicted next UID")
+                mode = "READ-ONLY" if readonly else "READ-WRITE"
+                return f"OK [{mode}] SELECT completed"
+
+            def resolve(self, spec: str, uid: bool) -> List[Tuple[int, Dict[str, Any]]]:
+                """Письма по набору номеров или UID: пары (номер, письмо)"""
+                with server.lock:
+                    messages = list(self.mailbox.messages)
+                if not messages:
+                    return []
+                if uid:
+                    wanted = set(parse_message_set(spec, messages[-1]['uid']))
+                    return [(i + 1, m) for i, m in enumerate(messages) if m['uid'] in wanted]
+                return [(n, messages[n - 1]) for n in parse_message_set(spec, len(messages))
+                        if 1 <= n <= len(messages)]
+
+            def search(self, criteria: List[str], uid: bool) -> List[int]:
+                with server.lock:
+                    messages = list(enumerate(self.mailbox.messages, 1))
+                i = 0
+                while i < len(criteria):
+                    key = criteria[i].upper()
+                    if key == 'ALL':
+                        pass
+                    elif key in ('SINCE', 'BEFORE'):
+                        day = datetime.strptime(criteria[i + 1], "%d-%b-%Y").date()
+                        if key == 'SINCE':
+                            messages = [(n, m) for n, m in messages if m['internaldate'].date() >= day]
+                        else:
+                            messages = [(n, m) for n, m in messages if m['internaldate'].date() < day]
+                        i += 1
+                    elif key in ('SEEN', 'UNSEEN'):
+                        messages = [(n, m) for n, m in messages if ('\\Seen' in m['flags']) == (key == 'SEEN')]
+                    elif key == 'UID':
+                        largest = self.mailbox.messages[-1]['uid'] if self.mailbox.messages else 0
+                        wanted = set(parse_message_set(criteria[i + 1], largest))
+                        messages = [(n, m) for n, m in messages if m['uid'] in wanted]
+                        i += 1
+                    else:
+                        raise ValueError(f"unsupported search key {key}")
+                    i += 1
+                return [m['uid'] if uid else n for n, m in messages]
+
+            def fetch(self, seq: int, message: Dict[str, Any], items: List[str], uid: bool):
+                parts: List[Tuple[str, Optional[bytes]]] = []
+                names = [item.upper() for item in items]
+                if uid and 'UID' not in names:
+                    names.insert(0, 'UID')
+
+                for name in names:
+                    if name == 'UID':
+                        parts.append((f"UID {message['uid']}", None))
+                    elif name == 'FLAGS':
+                        parts.append((f"FLAGS ({' '.join(sorted(message['flags']))})", None))
+                    elif name == 'RFC822.SIZE':
+                        parts.append((f"RFC822.SIZE {len(message['raw'])}", None))
+                    elif name == 'INTERNALDATE':
+                        moment = message['internaldate']
+                        stamp = f"{moment.day:02d}-{MONTHS[moment.month - 1]}-{moment.strftime('%Y %H:%M:%S +0000')}"
+                        parts.append((f'INTERNALDATE "{stamp}"', None))
+                    elif name == 'RFC822':
+                        parts.append(("RFC822", message['raw']))
+                        if not self.readonly:
+                            message['flags'].add('\\Seen')
+                    elif name in ('BODY[]', 'BODY.PEEK[]'):
+                        parts.append(("BODY[]", message['raw']))
+                        if name == 'BODY[]' and not self.readonly:
+                            message['flags'].add('\\Seen')
+                    elif name == 'BODYSTRUCTURE':
+                        parts.append((f"BODYSTRUCTURE {body_structure(email.message_from_bytes(message['raw']))}", None))
+                    elif name.startswith(('BODY[', 'BODY.PEEK[')):
+                        parts.append(self.fetch_section(message, name))
+                    else:
+                        raise ValueError(f"unsupported fetch item {name}")
+
+                self.send_fetch(seq, parts)
+
+            def fetch_section(self, message: Dict[str, Any], name: str) -> Tuple[str, bytes]:
+                """BODY[HEADER.FIELDS (...)] и BODY[раздел]<смещение.длина>"""
+                match = re.match(r'BODY(?:\.PEEK)?\[([^\]]*)\](?:<(\d+)\.(\d+)>)?$', name)
+                if not match:
+                    raise ValueError(f"unsupported fetch item {name}")
+                section, offset, length = match.groups()
+                parsed = email.message_from_bytes(message['raw'])
+
+                if section.startswith('HEADER.FIELDS'):
+                    data = header_fields(parsed, section[len('HEADER.FIELDS'):].strip(' ()').split())
+                else:
+                    data = section_body(section_part(parsed, section))
+                if offset is None:
+                    return (f"BODY[{section}]", data)
+                return (f"BODY[{section}]<{offset}>", data[int(offset):int(offset) + int(length)])
+
+            def send_fetch(self, seq: int, parts: List[Tuple[str, Optional[bytes]]]):
+                data = f"* {seq} FETCH (".encode()
+                for i, (text, literal) in enumerate(parts):
+                    data += (b" " if i else b"") + text.encode('utf-8')
+                    if literal is not None:
+                        data += f" {{{len(literal)}}}\r\n".encode() + literal
+                self.send(data + b")\r\n")
+
+            def store(self, seq: int, message: Dict[str, Any], mode: str, flags: str, uid: bool):
+                values = set(re.findall(r'\\?[\w$]+', flags))
+                with server.lock:
+                    if mode.startswith('+'):
+                        message['flags'] |= values
+                    elif mode.startswith('-'):
+                        message['flags'] -= values
+                    else:
+                        message['flags'] = values
+                if not mode.endswith('.SILENT'):
+                    uid_part = f"UID {message['uid']} " if uid else ""
+                    self.line(f"* {seq} FETCH ({uid_part}FLAGS ({' '.join(sorted(message['flags']))}))")
+
+            def expunge(self, notify: bool):
+                with server.lock:
+                    messages = self.mailbox.messages
+                    removed = [n for n, m in enumerate(messages, 1) if '\\Deleted' in m['flags']]
+                    messages[:] = [m for m in messages if '\\Deleted' not in m['flags']]
+                    server.changed.notify_all()
+                if notify:
+                    # Номера сдвигаются после каждого удаления
+                    for shift, n in enumerate(removed):
+                        self.line(f"* {n - shift} EXPUNGE")
+                    self.known = [m['uid'] for m in messages]
+
+            def idle(self) -> str:
+                """IDLE: уведомления об изменениях папки до строки DONE от клиента"""
+                self.line("+ idling")
+                done = threading.Event()
+
+                def wait_done():
+                    try:
+                        self.rfile.readline()
+                    except OSError:
+                        pass
+                    done.set()
+                    with server.changed:
+                        server.changed.notify_all()
+
+                threading.Thread(target=wait_done, daemon=True).start()
+                with server.changed:
+                    while not done.is_set() and not self.closed:
+                        self.notify_changes()
+                        server.changed.wait(1.0)
+                return "OK IDLE terminated"
+
+            def notify_changes(self):
+                """Непрочитанные клиентом изменения папки: EXPUNGE удаленных, затем EXISTS"""
+                current = [m['uid'] for m in self.mailbox.messages]
+                alive = set(current)
+                for uid in [uid for uid in self.known if uid not in alive]:
+                    self.line(f"* {self.known.index(uid) + 1} EXPUNGE")
+                    self.known.remove(uid)
+                if len(current) != len(self.known):
+                    self.line(f"* {len(current)} EXISTS")
+                self.known = current
+
+        return IMAPHandler
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальный IMAP сервер для тестов EmailClient")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1143)
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа на команду, сек")
+    parser.add_argument("--login-delay", type=float, default=0.0, help="стоимость входа, сек")
+    parser.add_argument("--messages", type=int, default=50, help="писем в INBOX")
+    args = parser.parse_args()
+
+    server = FakeIMAPServer(latency=args.latency, login_delay=args.login_delay, host=args.host, port=args.port)
+    for i in range(args.messages):
+        server.add_message(make_message(f"Письмо {i}", f"Текст письма номер {i}"))
+    server.start()
+
+    print(f"Фейковый IMAP сервер: {args.host}:{server.port} (user / password, без TLS)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
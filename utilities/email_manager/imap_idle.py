@@ -0,0 +1,258 @@
+"""
+Фоновый слушатель IMAP IDLE
+
+Отдельное соединение держит папку в режиме IDLE, и сервер сам сообщает о
+новых (EXISTS) и удаленных (EXPUNGE) письмах. По уведомлению через пул
+сессий клиента загружаются только письма с UID больше последнего
+известного, а при удалениях обновляются флаги хранилища. События
+копятся в слушателе; интерфейс и сводки забирают их по номеру версии.
+IDLE переотправляется каждые renew_interval секунд (RFC 2177 требует не
+реже 29 минут), при обрыве соединение открывается заново.
+"""
+
+import imaplib
+import logging
+import re
+import socket
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Уведомления об изменении папки во время IDLE
+NOTIFICATION = re.compile(rb'\* \d+ (EXISTS|EXPUNGE)\b', re.IGNORECASE)
+
+# Сколько ждать завершения IDLE после DONE, сек
+DONE_TIMEOUT = 30.0
+
+class IdleListener:
+    """Слушатель папки одного ящика
+
+    client - EmailClient: открывает соединение IDLE и загружает новые письма через свой пул
+    renew_interval - через сколько секунд переотправлять IDLE
+    poll_interval - как часто проверять остановку и срок IDLE, сек
+    retry_delay - пауза перед переподключением после ошибки, сек
+    """
+
+    def __init__(self, client: Any, folder: str = "INBOX", renew_interval: float = 1500.0,
+                 poll_interval: float = 0.5, retry_delay: float = 5.0, max_events: int = 100):
+        self.client = client
+        self.folder = folder
+        self.renew_interval = renew_interval
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+
+        self.highest_uid: Optional[int] = None
+        self.events: deque = deque(maxlen=max_events)
+        self.version = 0
+        self.idle_commands = 0
+        self.reconnects = 0
+        self.error: Optional[str] = None
+
+        self._callbacks: List[Callable[[Dict[str, Any]], None]] = []
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        """Вызывать callback(событие) в потоке слушателя при каждом изменении папки"""
+        self._callbacks.append(callback)
+
+    def start(self) -> 'IdleListener':
+        if not self.running:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=f"imap-idle-{self.folder}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        """Завершить IDLE (DONE и LOGOUT) и дождаться потока"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout if timeout is not None else self.poll_interval * 4 + 5)
+
+    def wait(self, version: int, timeout: float) -> int:
+        """Дождаться события новее version, возвращает текущую версию"""
+        with self._condition:
+            self._condition.wait_for(lambda: self.version > version, timeout)
+            return self.version
+
+    def events_since(self, version: int) -> List[Dict[str, Any]]:
+        """События с номером больше version"""
+        with self._condition:
+            return [event for event in self.events if event['version'] > version]
+
+    def _run(self):
+        while not self._stop.is_set():
+            connection = None
+            try:
+                connection = self.client._open_connection()
+                self._listen(connection)
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                self.error = str(e)
+                self.reconnects += 1
+                logger.warning(f"IMAP IDLE {self.folder}: {e}, переподключение через {self.retry_delay} с")
+                self._stop.wait(self.retry_delay)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.logout()
+                    except Exception:
+                        pass
+
+    def _listen(self, connection: imaplib.IMAP4):
+        status, data = connection.select(self.folder, readonly=True)
+        if status != 'OK':
+            raise imaplib.IMAP4.error(f"Не удалось выбрать папку {self.folder}: {data}")
+        supported = 'IDLE' in connection.capabilities
+
+        if self.highest_uid is None:
+            self.highest_uid = self._initial_uid(connection)
+        else:
+            # Письма, пришедшие пока соединения не было
+            self._apply(Counter({'EXISTS': 1}))
+        self.error = None
+
+        if not supported:
+            logger.warning(f"Сервер не поддерживает IDLE, папка {self.folder} проверяется NOOP")
+
+        while not self._stop.is_set():
+            changes = self._idle(connection) if supported else self._noop(connection)
+            if changes:
+                self._apply(changes)
+
+    def _initial_uid(self, connection: imaplib.IMAP4) -> int:
+        """Последний известный UID: из хранилища, если оно в той же версии папки, иначе UIDNEXT - 1"""
+        _, uidvalidity = connection.response('UIDVALIDITY')
+        _, uidnext = connection.response('UIDNEXT')
+        store = self.client.store
+        if store is not None:
+            state = store.get_state(self.client.account, self.folder)
+            if state is not None and uidvalidity and uidvalidity[-1] and state['uidvalidity'] == int(uidvalidity[-1]):
+                return state['highest_uid']
+        return int(uidnext[-1]) - 1 if uidnext and uidnext[-1] else 0
+
+    def _idle(self, connection: imaplib.IMAP4) -> Counter:
+        """Один цикл IDLE: до уведомления, истечения renew_interval или остановки"""
+        tag = connection._new_tag()
+        connection.send(tag + b' IDLE\r\n')
+        self.idle_commands += 1
+
+        # Ответы читаются из сокета напрямую: таймаут буферизованного файла imaplib портит его
+        sock = connection.socket()
+        timeout = sock.gettimeout()
+        sock.settimeout(self.poll_interval)
+        deadline = time.monotonic() + self.renew_interval
+        changes: Counter = Counter()
+        buffer = b''
+        idling = False
+        done_at: Optional[float] = None
+
+        try:
+            while True:
+                if idling and done_at is None and (changes or self._stop.is_set() or time.monotonic() >= deadline):
+                    connection.send(b'DONE\r\n')
+                    done_at = time.monotonic()
+
+                try:
+                    chunk = sock.recv(4096)
+                except socket.timeout:
+                    # Молча оборванное соединение обнаруживается по отсутствию ответа на DONE
+                    if done_at is not None and time.monotonic() - done_at > DONE_TIMEOUT:
+                        raise imaplib.IMAP4.abort("Сервер не ответил на DONE")
+                    continue
+                if not chunk:
+                    raise imaplib.IMAP4.abort("Соединение IDLE закрыто сервером")
+                buffer += chunk
+
+                while b'\r\n' in buffer:
+                    line, buffer = buffer.split(b'\r\n', 1)
+                    if line.startswith(b'+'):
+                        idling = True
+                    elif line.startswith(tag + b' '):
+                        if not line[len(tag) + 1:].upper().startswith(b'OK'):
+                            raise imaplib.IMAP4.error(f"IDLE отклонен: {line.decode(errors='replace')}")
+                        return changes
+                    elif line.startswith(b'* BYE'):
+                        raise imaplib.IMAP4.abort(line.decode(errors='replace'))
+                    else:
+                        match = NOTIFICATION.match(line)
+                        if match:
+                            changes[match.group(1).decode().upper()] += 1
+        finally:
+            sock.settimeout(timeout)
+
+    def _noop(self, connection: imaplib.IMAP4) -> Counter:
+        """Проверка NOOP для серверов без IDLE"""
+        self._stop.wait(self.poll_interval)
+        connection.noop()
+        changes: Counter = Counter()
+        for name in ('EXISTS', 'EXPUNGE'):
+            _, data = connection.response(name)
+            changes[name] += len([item for item in data if item is not None])
+        return +changes
+
+    def _apply(self, changes: Counter) -> Optional[Dict[str, Any]]:
+        """Загрузка новых писем и учет удалений после уведомления"""
+        removed = 0
+        if changes['EXPUNGE']:
+            _, removed = self.client.refresh_flags(self.folder)
+            if self.client.store is None:
+                removed = changes['EXPUNGE']
+
+        emails = self.client.fetch_new_emails(self.folder, self.highest_uid or 0)
+        if emails:
+            self.highest_uid = max([self.highest_uid or 0] + [int(e['id']) for e in emails])
+        if not emails and not removed:
+            return None
+
+        with self._condition:
+            self.version += 1
+            event = {
+                'version': self.version,
+                'folder': self.folder,
+                'emails': emails,
+                'removed': removed,
+                'time': datetime.now().isoformat()
+            }
+            self.events.append(event)
+            self._condition.notify_all()
+
+        logger.info(f"IMAP IDLE {self.folder}: новых {len(emails)}, удалено {removed}")
+        for callback in list(self._callbacks):
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"Ошибка обработчика IDLE: {e}")
+        return event
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'running': self.running,
+            'version': self.version,
+            'idle_commands': self.idle_commands,
+            'reconnects': self.reconnects,
+            'highest_uid': self.highest_uid,
+            'error': self.error
+        }
+
+# Слушатели процесса по ящику и папке: переживают перезапуски скрипта Streamlit
+_listeners: Dict[Tuple[str, str], IdleListener] = {}
+_listeners_lock = threading.Lock()
+
+def get_listener(client: Any, folder: str = "INBOX", **options) -> IdleListener:
+    """Общий слушатель папки ящика, создается при первом обращении"""
+    with _listeners_lock:
+        listener = _listeners.get((client.account, folder))
+        if listener is None:
+            listener = _listeners[(client.account, folder)] = IdleListener(client, folder, **options)
+        return listener
@@ -0,0 +1,214 @@
+"""
+Пул авторизованных IMAP сессий
+
+TLS рукопожатие и LOGIN выполняются один раз на сессию, а не на каждую
+операцию. Перед выдачей давно не проверявшаяся сессия проверяется NOOP,
+простаивающие дольше idle_timeout закрываются, оборванные пересоздаются.
+Пулы хранятся на уровне модуля, поэтому переживают перезапуски скрипта
+Streamlit.
+"""
+
+import imaplib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Ошибки, после которых соединение считается оборванным
+CONNECTION_ERRORS = (imaplib.IMAP4.abort, OSError, EOFError)
+
+class PooledSession:
+    """Сессия пула: соединение и выбранная в нем папка"""
+
+    def __init__(self, connection: imaplib.IMAP4):
+        self.connection = connection
+        self.selected: Optional[Tuple[str, bool]] = None
+        self.exists = 0
+        self.uidvalidity: Optional[int] = None
+        self.created = self.last_used = self.last_checked = time.monotonic()
+
+    def select(self, folder: str, readonly: bool = False) -> int:
+        """Выбор папки, возвращает число писем; та же папка повторно не выбирается"""
+        if self.selected == (folder, readonly):
+            return self.exists
+
+        status, data = self.connection.select(folder, readonly)
+        if status != 'OK':
+            self.selected = None
+            raise imaplib.IMAP4.error(f"Не удалось выбрать папку {folder}: {data}")
+
+        self.selected = (folder, readonly)
+        self.exists = int(data[0] or 0)
+        _, uidvalidity = self.connection.response('UIDVALIDITY')
+        self.uidvalidity = int(uidvalidity[-1]) if uidvalidity and uidvalidity[-1] else None
+        return self.exists
+
+    def close(self):
+        try:
+            if self.selected is not None:
+                self.connection.close()
+            self.connection.logout()
+        except Exception as e:
+            logger.debug(f"Ошибка при закрытии IMAP сессии: {e}")
+
+class IMAPPool:
+    """Пул сессий одного почтового ящика
+
+    factory - функция, открывающая новое авторизованное соединение
+    max_size - максимум одновременно открытых сессий
+    idle_timeout - простаивающая дольше сессия закрывается, сек
+    check_interval - как часто проверять сессию NOOP перед выдачей, сек
+    """
+
+    def __init__(self, factory: Callable[[], imaplib.IMAP4], max_size: int = 2,
+                 idle_timeout: float = 300.0, check_interval: float = 30.0, acquire_timeout: float = 60.0):
+        self.factory = factory
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.check_interval = check_interval
+        self.acquire_timeout = acquire_timeout
+
+        self._idle: List[PooledSession] = []
+        self._in_use = 0
+        self._condition = threading.Condition()
+
+        self.created = 0
+        self.reused = 0
+        self.health_checks = 0
+        self.reconnects = 0
+        self.expired = 0
+
+    def _reap(self) -> List[PooledSession]:
+        """Убрать из пула простоявшие дольше idle_timeout (вызывается под блокировкой)"""
+        now = time.monotonic()
+        expired = [s for s in self._idle if now - s.last_used >= self.idle_timeout]
+        if expired:
+            self._idle = [s for s in self._idle if s not in expired]
+            self.expired += len(expired)
+        return expired
+
+    def _healthy(self, session: PooledSession) -> bool:
+        if time.monotonic() - session.last_checked < self.check_interval:
+            return True
+
+        self.health_checks += 1
+        try:
+            status, _ = session.connection.noop()
+        except CONNECTION_ERRORS + (imaplib.IMAP4.error,):
+            return False
+        session.last_checked = time.monotonic()
+        return status == 'OK'
+
+    def _acquire(self) -> PooledSession:
+        deadline = time.monotonic() + self.acquire_timeout
+        session = None
+
+        with self._condition:
+            while True:
+                expired = self._reap()
+                if self._idle:
+                    session = self._idle.pop()
+                    break
+                if self._in_use < self.max_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("Нет свободной IMAP сессии")
+                self._condition.wait(remaining)
+            self._in_use += 1
+
+        for stale in expired:
+            stale.close()
+
+        if session is not None:
+            if self._healthy(session):
+                self.reused += 1
+                return session
+            logger.info("IMAP сессия не ответила на NOOP, переподключаемся")
+            self.reconnects += 1
+            session.close()
+
+        try:
+            session = PooledSession(self.factory())
+        except BaseException:
+            self._release(None)
+            raise
+        self.created += 1
+        return session
+
+    def _release(self, session: Optional[PooledSession], broken: bool = False):
+        with self._condition:
+            self._in_use -= 1
+            if session is not None and not broken:
+                session.last_used = time.monotonic()
+                self._idle.append(session)
+            self._condition.notify()
+
+        if session is not None and broken:
+            session.close()
+
+    @contextmanager
+    def session(self) -> Iterator[PooledSession]:
+        """Сессия из пула на время блока; оборванная сессия в пул не возвращается"""
+        session = self._acquire()
+        broken = False
+        try:
+            yield session
+        except CONNECTION_ERRORS:
+            broken = True
+            raise
+        finally:
+            self._release(session, broken)
+
+    def run(self, operation: Callable[[PooledSession], T], retries: int = 1) -> T:
+        """Операция над сессией; при обрыве соединения повторяется на новой сессии"""
+        attempt = 0
+        while True:
+            try:
+                with self.session() as session:
+                    return operation(session)
+            except CONNECTION_ERRORS as e:
+                if attempt >= retries:
+                    raise
+                attempt += 1
+                self.reconnects += 1
+                logger.warning(f"IMAP соединение оборвано ({e}), повтор на новой сессии")
+
+    def close_all(self):
+        """Закрыть свободные сессии пула"""
+        with self._condition:
+            sessions, self._idle = self._idle, []
+        for session in sessions:
+            session.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'created': self.created,
+                'reused': self.reused,
+                'health_checks': self.health_checks,
+                'reconnects': self.reconnects,
+                'expired': self.expired
+            }
+
+# Пулы процесса по ящику: переживают перезапуски скрипта Streamlit
+_pools: Dict[Tuple[Any, ...], IMAPPool] = {}
+_pools_lock = threading.Lock()
+
+def get_pool(key: Tuple[Any, ...], factory: Callable[[], imaplib.IMAP4], **options) -> IMAPPool:
+    """Общий пул для ящика key, создается при первом обращении"""
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = IMAPPool(factory, **options)
+        else:
+            # Фабрика новой копии EmailClient может нести обновленные настройки
+            pool.factory = factory
+        return pool
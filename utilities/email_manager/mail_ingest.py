@@ -0,0 +1,117 @@
+"""
+Параллельная загрузка почты из нескольких ящиков и папок
+
+Пары (ящик, папка) синхронизируются общим пулом потоков. Для каждого
+ящика одновременно выполняется не больше заданий, чем сессий в его пуле
+IMAP, поэтому задания одного ящика не занимают потоки в ожидании
+соединения, пока другие ящики простаивают. Письма всех пар сливаются в
+один поток, отсортированный по дате, с полями mailbox и folder.
+"""
+
+import json
+import logging
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from email_client import EmailClient
+
+logger = logging.getLogger(__name__)
+
+def load_accounts(path: str) -> List[Dict[str, Any]]:
+    """Дополнительные ящики из JSON файла: список объектов с полями username, password,
+    imap_server, imap_port, use_ssl и folders"""
+    if not path:
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _sent_at(email_data: Dict[str, Any]) -> datetime:
+    try:
+        moment = datetime.fromisoformat(str(email_data.get('date')))
+    except ValueError:
+        return datetime.min.replace(tzinfo=timezone.utc)
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+class MailIngestor:
+    """Синхронизация многих пар (ящик, папка) ограниченным пулом потоков
+
+    clients - клиенты ящиков; лимит соединений ящика - размер пула его клиента
+    max_workers - общий предел одновременно синхронизируемых пар
+    """
+
+    def __init__(self, clients: List[EmailClient], max_workers: int = 8):
+        self.clients = clients
+        self.max_workers = max(1, max_workers)
+
+    def _jobs(self, folders: Dict[str, List[str]]) -> deque:
+        """Задания по кругу между ящиками, чтобы первым не занимать потоки одним ящиком"""
+        queues = [
+            deque((client, folder) for folder in folders.get(client.username, folders.get('*', ["INBOX"])))
+            for client in self.clients
+        ]
+        jobs = deque()
+        while any(queues):
+            for queue in queues:
+                if queue:
+                    jobs.append(queue.popleft())
+        return jobs
+
+    def _sync(self, client: EmailClient, folder: str, since_date: Optional[date], limit: int) -> Dict[str, Any]:
+        started = time.perf_counter()
+        if client.store is not None:
+            report = dict(client.sync_folder(folder, since_date, limit))
+            emails = client.search_emails("", folder, since_date, limit)
+        else:
+            report = {'folder': folder}
+            emails = client.get_emails(folder, since_date, limit)
+
+        for email_data in emails:
+            email_data.update({'mailbox': client.username, 'folder': folder})
+
+        report.update({'mailbox': client.username, 'emails': len(emails), 'seconds': time.perf_counter() - started})
+        return {'report': report, 'emails': emails}
+
+    def ingest(self, folders: Optional[Dict[str, List[str]]] = None, since_date: Optional[date] = None,
+               limit: int = 0) -> Dict[str, Any]:
+        """Синхронизация папок всех ящиков; folders - папки по имени ящика, '*' - для остальных"""
+        started = time.perf_counter()
+        pending = self._jobs(folders or {'*': ["INBOX"]})
+        running: Dict[Any, Tuple[EmailClient, str]] = {}
+        active: Counter = Counter()
+        reports, streams = [], []
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                # Запуск заданий, для которых есть свободный поток и соединение ящика
+                for job in list(pending):
+                    client, folder = job
+                    if len(running) >= self.max_workers:
+                        break
+                    if active[id(client)] >= client.pool.max_size:
+                        continue
+                    pending.remove(job)
+                    active[id(client)] += 1
+                    running[executor.submit(self._sync, client, folder, since_date, limit)] = job
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    client, folder = running.pop(future)
+                    active[id(client)] -= 1
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"Ошибка загрузки {client.username}/{folder}: {e}")
+                        reports.append({'mailbox': client.username, 'folder': folder, 'error': str(e)})
+                        continue
+                    reports.append(result['report'])
+                    streams.append(result['emails'])
+
+        emails = sorted((e for stream in streams for e in stream), key=_sent_at, reverse=True)
+        return {
+            'emails': emails[:limit] if limit else emails,
+            'reports': sorted(reports, key=lambda r: (r['mailbox'], r['folder'])),
+            'seconds': time.perf_counter() - started
+        }
@@ -0,0 +1,343 @@
+"""
+Локальное хранилище синхронизированной почты в SQLite
+
+Для каждой папки хранятся UIDVALIDITY, наибольший полученный UID и
+начало загруженного периода, для писем - разобранные данные и флаги.
+По этому состоянию EmailClient запрашивает с сервера только новые UID
+и текущие флаги уже известных писем.
+
+Тема, отправитель, текст (превью) и имена вложений индексируются FTS5,
+дата, час, приоритет и прочитанность хранятся отдельными колонками,
+поэтому список, поиск и статистика по часам - индексные запросы без
+обращения к серверу. Если SQLite собран без FTS5, поиск идет через LIKE.
+"""
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Колонки, добавленные после первой версии схемы: хранилища старой версии дополняются при открытии
+MESSAGE_COLUMNS = {
+    'sent_at': 'TEXT',
+    'hour': 'INTEGER',
+    'priority': 'TEXT',
+    'seen': 'INTEGER NOT NULL DEFAULT 0'
+}
+
+# Если слово встречается реже, выборка идет от FTS индекса с сортировкой найденного,
+# иначе - по первичному ключу от новых писем к старым с проверкой по списку найденных
+SELECTIVE_MATCHES = 2000
+
+def fts_query(text: str) -> str:
+    """Запрос FTS5 из пользовательского ввода: все слова, каждое как префикс"""
+    return " ".join(f'"{word}"*' for word in re.findall(r'\w+', text))
+
+def _is_seen(flags: str) -> int:
+    return int('\\Seen' in flags.split())
+
+def _sent_at(value: str) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+class MailStore:
+    """Состояние синхронизации и письма по ящикам и папкам"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+        # Streamlit выполняет скрипты в разных потоках, поэтому одно
+        # соединение защищаем блокировкой
+        self._lock = threading.Lock()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS sync_state (
+                account TEXT NOT NULL,
+                folder TEXT NOT NULL,
+                uidvalidity INTEGER NOT NULL,
+                highest_uid INTEGER NOT NULL,
+                since TEXT,
+                synced_at REAL NOT NULL,
+                PRIMARY KEY (account, folder)
+            );
+            CREATE TABLE IF NOT EXISTS messages (
+                account TEXT NOT NULL,
+                folder TEXT NOT NULL,
+                uid INTEGER NOT NULL,
+                day TEXT,
+                flags TEXT NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (account, folder, uid)
+            );
+        """)
+        self._migrate()
+        self._connection.executescript("""
+            DROP INDEX IF EXISTS idx_messages_day;
+            CREATE INDEX IF NOT EXISTS idx_messages_day_hour ON messages(account, folder, day, hour);
+            CREATE INDEX IF NOT EXISTS idx_messages_priority ON messages(account, folder, priority, day);
+            CREATE INDEX IF NOT EXISTS idx_messages_seen ON messages(account, folder, seen, day);
+        """)
+
+        try:
+            self._connection.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5("
+                "subject, sender, body, attachments, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+            self.fts_enabled = True
+        except sqlite3.OperationalError as e:
+            logger.warning(f"FTS5 недоступен, поиск по почте без индекса: {e}")
+            self.fts_enabled = False
+        self._connection.commit()
+
+    def _migrate(self):
+        """Добавить колонки, которых нет в хранилище предыдущей версии"""
+        existing = {row[1] for row in self._connection.execute("PRAGMA table_info(messages)")}
+        missing = [name for name in MESSAGE_COLUMNS if name not in existing]
+        for name in missing:
+            self._connection.execute(f"ALTER TABLE messages ADD COLUMN {name} {MESSAGE_COLUMNS[name]}")
+        if missing:
+            # Старые записи без колонок и индекса проще загрузить с сервера заново
+            self._connection.execute("DELETE FROM messages")
+            self._connection.execute("DELETE FROM sync_state")
+
+    def get_state(self, account: str, folder: str) -> Optional[Dict[str, Any]]:
+        """Состояние синхронизации папки или None, если она еще не загружалась"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT uidvalidity, highest_uid, since, synced_at FROM sync_state WHERE account = ? AND folder = ?",
+                (account, folder)
+            ).fetchone()
+
+        if row is None:
+            return None
+        return {'uidvalidity': row[0], 'highest_uid': row[1], 'since': row[2], 'synced_at': row[3]}
+
+    def reset_folder(self, account: str, folder: str, uidvalidity: int, since: Optional[str]):
+        """Удалить письма папки и начать синхронизацию заново (сменился UIDVALIDITY)"""
+        with self._lock:
+            self._delete_index("account = ? AND folder = ?", (account, folder))
+            self._connection.execute("DELETE FROM messages WHERE account = ? AND folder = ?", (account, folder))
+            self._connection.execute(
+                "INSERT OR REPLACE INTO sync_state (account, folder, uidvalidity, highest_uid, since, synced_at) "
+                "VALUES (?, ?, ?, 0, ?, ?)",
+                (account, folder, uidvalidity, since, time.time())
+            )
+            self._connection.commit()
+
+    def update_state(self, account: str, folder: str, highest_uid: int, since: Optional[str]):
+        with self._lock:
+            self._connection.execute(
+                "UPDATE sync_state SET highest_uid = MAX(highest_uid, ?), since = ?, synced_at = ? "
+                "WHERE account = ? AND folder = ?",
+                (highest_uid, since, time.time(), account, folder)
+            )
+            self._connection.commit()
+
+    def _delete_index(self, where: str, params: tuple):
+        """Удалить из FTS индекса записи писем, подходящих под условие (вызывается под блокировкой)"""
+        if self.fts_enabled:
+            self._connection.execute(
+                f"DELETE FROM messages_fts WHERE rowid IN (SELECT rowid FROM messages WHERE {where})", params
+            )
+
+    def _index(self, rowid: int, email_data: Dict[str, Any]):
+        if self.fts_enabled:
+            self._connection.execute("DELETE FROM messages_fts WHERE rowid = ?", (rowid,))
+            self._connection.execute(
+                "INSERT INTO messages_fts (rowid, subject, sender, body, attachments) VALUES (?, ?, ?, ?, ?)",
+                (rowid, email_data.get('subject', ''), email_data.get('from', ''), email_data.get('body', ''),
+                 " ".join(email_data.get('attachments', [])))
+            )
+
+    def _upsert(self, account: str, folder: str, email_data: Dict[str, Any]):
+        flags = ' '.join(email_data.get('flags', []))
+        sent_at = _sent_at(email_data.get('date'))
+        # UPSERT сохраняет rowid письма, по нему связана запись FTS индекса
+        self._connection.execute(
+            "INSERT INTO messages (account, folder, uid, day, flags, data, sent_at, hour, priority, seen) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (account, folder, uid) DO UPDATE SET day = excluded.day, flags = excluded.flags, "
+            "data = excluded.data, sent_at = excluded.sent_at, hour = excluded.hour, "
+            "priority = excluded.priority, seen = excluded.seen",
+            (account, folder, email_data['uid'], sent_at.date().isoformat() if sent_at else None, flags,
+             json.dumps(email_data, ensure_ascii=False), sent_at.isoformat() if sent_at else None,
+             sent_at.hour if sent_at else None, email_data.get('priority'), _is_seen(flags))
+        )
+        rowid = self._connection.execute(
+            "SELECT rowid FROM messages WHERE account = ? AND folder = ? AND uid = ?",
+            (account, folder, email_data['uid'])
+        ).fetchone()[0]
+        self._index(rowid, email_data)
+
+    def save_messages(self, account: str, folder: str, emails: Iterable[Dict[str, Any]]):
+        """Сохранить разобранные письма; ключ - поле uid"""
+        with self._lock:
+            for email_data in emails:
+                self._upsert(account, folder, email_data)
+            self._connection.commit()
+
+    def uids(self, account: str, folder: str) -> List[int]:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT uid FROM messages WHERE account = ? AND folder = ? ORDER BY uid", (account, folder)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def update_flags(self, account: str, folder: str, flags: Dict[int, List[str]]) -> int:
+        """Обновить флаги писем, возвращает число изменившихся"""
+        with self._lock:
+            current = dict(self._connection.execute(
+                "SELECT uid, flags FROM messages WHERE account = ? AND folder = ?", (account, folder)
+            ).fetchall())
+            changed = [
+                (' '.join(sorted(values)), _is_seen(' '.join(values)), account, folder, uid)
+                for uid, values in flags.items()
+                if uid in current and current[uid] != ' '.join(sorted(values))
+            ]
+            self._connection.executemany(
+                "UPDATE messages SET flags = ?, seen = ? WHERE account = ? AND folder = ? AND uid = ?", changed
+            )
+            self._connection.commit()
+        return len(changed)
+
+    def update_message(self, account: str, folder: str, uid: int, changes: Dict[str, Any]):
+        """Дополнить сохраненные данные письма, например полным текстом"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT data, flags FROM messages WHERE account = ? AND folder = ? AND uid = ?", (account, folder, uid)
+            ).fetchone()
+            if row is None:
+                return
+            data = json.loads(row[0])
+            data.update(changes)
+            data['flags'] = row[1].split()
+            self._upsert(account, folder, data)
+            self._connection.commit()
+
+    def remove_messages(self, account: str, folder: str, uids: Set[int]):
+        with self._lock:
+            for uid in uids:
+                self._delete_index("account = ? AND folder = ? AND uid = ?", (account, folder, uid))
+            self._connection.executemany(
+                "DELETE FROM messages WHERE account = ? AND folder = ? AND uid = ?",
+                [(account, folder, uid) for uid in uids]
+            )
+            self._connection.commit()
+
+    def _filters(self, account: str, folder: Optional[str], since: Optional[date] = None,
+                 priority: Optional[str] = None, read: Optional[bool] = None) -> tuple:
+        """Условие WHERE и параметры для выборок по письмам"""
+        conditions = ["m.account = ?"]
+        params: List[Any] = [account]
+        if folder:
+            conditions.append("m.folder = ?")
+            params.append(folder)
+        if since:
+            conditions.append("m.day >= ?")
+            params.append(since.isoformat())
+        if priority:
+            conditions.append("m.priority = ?")
+            params.append(priority)
+        if read is not None:
+            conditions.append("m.seen = ?")
+            params.append(int(read))
+        return " AND ".join(conditions), params
+
+    def _selective(self, match: str) -> bool:
+        """Совпадений с запросом меньше SELECTIVE_MATCHES (вызывается под блокировкой)"""
+        found = self._connection.execute(
+            "SELECT COUNT(*) FROM (SELECT rowid FROM messages_fts WHERE messages_fts MATCH ? LIMIT ?)",
+            (match, SELECTIVE_MATCHES)
+        ).fetchone()[0]
+        return found < SELECTIVE_MATCHES
+
+    def list_messages(self, account: str, folder: Optional[str], since: Optional[date] = None, limit: int = 0,
+                      priority: Optional[str] = None, read: Optional[bool] = None,
+                      query: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Письма по возрастанию UID, последние limit; фильтры по периоду, приоритету,
+        прочитанности и полнотекстовый поиск"""
+        where, params = self._filters(account, folder, since, priority, read)
+        source = "messages m"
+        words = re.findall(r'\w+', query or "")
+
+        with self._lock:
+            if words and self.fts_enabled:
+                match = fts_query(query)
+                if self._selective(match):
+                    source = "messages_fts f CROSS JOIN messages m ON m.rowid = f.rowid"
+                    where = f"messages_fts MATCH ? AND {where}"
+                    params.insert(0, match)
+                else:
+                    where += " AND m.rowid IN (SELECT rowid FROM messages_fts WHERE messages_fts MATCH ?)"
+                    params.append(match)
+            else:
+                for word in words:
+                    where += " AND m.data LIKE ?"
+                    params.append(f"%{word}%")
+
+            sql = f"SELECT m.data, m.flags FROM {source} WHERE {where} ORDER BY m.uid DESC"
+            if limit:
+                sql += " LIMIT ?"
+                params.append(limit)
+            rows = self._connection.execute(sql, params).fetchall()
+
+        emails = []
+        for data, flags in reversed(rows):
+            email_data = json.loads(data)
+            email_data['flags'] = flags.split()
+            email_data['read'] = '\\Seen' in email_data['flags']
+            emails.append(email_data)
+        return emails
+
+    def hourly_counts(self, account: str, folder: Optional[str], since: Optional[date] = None) -> Dict[int, int]:
+        """Число писем по часу отправки за период"""
+        where, params = self._filters(account, folder, since)
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT m.hour, COUNT(*) FROM messages m WHERE {where} AND m.hour IS NOT NULL GROUP BY m.hour",
+                params
+            ).fetchall()
+        return dict(rows)
+
+    def counts(self, account: str, folder: Optional[str], since: Optional[date] = None) -> Dict[str, int]:
+        """Всего, непрочитанных и важных писем за период"""
+        where, params = self._filters(account, folder, since)
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(m.seen = 0), 0), COALESCE(SUM(m.priority = 'high'), 0) "
+                f"FROM messages m WHERE {where}",
+                params
+            ).fetchone()
+        return {'total': row[0], 'unread': row[1], 'important': row[2]}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            messages = self._connection.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+            folders = self._connection.execute("SELECT COUNT(*) FROM sync_state").fetchone()[0]
+        return {'messages': messages, 'folders': folders, 'fts': self.fts_enabled}
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+# Хранилища процесса по пути: соединение переживает перезапуски скрипта Streamlit
+_stores: Dict[str, MailStore] = {}
+_stores_lock = threading.Lock()
+
+def get_store(path: str) -> MailStore:
+    """Общее хранилище для файла path, открывается при первом обращении"""
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = MailStore(path)
+        return _stores[path]
@@ -0,0 +1,127 @@
+"""
+Разбор BODYSTRUCTURE и частично загруженных частей письма
+
+Для превью письма с сервера берутся только заголовки, структура и
+начало текстовой части; по структуре определяется раздел с текстом и
+имена вложений, а начало части декодируется с учетом обрезки посреди
+base64 или quoted-printable последовательности.
+"""
+
+import base64
+import quopri
+import re
+from email.header import decode_header, make_header
+from typing import Any, Dict, List, Optional, Tuple
+
+ATOM = re.compile(r'[^ ()]+')
+LITERAL = re.compile(r'\{(\d+)\+?\}\r?\n')
+
+def parse_list(text: str, pos: int = 0) -> Tuple[Any, int]:
+    """Значение IMAP с позиции pos: список в скобках, строка, литерал, NIL или атом"""
+    while text[pos] == ' ':
+        pos += 1
+
+    if text[pos] == '(':
+        values = []
+        pos += 1
+        while True:
+            while text[pos] == ' ':
+                pos += 1
+            if text[pos] == ')':
+                return values, pos + 1
+            value, pos = parse_list(text, pos)
+            values.append(value)
+
+    if text[pos] == '"':
+        value = ''
+        pos += 1
+        while text[pos] != '"':
+            if text[pos] == '\\':
+                pos += 1
+            value += text[pos]
+            pos += 1
+        return value, pos + 1
+
+    literal = LITERAL.match(text, pos)
+    if literal:
+        # Длина литерала в байтах, а текст уже декодирован - отсчитываем символы по их размеру в UTF-8
+        size, end = int(literal.group(1)), literal.end()
+        while size > 0:
+            size -= len(text[end].encode('utf-8', 'replace'))
+            end += 1
+        return text[literal.end():end], end
+
+    match = ATOM.match(text, pos)
+    atom = match.group(0)
+    return (None if atom.upper() == 'NIL' else atom), match.end()
+
+def parse_bodystructure(attributes: str) -> Optional[list]:
+    """BODYSTRUCTURE из текста ответа FETCH или None, если его там нет"""
+    match = re.search(r'BODYSTRUCTURE \(', attributes)
+    if not match:
+        return None
+    return parse_list(attributes, match.end() - 1)[0]
+
+def _params(value: Any) -> Dict[str, str]:
+    if not isinstance(value, list):
+        return {}
+    return {str(k).lower(): v for k, v in zip(value[::2], value[1::2])}
+
+def decode_filename(filename: str) -> str:
+    try:
+        return str(make_header(decode_header(filename)))
+    except Exception:
+        return filename
+
+def message_parts(structure: list, section: str = '') -> List[Dict[str, Any]]:
+    """Листовые части письма с номерами разделов IMAP"""
+    if structure and isinstance(structure[0], list):
+        parts = []
+        # Вложенные части идут первыми, после них подтип и параметры multipart
+        for i, child in enumerate(structure, 1):
+            if not isinstance(child, list):
+                break
+            parts.extend(message_parts(child, f"{section}.{i}" if section else str(i)))
+        return parts
+
+    maintype, subtype = str(structure[0]).lower(), str(structure[1]).lower()
+    # Расширенные поля после базовых: у text есть число строк, у message/rfc822 - конверт, структура и строки
+    extension = 8 if maintype == 'text' else 10 if (maintype, subtype) == ('message', 'rfc822') else 7
+    disposition = structure[extension + 1] if len(structure) > extension + 1 else None
+
+    params = _params(structure[2])
+    disposition_type = str(disposition[0]).lower() if isinstance(disposition, list) and disposition else None
+    disposition_params = _params(disposition[1]) if isinstance(disposition, list) and len(disposition) > 1 else {}
+    filename = disposition_params.get('filename') or params.get('name')
+
+    return [{
+        'section': section or '1',
+        'type': f"{maintype}/{subtype}",
+        'charset': params.get('charset'),
+        'encoding': str(structure[5] or '7BIT').upper(),
+        'size': int(structure[6] or 0),
+        'attachment': disposition_type == 'attachment',
+        'filename': decode_filename(filename) if filename else None
+    }]
+
+def text_part(parts: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Часть с текстом письма: text/plain, а если ее нет - text/html"""
+    for content_type in ('text/plain', 'text/html'):
+        for part in parts:
+            if part['type'] == content_type and not part['attachment']:
+                return part
+    return None
+
+def decode_partial(data: bytes, encoding: str, charset: Optional[str]) -> str:
+    """Декодирование начала части, обрезанной на произвольном байте"""
+    if encoding == 'BASE64':
+        compact = re.sub(rb'\s+', b'', data)
+        data = base64.b64decode(compact[:len(compact) // 4 * 4])
+    elif encoding == 'QUOTED-PRINTABLE':
+        # Обрезанная escape-последовательность в конце
+        data = quopri.decodestring(re.sub(rb'=[0-9A-Fa-f]?$', b'', data))
+
+    try:
+        return data.decode(charset or 'utf-8', errors='ignore')
+    except LookupError:
+        return data.decode('utf-8', errors='ignore')
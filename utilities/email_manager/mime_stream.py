@@ -0,0 +1,261 @@
+"""
+Потоковый разбор MIME письма без вложений в памяти
+
+Письмо читается кусками за один проход. Заголовки письма и каждой его
+части разбираются BytesFeedParser, а тела частей в дерево Message не
+собираются: из первой text/plain и первой text/html части сохраняется
+начало не длиннее text_limit символов, у вложений считаются только
+имя, тип и размер, их содержимое пропускается без декодирования.
+Строки-разделители multipart ищутся поиском b'\\n--' по буферу, поэтому
+пропуск вложения в десятки мегабайт не требует цикла по его строкам, а
+память на разбор не зависит от размера вложений.
+"""
+
+import re
+from email.feedparser import BytesFeedParser
+from email.message import Message
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Union
+
+from message_preview import decode_filename, decode_partial
+
+# Размер куска при чтении письма
+READ_SIZE = 64 * 1024
+
+# Текст письма, который сохраняется по умолчанию, символов
+DEFAULT_TEXT_LIMIT = 100000
+
+# Строка-разделитель не длиннее 70 символов границы, "--" с двух сторон и пробелы (RFC 2046)
+MAX_BOUNDARY_LINE = 1000
+
+HEADER_END = re.compile(rb'\r?\n\r?\n')
+
+def _declared_size(headers: Message) -> Optional[int]:
+    """Размер вложения из параметра size заголовка Content-Disposition (RFC 2183)"""
+    size = headers.get_param('size', header='content-disposition')
+    try:
+        return int(size) if isinstance(size, str) else None
+    except ValueError:
+        return None
+
+class StreamingMessageParser:
+    """Разбор письма по мере поступления данных: feed() кусками, затем close()
+
+    text_limit - сколько символов текста письма сохранять
+    """
+
+    def __init__(self, text_limit: int = DEFAULT_TEXT_LIMIT):
+        self.text_limit = text_limit
+        # Байт закодированного текста на text_limit символов: quoted-printable кириллица - 6 байт на символ
+        self.encoded_limit = text_limit * 6 + 4
+        self.size = 0
+        self.headers: Optional[Message] = None
+        self.attachments: List[Dict[str, Any]] = []
+
+        self._texts: Dict[str, Dict[str, Any]] = {}
+        self._buffer = bytearray()
+        self._boundaries: List[bytes] = []
+        self._in_headers = True
+        self._part: Optional[Dict[str, Any]] = None
+        self._line_start = True
+
+    def feed(self, data: Union[bytes, bytearray, memoryview]):
+        self.size += len(data)
+        self._buffer += data
+        self._process(final=False)
+
+    def close(self) -> Dict[str, Any]:
+        """Итог разбора: заголовки письма, текст, вложения и размер"""
+        self._process(final=True)
+        self._finish_part()
+
+        # text/plain, а если ее нет или она пустая - text/html
+        part = self._texts.get('text/plain')
+        if part is None or not part['data'].strip():
+            part = self._texts.get('text/html', part)
+        body, truncated = "", False
+        if part is not None:
+            body = decode_partial(bytes(part['data']), part['encoding'], part['charset'])
+            if part['type'] == 'text/html':
+                body = re.sub('<[^<]+?>', '', body)
+            truncated = part['truncated'] or len(body) > self.text_limit
+            body = body[:self.text_limit]
+
+        return {
+            'headers': self.headers if self.headers is not None else Message(),
+            'body': body.strip(),
+            'truncated': truncated,
+            'attachments': self.attachments,
+            'size': self.size
+        }
+
+    def _process(self, final: bool):
+        while True:
+            if self._in_headers:
+                end = self._header_end()
+                if end is None:
+                    if not final or not self._buffer:
+                        return
+                    end = len(self._buffer)
+                header = bytes(self._buffer[:end])
+                del self._buffer[:end]
+                self._start_entity(header)
+            elif not self._scan_body(final):
+                return
+
+    def _header_end(self) -> Optional[int]:
+        """Конец блока заголовков: позиция после пустой строки"""
+        for blank in (b'\r\n', b'\n'):
+            if self._buffer.startswith(blank):
+                return len(blank)
+        match = HEADER_END.search(self._buffer)
+        return match.end() if match else None
+
+    def _start_entity(self, header: bytes):
+        parser = BytesFeedParser()
+        parser.feed(header)
+        headers = parser.close()
+        if self.headers is None:
+            self.headers = headers
+
+        self._in_headers = False
+        self._line_start = True
+        boundary = headers.get_boundary() if headers.get_content_maintype() == 'multipart' else None
+        if boundary:
+            # До первого разделителя идет преамбула, она не сохраняется
+            self._boundaries.append(boundary.encode('utf-8', 'surrogateescape'))
+            self._part = None
+            return
+
+        content_type = headers.get_content_type()
+        attachment = headers.get_content_disposition() == 'attachment'
+        self._part = {
+            'type': content_type,
+            'encoding': str(headers.get('Content-Transfer-Encoding', '7BIT')).strip().upper(),
+            'charset': headers.get_content_charset(),
+            'octets': 0,
+            'line_breaks': 0,
+            'tail': b'',
+            'data': None,
+            'truncated': False
+        }
+        if attachment:
+            filename = headers.get_filename()
+            if filename:
+                self._part['attachment'] = {
+                    'filename': decode_filename(filename),
+                    'type': content_type,
+                    'size': _declared_size(headers)
+                }
+        elif content_type in ('text/plain', 'text/html') and content_type not in self._texts:
+            self._part['data'] = bytearray()
+            self._texts[content_type] = self._part
+
+    def _boundary(self, line: bytes) -> Optional[Tuple[int, bool]]:
+        """Уровень multipart и признак закрывающего разделителя для строки-разделителя"""
+        for depth in range(len(self._boundaries) - 1, -1, -1):
+            boundary = b'--' + self._boundaries[depth]
+            if line == boundary:
+                return depth, False
+            if line == boundary + b'--':
+                return depth, True
+        return None
+
+    def _scan_body(self, final: bool) -> bool:
+        """Тело до следующего разделителя; True - разделитель найден и разбор продолжается"""
+        buffer = self._buffer
+        if not self._boundaries:
+            self._take(len(buffer))
+            return False
+
+        search = 0
+        while True:
+            if search == 0 and self._line_start and buffer.startswith(b'--'):
+                start = 0
+            else:
+                found = buffer.find(b'\n--', search)
+                if found < 0:
+                    break
+                start = found + 1
+
+            end = buffer.find(b'\n', start)
+            if end < 0 and len(buffer) - start > MAX_BOUNDARY_LINE:
+                search = start + 1
+                continue
+            if end < 0 and not final:
+                # Строка-кандидат еще не дочитана
+                self._take(start)
+                return False
+            if end < 0:
+                end = len(buffer)
+
+            match = self._boundary(bytes(buffer[start:end]).rstrip())
+            if match is None:
+                search = end
+                continue
+
+            # Перевод строки перед разделителем относится к разделителю
+            content_end = max(start - 1, 0)
+            if content_end and buffer[content_end - 1] == 13:
+                content_end -= 1
+            self._take(content_end)
+            del buffer[:end + 1 - content_end]
+            self._line_start = True
+            self._finish_part()
+
+            depth, closing = match
+            del self._boundaries[depth + 1:]
+            if closing:
+                # После закрывающего разделителя - эпилог, он не сохраняется
+                self._boundaries.pop()
+            else:
+                self._in_headers = True
+            return True
+
+        # Хвост может оказаться началом разделителя "\n-"
+        self._take(len(buffer) if final else len(buffer) - 2)
+        return False
+
+    def _take(self, count: int):
+        """Первые count байт буфера в текущую часть"""
+        if count <= 0:
+            return
+        buffer = self._buffer
+        part = self._part
+        if part is not None:
+            part['octets'] += count
+            part['line_breaks'] += buffer.count(b'\n', 0, count) + buffer.count(b'\r', 0, count)
+            part['tail'] = (part['tail'] + bytes(buffer[max(count - 8, 0):count]))[-8:]
+            data = part['data']
+            if data is not None:
+                room = self.encoded_limit - len(data)
+                if room > 0:
+                    data += buffer[:min(count, room)]
+                if count > room:
+                    part['truncated'] = True
+        self._line_start = buffer[count - 1] == 10
+        del buffer[:count]
+
+    def _finish_part(self):
+        part, self._part = self._part, None
+        if part is None or 'attachment' not in part:
+            return
+        attachment = part['attachment']
+        if attachment['size'] is None:
+            octets = part['octets']
+            if part['encoding'] == 'BASE64':
+                tail = part['tail'].rstrip()
+                octets = (octets - part['line_breaks']) * 3 // 4 - (len(tail) - len(tail.rstrip(b'=')))
+            attachment['size'] = octets
+        self.attachments.append(attachment)
+
+def parse_message(source: Union[bytes, bytearray, BinaryIO], text_limit: int = DEFAULT_TEXT_LIMIT) -> Dict[str, Any]:
+    """Разбор письма из байтов или файла кусками по READ_SIZE"""
+    parser = StreamingMessageParser(text_limit)
+    if isinstance(source, (bytes, bytearray)):
+        view = memoryview(source)
+        for offset in range(0, len(view), READ_SIZE):
+            parser.feed(view[offset:offset + READ_SIZE])
+    else:
+        for chunk in iter(lambda: source.read(READ_SIZE), b''):
+            parser.feed(chunk)
+    return parser.close()
@@ -0,0 +1,170 @@
+"""
+Определение приоритета письма по ключевым словам
+
+Ключевые слова один раз собираются в одно регулярное выражение в виде
+префиксного дерева, поэтому текст просматривается за один проход
+независимо от числа слов. Русские слова задаются в начальной форме и
+ищутся по основе с окончанием любой длины (срочного, встречаемся,
+важнейшими), как и прежняя проверка подстрокой; английские - с
+окончаниями s/es/ed/ing/ly. Совпадение засчитывается только целым
+словом. Пакетный режим просматривает тексты многих писем одним
+вызовом. Просматривается тема и первые scan_chars символов текста - как
+и в режиме превью, где загружается только начало письма; для писем,
+загруженных целиком, окно можно отключить при вызове.
+"""
+
+import bisect
+import itertools
+import re
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+HIGH_PRIORITY_KEYWORDS = [
+    "срочно", "urgent", "важно", "important", "критично", "critical",
+    "немедленно", "asap", "emergency", "экстренно"
+]
+
+MEDIUM_PRIORITY_KEYWORDS = [
+    "встреча", "meeting", "созвон", "call", "задача", "task",
+    "проект", "project", "отчет", "report"
+]
+
+# Окончания: у русских слов отбрасываются конечные гласные, й и ь, окончание
+# не ограничено по длине - у глаголов с -ся и превосходной степени оно длиннее пяти букв
+RUSSIAN_ENDING = '[а-яё]*'
+ENGLISH_ENDING = '(?:s|es|ed|ing|ly)?'
+RUSSIAN_VOWELS = re.compile(r'[аеёиоуыэюяйь]+$')
+
+# Сколько символов текста письма просматривать; 0 - весь текст
+DEFAULT_SCAN_CHARS = 4096
+
+def keyword_forms(keyword: str) -> Tuple[List[str], str]:
+    """Основы ключевого слова (с вариантами е/ё) и выражение для окончания"""
+    keyword = keyword.lower().replace('ё', 'е')
+    if re.search('[а-я]', keyword):
+        stem = RUSSIAN_VOWELS.sub('', keyword) or keyword
+        positions = [i for i, ch in enumerate(stem) if ch == 'е']
+        stems = []
+        for mask in itertools.product('её', repeat=len(positions)):
+            chars = list(stem)
+            for i, ch in zip(positions, mask):
+                chars[i] = ch
+            stems.append(''.join(chars))
+        return stems, RUSSIAN_ENDING
+    if keyword.endswith('y'):
+        return [keyword[:-1]], '(?:y|ies)'
+    return [keyword], ENGLISH_ENDING
+
+def trie_pattern(branches: Iterable[Tuple[str, str]]) -> str:
+    """Выражение из пар (основа, окончание) с общими префиксами, вынесенными в дерево"""
+    trie: Dict[str, Any] = {}
+    for stem, ending in branches:
+        node = trie
+        for ch in stem:
+            node = node.setdefault(ch, {})
+        node.setdefault('', set()).add(ending)
+
+    def build(node: Dict[str, Any]) -> str:
+        alternatives = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        alternatives.extend(sorted(node.get('', ())))
+        return alternatives[0] if len(alternatives) == 1 else f"(?:{'|'.join(alternatives)})"
+
+    return build(trie)
+
+class PriorityClassifier:
+    """Классификатор приоритета: high, medium или low и найденные ключевые слова
+
+    high_keywords, medium_keywords - ключевые слова в начальной форме (None - по умолчанию,
+    пустой список - уровень не используется)
+    scan_chars - сколько символов текста письма просматривать, 0 - весь текст
+    """
+
+    def __init__(self, high_keywords: Optional[List[str]] = None, medium_keywords: Optional[List[str]] = None,
+                 scan_chars: int = DEFAULT_SCAN_CHARS):
+        self.scan_chars = scan_chars
+        self.levels: Dict[str, str] = {}
+        self._stems: Dict[str, str] = {}
+
+        if high_keywords is None:
+            high_keywords = HIGH_PRIORITY_KEYWORDS
+        if medium_keywords is None:
+            medium_keywords = MEDIUM_PRIORITY_KEYWORDS
+        for level, keywords in (('medium', medium_keywords), ('high', high_keywords)):
+            for keyword in keywords:
+                self.levels[keyword] = level
+                for stem in keyword_forms(keyword)[0]:
+                    self._stems[stem] = keyword
+
+        branches = [(stem, keyword_forms(keyword)[1]) for stem, keyword in self._stems.items()]
+        # Левая граница слова проверяется у найденных совпадений: просмотр назад у каждой позиции медленнее.
+        # Без ключевых слов выражение не совпадает ни с чем
+        self.pattern = re.compile(trie_pattern(branches) + r'(?!\w)' if branches else r'(?!)')
+        self._stem_lengths = sorted({len(stem) for stem in self._stems}, reverse=True)
+
+    def _keyword(self, word: str) -> Optional[str]:
+        """Ключевое слово по найденной словоформе: самая длинная подходящая основа"""
+        for length in self._stem_lengths:
+            keyword = self._stems.get(word[:length])
+            if keyword is not None:
+                return keyword
+        return None
+
+    def _text(self, subject: str, body: str, scan_chars: Optional[int] = None) -> str:
+        """Просматриваемый текст в нижнем регистре: тема и начало письма"""
+        if scan_chars is None:
+            scan_chars = self.scan_chars
+        if scan_chars:
+            body = body[:scan_chars]
+        return f"{subject}\n{body}".lower()
+
+    def _matches(self, text: str) -> Iterable[Tuple[int, str]]:
+        """Позиции и ключевые слова в тексте"""
+        for match in self.pattern.finditer(text):
+            start = match.start()
+            if start and (text[start - 1].isalnum() or text[start - 1] == '_'):
+                continue
+            keyword = self._keyword(match.group())
+            if keyword is not None:
+                yield start, keyword
+
+    def _result(self, keywords: List[str], headers: Optional[Mapping[str, Any]]) -> Dict[str, Any]:
+        levels = {self.levels[keyword] for keyword in keywords}
+        if headers is not None and _urgent_headers(headers):
+            priority = 'high'
+        else:
+            priority = 'high' if 'high' in levels else 'medium' if 'medium' in levels else 'low'
+        return {'priority': priority, 'keywords': keywords}
+
+    def classify(self, subject: str, body: str, headers: Optional[Mapping[str, Any]] = None,
+                 scan_chars: Optional[int] = None) -> Dict[str, Any]:
+        """Приоритет одного письма; headers - заголовки письма (X-Priority, Importance),
+        scan_chars - окно просмотра вместо заданного в классификаторе"""
+        text = self._text(subject, body, scan_chars)
+        keywords = list(dict.fromkeys(keyword for _, keyword in self._matches(text)))
+        return self._result(keywords, headers)
+
+    def classify_batch(self, messages: Iterable[Mapping[str, Any]],
+                       scan_chars: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Приоритеты писем со словарями subject, body и необязательным headers за один проход"""
+        messages = list(messages)
+        texts = [self._text(m.get('subject') or '', m.get('body') or '', scan_chars) for m in messages]
+
+        # Тексты разделены переводом строки, поэтому совпадение не переходит границу письма
+        offsets, position = [], 0
+        for text in texts:
+            offsets.append(position)
+            position += len(text) + 1
+
+        found: List[Dict[str, None]] = [{} for _ in messages]
+        for start, keyword in self._matches("\n".join(texts)):
+            found[bisect.bisect_right(offsets, start) - 1][keyword] = None
+
+        return [self._result(list(keywords), m.get('headers')) for keywords, m in zip(found, messages)]
+
+def _urgent_headers(headers: Mapping[str, Any]) -> bool:
+    """Высокий приоритет в заголовках X-Priority или Importance"""
+    priority_header = str(headers.get("X-Priority", "") or "").lower()
+    importance_header = str(headers.get("Importance", "") or "").lower()
+    return priority_header in ["1", "2"] or importance_header == "high"
+
+# Глобальный экземпляр
+priority_classifier = PriorityClassifier()
@@ -12,7 +12,7 @@ from shared.llm_client import llm_client
 from shared.config import Config
 from shared.utils import (
     create_streamlit_header, display_metrics, 
-    validate_config, async_to_sync
+    validate_config, stream_markdown
 )
 from datetime import datetime, timedelta
 
@@ -328,18 +328,12 @@ def main():
                 - Повторная посещаемость: 65%
                 """
                 
-                @async_to_sync
-                async def analyze_events():
-                    return await llm_client.analyze_text(
-                        event_data,
-                        "Проанализируй эффективность проведенных мероприятий. "
-                        "Выдели успешные практики, проблемы и рекомендации по улучшению."
-                    )
-                
-                analysis = analyze_events()
-                
                 st.subheader("📝 Анализ эффективности")
-                st.markdown(analysis)
+                analysis = stream_markdown(llm_client.analyze_text_stream(
+                    event_data,
+                    "Проанализируй эффективность проведенных мероприятий. "
+                    "Выдели успешные практики, проблемы и рекомендации по улучшению."
+                ))
         
         # Статистика и метрики
         st.subheader("📈 Ключевые метрики")
@@ -12,7 +12,7 @@ from shared.llm_client import llm_client
 from shared.config import Config
 from shared.utils import (
     create_streamlit_header, display_metrics, 
-    validate_config, async_to_sync
+    validate_config, stream_markdown
 )
 from datetime import datetime, timedelta
 
@@ -250,18 +250,12 @@ def main():
                 - Стабильные расходы на аренду
                 """
                 
-                @async_to_sync
-                async def analyze_finances():
-                    return await llm_client.analyze_text(
-                        financial_data,
-                        "Проанализируй финансовое состояние компании. "
-                        "Выдели основные тренды, риски и рекомендации по оптимизации бюджета."
-                    )
-                
-                analysis = analyze_finances()
-                
                 st.subheader("📝 Финансовый анализ")
-                st.markdown(analysis)
+                analysis = stream_markdown(llm_client.analyze_text_stream(
+                    financial_data,
+                    "Проанализируй финансовое состояние компании. "
+                    "Выдели основные тренды, риски и рекомендации по оптимизации бюджета."
+                ))
         
         # Типы отчетов
         st.subheader("📊 Стандартные отчеты")
@@ -13,7 +13,7 @@ from shared.config import Config
 from shared.utils import (
     create_streamlit_header, display_metrics, 
     display_data_table, send_notification, 
-    validate_config, async_to_sync
+    validate_config, stream_markdown
 )
 from datetime import datetime, timedelta
 import subprocess
@@ -169,19 +169,13 @@ def main():
                         for c in commits_data[:10]  # Анализируем последние 10
                     ])
                     
-                    @async_to_sync
-                    async def analyze_commits():
-                        return await llm_client.analyze_text(
-                            commits_text,
-                            "Проанализируй изменения в коде на основе коммитов. "
-                            "Выдели основные направления разработки, качество коммитов, "
-                            "потенциальные проблемы и рекомендации."
-                        )
-                    
-                    analysis = analyze_commits()
-                    
                     st.subheader("📝 Результат анализа")
-                    st.markdown(analysis)
+                    analysis = stream_markdown(llm_client.analyze_text_stream(
+                        commits_text,
+                        "Проанализируй изменения в коде на основе коммитов. "
+                        "Выдели основные направления разработки, качество коммитов, "
+                        "потенциальные проблемы и рекомендации."
+                    ))
             else:
                 st.warning("Сначала загрузите данные о коммитах")
     
@@ -12,7 +12,7 @@ from shared.llm_client import llm_client
 from shared.config import Config
 from shared.utils import (
     create_streamlit_header, display_metrics, 
-    validate_config, async_to_sync
+    validate_config, stream_markdown
 )
 from datetime import datetime, timedelta
 
@@ -231,18 +231,12 @@ def main():
                 - Низкие оценки по инициативности
                 """
                 
-                @async_to_sync
-                async def analyze_team():
-                    return await llm_client.analyze_text(
-                        team_data,
-                        "Проанализируй состояние команды с точки зрения HR. "
-                        "Выдели проблемы, риски и рекомендации по улучшению."
-                    )
-                
-                analysis = analyze_team()
-                
                 st.subheader("📝 Анализ команды")
-                st.markdown(analysis)
+                analysis = stream_markdown(llm_client.analyze_text_stream(
+                    team_data,
+                    "Проанализируй состояние команды с точки зрения HR. "
+                    "Выдели проблемы, риски и рекомендации по улучшению."
+                ))
         
         # Отчеты
         st.subheader("📊 Отчеты")
@@ -13,7 +13,7 @@ from shared.config import Config
 from shared.utils import (
     create_streamlit_header, display_metrics, 
     display_data_table, send_notification, 
-    validate_config, async_to_sync
+    validate_config, stream_markdown
 )
 from datetime import datetime, timedelta
 import random
@@ -285,19 +285,13 @@ def main():
                 Активные алерты: {len(alerts)}
                 """
                 
-                @async_to_sync
-                async def analyze_infrastructure():
-                    return await llm_client.analyze_text(
-                        analysis_data,
-                        "Проанализируй состояние инфраструктуры. "
-                        "Выдели проблемы, риски, рекомендации по оптимизации. "
-                        "Предложи действия для улучшения производительности и надежности."
-                    )
-                
-                analysis = analyze_infrastructure()
-                
                 st.subheader("📝 Результат анализа")
-                st.markdown(analysis)
+                analysis = stream_markdown(llm_client.analyze_text_stream(
+                    analysis_data,
+                    "Проанализируй состояние инфраструктуры. "
+                    "Выдели проблемы, риски, рекомендации по оптимизации. "
+                    "Предложи действия для улучшения производительности и надежности."
+                ))
                 
                 # Рекомендации
                 st.subheader("💡 Автоматические рекомендации")
@@ -12,7 +12,7 @@ from shared.llm_client import llm_client
 from shared.config import Config
 from shared.utils import (
     create_streamlit_header, display_metrics, 
-    validate_config, async_to_sync
+    validate_config, stream_markdown
 )
 from datetime import datetime
 
@@ -169,15 +169,10 @@ def main():
                 if text_topic:
                     with st.spinner("Генерация текста..."):
                         
-                        @async_to_sync
-                        async def generate_text():
-                            prompt = f"Создай {text_type.lower()} на тему '{text_topic}'. Длина: {text_length.lower()}."
-                            return await llm_client.analyze_text("", prompt)
-                        
-                        generated_text = generate_text()
+                        prompt = f"Создай {text_type.lower()} на тему '{text_topic}'. Длина: {text_length.lower()}."
                         
                         st.subheader("📝 Сгенерированный текст")
-                        st.markdown(generated_text)
+                        generated_text = stream_markdown(llm_client.analyze_text_stream("", prompt))
                         
                         if st.button("💾 Сохранить текст"):
                             st.success("Текст сохранен!")
@@ -12,7 +12,7 @@ from shared.llm_client import llm_client
 from shared.config import Config
 from shared.utils import (
     create_streamlit_header, display_metrics, 
-    validate_config, async_to_sync
+    validate_config, stream_markdown, async_to_sync
 )
 from datetime import datetime
 
@@ -160,25 +160,44 @@ def main():
     with tab3:
         st.subheader("📋 Задачи из встречи")
         
-        # Автоматическое создание задач
+        # Автоматическое создание задач: ответ в JSON сразу превращается в задачи
         if st.button("🤖 Создать задачи из заметок", type="primary"):
             if 'meeting_notes' in locals() and meeting_notes:
                 with st.spinner("Анализ заметок и создание задач..."):
-                    
-                    @async_to_sync
-                    async def create_tasks():
-                        return await llm_client.create_action_items(meeting_notes)
-                    
-                    action_items = create_tasks()
-                    
-                    st.subheader("📝 Предлагаемые задачи")
-                    st.markdown(action_items)
-                    
-                    if st.button("✅ Подтвердить создание задач"):
-                        st.success("Задачи созданы и добавлены в трекер!")
+                    result = async_to_sync(llm_client.create_action_items)(meeting_notes, structured=True)
+                
+                if result['error']:
+                    st.error(result['error'])
+                else:
+                    st.session_state['suggested_tasks'] = result['items']
             else:
                 st.warning("Сначала добавьте заметки встречи")
         
+        suggested_tasks = st.session_state.get('suggested_tasks', [])
+        if suggested_tasks:
+            st.subheader("📝 Предлагаемые задачи")
+            priority_color = {"Высокий": "🔴", "Средний": "🟡", "Низкий": "🟢"}
+            
+            for item in suggested_tasks:
+                st.markdown(
+                    f"{priority_color[item['priority']]} **{item['text']}** — "
+                    f"{item['owner'] or 'Не назначен'}, срок: {item['deadline'] or 'не указан'}"
+                )
+            
+            if st.button("✅ Подтвердить создание задач"):
+                st.session_state.setdefault('meeting_tasks', []).extend([
+                    {
+                        "title": item['text'],
+                        "assignee": item['owner'] or 'Не назначен',
+                        "deadline": item['deadline'],
+                        "priority": item['priority'],
+                        "status": "Открыта"
+                    }
+                    for item in suggested_tasks
+                ])
+                st.session_state['suggested_tasks'] = []
+                st.success("Задачи созданы и добавлены в трекер!")
+        
         # Ручное добавление задач
         with st.form("add_task"):
             st.subheader("➕ Добавить задачу вручную")
@@ -198,7 +217,7 @@ def main():
         tasks = [
             {"title": "Исправить баг в авторизации", "assignee": "Dev A", "status": "Открыта"},
             {"title": "Обновить документацию", "assignee": "Dev B", "status": "В работе"}
-        ]
+        ] + st.session_state.get('meeting_tasks', [])
         
         for task in tasks:
             col1, col2, col3 = st.columns([3, 1, 1])
@@ -233,18 +252,12 @@ def main():
                 {meeting_notes if 'meeting_notes' in locals() and meeting_notes else 'Нет заметок'}
                 """
                 
-                @async_to_sync
-                async def generate_summary():
-                    return await llm_client.analyze_text(
-                        meeting_summary,
-                        "Создай структурированный отчет о встрече. "
-                        "Выдели ключевые моменты, решения и следующие шаги."
-                    )
-                
-                summary = generate_summary()
-                
                 st.subheader("📄 Отчет о встрече")
-                st.markdown(summary)
+                summary = stream_markdown(llm_client.analyze_text_stream(
+                    meeting_summary,
+                    "Создай структурированный отчет о встрече. "
+                    "Выдели ключевые моменты, решения и следующие шаги."
+                ))
         
         # Настройки рассылки
         st.subheader("📮 Настройки рассылки")
@@ -12,7 +12,7 @@ from shared.llm_client import llm_client
 from shared.config import Config
 from shared.utils import (
     create_streamlit_header, display_metrics, 
-    validate_config, async_to_sync
+    validate_config, stream_markdown
 )
 from datetime import datetime, timedelta
 
@@ -161,14 +161,8 @@ def main():
                             'duration': f"{meeting_duration} минут"
                         }
                         
-                        @async_to_sync
-                        async def generate_agenda():
-                            return await llm_client.generate_meeting_agenda(meeting_info)
-                        
-                        agenda = generate_agenda()
-                        
                         st.subheader("📋 Повестка встречи")
-                        st.markdown(agenda)
+                        agenda = stream_markdown(llm_client.generate_meeting_agenda(meeting_info, stream=True))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
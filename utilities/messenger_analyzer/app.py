@@ -8,12 +8,12 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
-from shared.llm_client import llm_client
+from shared.rolling_summary import rolling_summarizer
 from shared.config import Config
 from shared.utils import (
     create_streamlit_header, display_metrics, 
     display_data_table, send_notification, 
-    validate_config, async_to_sync
+    validate_config, stream_markdown
 )
 from datetime import datetime, timedelta
 import json
@@ -141,17 +141,20 @@ def main():
     with tab3:
         st.subheader("🤖 ИИ Анализ сообщений")
         
+        # Сводка обновляется инкрементально: в модель уходят только новые сообщения
+        summary_source = f"telegram:{period}:{','.join(sorted(chat_filter))}"
+        rebuild_summary = st.checkbox("Пересчитать сводку с нуля", False)
+        
         if st.button("🔍 Анализировать сообщения", type="primary"):
             with st.spinner("Анализ сообщений..."):
                 
-                @async_to_sync
-                async def analyze_messages():
-                    return await llm_client.analyze_telegram_messages(messages if 'messages' in locals() else [])
-                
-                analysis = analyze_messages()
+                if rebuild_summary:
+                    rolling_summarizer.reset(summary_source)
                 
                 st.subheader("📝 Результат анализа")
-                st.markdown(analysis)
+                analysis = stream_markdown(rolling_summarizer.summarize_telegram_messages(
+                    summary_source, messages if 'messages' in locals() else [], stream=True
+                ))
     
     with tab4:
         st.subheader("📋 Автоматические задачи")
@@ -12,7 +12,7 @@ from shared.llm_client import llm_client
 from shared.config import Config
 from shared.utils import (
     create_streamlit_header, display_metrics, 
-    validate_config, async_to_sync
+    validate_config, stream_markdown
 )
 from datetime import datetime, timedelta
 
@@ -260,18 +260,12 @@ def main():
                 Проблемные области: Просроченные задачи, мало времени на обучение
                 """
                 
-                @async_to_sync
-                async def analyze_productivity():
-                    return await llm_client.analyze_text(
-                        productivity_data,
-                        "Проанализируй продуктивность пользователя. "
-                        "Выдели сильные стороны, проблемы и дай рекомендации по улучшению."
-                    )
-                
-                analysis = analyze_productivity()
-                
                 st.subheader("📝 Анализ продуктивности")
-                st.markdown(analysis)
+                analysis = stream_markdown(llm_client.analyze_text_stream(
+                    productivity_data,
+                    "Проанализируй продуктивность пользователя. "
+                    "Выдели сильные стороны, проблемы и дай рекомендации по улучшению."
+                ))
         
         # Генерация плана дня
         st.subheader("📅 Планирование дня")
@@ -12,7 +12,7 @@ from shared.llm_client import llm_client
 from shared.config import Config
 from shared.utils import (
     create_streamlit_header, display_metrics, 
-    validate_config, async_to_sync
+    validate_config, stream_markdown
 )
 from datetime import datetime, timedelta
 
@@ -227,18 +227,12 @@ def main():
                 - Автоматизация: 30% vs 55% (среднее)
                 """
                 
-                @async_to_sync
-                async def generate_recommendations():
-                    return await llm_client.analyze_text(
-                        process_data,
-                        "Проанализируй процесс и предложи конкретные рекомендации по оптимизации. "
-                        "Укажи приоритетные области улучшения, потенциальную экономию времени и ресурсов."
-                    )
-                
-                recommendations = generate_recommendations()
-                
                 st.subheader("💡 Рекомендации по улучшению")
-                st.markdown(recommendations)
+                recommendations = stream_markdown(llm_client.analyze_text_stream(
+                    process_data,
+                    "Проанализируй процесс и предложи конкретные рекомендации по оптимизации. "
+                    "Укажи приоритетные области улучшения, потенциальную экономию времени и ресурсов."
+                ))
         
         # Готовые рекомендации
         st.subheader("🎯 Приоритетные улучшения")
@@ -12,7 +12,7 @@ from shared.llm_client import llm_client
 from shared.config import Config
 from shared.utils import (
     create_streamlit_header, display_metrics, 
-    validate_config, async_to_sync
+    validate_config, stream_markdown
 )
 from datetime import datetime, timedelta
 
@@ -214,18 +214,12 @@ def main():
                 Бюджет использован: 85%
                 """
                 
-                @async_to_sync
-                async def generate_report():
-                    return await llm_client.analyze_text(
-                        project_data,
-                        "Создай подробный отчет по состоянию проекта. "
-                        "Включи анализ прогресса, рисков, рекомендации по улучшению."
-                    )
-                
-                report = generate_report()
-                
                 st.subheader("📄 Отчет по проекту")
-                st.markdown(report)
+                report = stream_markdown(llm_client.analyze_text_stream(
+                    project_data,
+                    "Создай подробный отчет по состоянию проекта. "
+                    "Включи анализ прогресса, рисков, рекомендации по улучшению."
+                ))
         
         # Экспорт отчетов
         st.subheader("📤 Экспорт отчетов")
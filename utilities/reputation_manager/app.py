@@ -12,7 +12,7 @@ from shared.llm_client import llm_client
 from shared.config import Config
 from shared.utils import (
     create_streamlit_header, display_metrics, 
-    validate_config, async_to_sync
+    validate_config, stream_markdown
 )
 from datetime import datetime, timedelta
 
@@ -274,18 +274,12 @@ def main():
                 - Рост негативных отзывов в Twitter
                 """
                 
-                @async_to_sync
-                async def analyze_reputation():
-                    return await llm_client.analyze_text(
-                        reputation_data,
-                        "Проанализируй репутационную ситуацию компании. "
-                        "Выдели риски, возможности и рекомендации по улучшению репутации."
-                    )
-                
-                analysis = analyze_reputation()
-                
                 st.subheader("📝 Анализ репутации")
-                st.markdown(analysis)
+                analysis = stream_markdown(llm_client.analyze_text_stream(
+                    reputation_data,
+                    "Проанализируй репутационную ситуацию компании. "
+                    "Выдели риски, возможности и рекомендации по улучшению репутации."
+                ))
         
         # Экспорт отчетов
         st.subheader("📤 Отчеты")
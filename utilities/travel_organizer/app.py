@@ -12,7 +12,7 @@ from shared.llm_client import llm_client
 from shared.config import Config
 from shared.utils import (
     create_streamlit_header, display_metrics, 
-    validate_config, async_to_sync
+    validate_config, stream_markdown
 )
 from datetime import datetime, timedelta
 
@@ -296,18 +296,12 @@ def main():
                 - Транспорт: $25
                 """
                 
-                @async_to_sync
-                async def generate_trip_report():
-                    return await llm_client.analyze_text(
-                        trip_data,
-                        "Создай подробный отчет о командировке. "
-                        "Включи анализ расходов, достигнутые цели, рекомендации."
-                    )
-                
-                report = generate_trip_report()
-                
                 st.subheader("📄 Отчет о поездке")
-                st.markdown(report)
+                report = stream_markdown(llm_client.analyze_text_stream(
+                    trip_data,
+                    "Создай подробный отчет о командировке. "
+                    "Включи анализ расходов, достигнутые цели, рекомендации."
+                ))
         
         # Документы
         st.subheader("📄 Документы поездки")